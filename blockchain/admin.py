@@ -2,7 +2,7 @@
 from django.contrib import admin
 
 from izumi_infra.blockchain.models import (Blockchain, Contract, AccountContractRelationship,
-    Account, TransactionSignInfo)
+    Account, TransactionSignInfo, BalanceSnapshot, BalanceSnapshotItem)
 
 # Register your models here.
 
@@ -35,3 +35,20 @@ class AccountContractRelationshipAdmin(admin.ModelAdmin):
 class TransactionSignInfoAdmin(admin.ModelAdmin):
     actions = []
     list_display = ['__str__', 'r_hex', 'create_time']
+
+@admin.register(BalanceSnapshot)
+class BalanceSnapshotAdmin(admin.ModelAdmin):
+    actions = []
+    list_display = ['__str__', 'chain', 'block_number', 'status', 'create_time']
+    readonly_fields = ['create_time', 'update_time']
+    list_filter = ['chain', 'status']
+
+@admin.register(BalanceSnapshotItem)
+class BalanceSnapshotItemAdmin(admin.ModelAdmin):
+    actions = []
+    list_display = ['id', 'snapshot', 'token_address', 'account_address', 'balance', 'status']
+    list_select_related = ['snapshot',]
+    readonly_fields = ['update_time']
+    list_filter = ['status']
+    search_fields = ['account_address__exact']
+    raw_id_fields = ['snapshot']
@@ -5,3 +5,9 @@ from django.apps import AppConfig
 class BlockchainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'izumi_infra.blockchain'
+
+    def ready(self) -> None:
+        # invalidate facade context by model change
+        import izumi_infra.blockchain.signals  # noqa: F401
+
+        return super().ready()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import logging
+from threading import Lock
+from typing import Dict, Iterable
+
+from cachetools import LRUCache
+from django.core.cache import cache
+
+from izumi_infra.blockchain.conf import blockchain_settings
+
+logger = logging.getLogger(__name__)
+
+class BlockHeaderCache():
+    """
+    Block timestamp cache, bounded LRU in memory for all blocks,
+    finalized blocks also persist by django cache
+    """
+    CACHE_KEY_PREFIX = 'izumi_infra:block_time'
+
+    def __init__(self) -> None:
+        self._cache = LRUCache(maxsize=blockchain_settings.BLOCK_HEADER_CACHE_SIZE)
+        self._lock = Lock()
+
+    def _persist_key(self, chain_id: int, block_id: int) -> str:
+        return f'{self.CACHE_KEY_PREFIX}:{chain_id}:{block_id}'
+
+    def get_many(self, chain_id: int, block_ids: Iterable[int]) -> Dict[int, int]:
+        """
+        return {block_id: timestamp} of cached blocks
+        """
+        block_timestamps = {}
+        with self._lock:
+            for block_id in block_ids:
+                timestamp = self._cache.get((chain_id, block_id))
+                if timestamp is not None: block_timestamps[block_id] = timestamp
+
+        missing_key_to_block = {self._persist_key(chain_id, b): b for b in block_ids if b not in block_timestamps}
+        if not missing_key_to_block: return block_timestamps
+
+        try:
+            persist_timestamps = cache.get_many(missing_key_to_block.keys())
+        except Exception as e:
+            logger.warn(f'get block time from cache fail: {e}')
+            persist_timestamps = {}
+
+        with self._lock:
+            for key, timestamp in persist_timestamps.items():
+                block_id = missing_key_to_block[key]
+                block_timestamps[block_id] = timestamp
+                self._cache[(chain_id, block_id)] = timestamp
+
+        return block_timestamps
+
+    def set_many(self, chain_id: int, block_timestamps: Dict[int, int], finalized_block_id: int = None) -> None:
+        """
+        block not greater than finalized_block_id will persist
+        """
+        with self._lock:
+            for block_id, timestamp in block_timestamps.items():
+                self._cache[(chain_id, block_id)] = timestamp
+
+        if finalized_block_id is None: return
+        persist_data = {self._persist_key(chain_id, b): t for b, t in block_timestamps.items() if b <= finalized_block_id}
+        if not persist_data: return
+        try:
+            cache.set_many(persist_data, timeout=blockchain_settings.BLOCK_HEADER_CACHE_PERSIST_SECONDS)
+        except Exception as e:
+            logger.warn(f'set block time to cache fail: {e}')
+
+blockHeaderHolder = BlockHeaderCache()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+import time
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from django.core.cache import cache
+from requests import Timeout
+
+from izumi_infra.etherscan.conf import etherscan_settings
+
+logger = logging.getLogger(__name__)
+
+# lower case error message of provider when eth_getLogs result or block range too large
+WINDOW_OVERFLOW_ERROR_PATTERNS = (
+    'query returned more than',
+    'response size exceeded',
+    'block range',
+    'range is too large',
+    'range too large',
+    'too many logs',
+    'too many results',
+)
+
+# lower case error message of provider throttling, not related to window size
+RATE_LIMIT_ERROR_PATTERNS = (
+    'too many requests',
+    'rate limit',
+    'ratelimit',
+    'quota',
+    'capacity exceeded',
+    'request limit',
+)
+
+def is_rate_limit_error(e: Exception) -> bool:
+    # requests HTTPError or aiohttp ClientResponseError of status 429
+    status = getattr(getattr(e, 'response', None), 'status_code', None) or getattr(e, 'status', None)
+    if status == 429: return True
+    error_msg = str(e).lower()
+    return any(p in error_msg for p in RATE_LIMIT_ERROR_PATTERNS)
+
+def is_window_overflow_error(e: Exception) -> bool:
+    if is_rate_limit_error(e): return False
+    # read timeout of large response
+    if isinstance(e, Timeout): return True
+    error_msg = str(e).lower()
+    return any(p in error_msg for p in WINDOW_OVERFLOW_ERROR_PATTERNS)
+
+class AdaptiveBlockWindow():
+    """
+    eth_getLogs block window size learned per chain and address set,
+    halve when provider reject, grow when response small, persist by django cache for ETH_ADAPTIVE_WINDOW_TTL_SEC
+    """
+    CACHE_KEY_PREFIX = 'izumi_infra:block_window'
+
+    def __init__(self) -> None:
+        # key: (window, expire monotonic time)
+        self._windows: Dict[str, Tuple[int, float]] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def build_key(chain_id: int, contract_addr_list: List[str]) -> str:
+        addr_digest = hashlib.sha1(','.join(sorted(a.lower() for a in contract_addr_list)).encode()).hexdigest()
+        return f'{chain_id}-{addr_digest}'
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            window_entry = self._windows.get(key)
+            if window_entry is not None and window_entry[1] > time.monotonic(): return window_entry[0]
+
+        try:
+            window = cache.get(f'{self.CACHE_KEY_PREFIX}:{key}')
+        except Exception as e:
+            logger.warn(f'get block window from cache fail: {e}')
+            window = None
+
+        window = window or etherscan_settings.ETH_MAX_SCAN_BLOCK
+        with self._lock:
+            self._windows[key] = (window, time.monotonic() + etherscan_settings.ETH_ADAPTIVE_WINDOW_TTL_SEC)
+        return window
+
+    def shrink(self, key: str, window: int) -> int:
+        new_window = max(etherscan_settings.ETH_ADAPTIVE_MIN_SCAN_BLOCK, window // 2)
+        logger.info(f'shrink block window of {key}: {window} -> {new_window}')
+        return self._set(key, new_window)
+
+    def grow(self, key: str, window: int) -> int:
+        # never lower window learned by other request
+        current_window = self.get(key)
+        new_window = max(current_window, min(etherscan_settings.ETH_ADAPTIVE_MAX_SCAN_BLOCK, window * 2))
+        if new_window == current_window: return current_window
+        return self._set(key, new_window)
+
+    def _set(self, key: str, window: int) -> int:
+        ttl_sec = etherscan_settings.ETH_ADAPTIVE_WINDOW_TTL_SEC
+        with self._lock:
+            self._windows[key] = (window, time.monotonic() + ttl_sec)
+
+        try:
+            cache.set(f'{self.CACHE_KEY_PREFIX}:{key}', window, timeout=ttl_sec)
+        except Exception as e:
+            logger.warn(f'set block window to cache fail: {e}')
+        return window
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+
+blockWindowHolder = AdaptiveBlockWindow()
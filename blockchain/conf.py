@@ -5,16 +5,77 @@ from django.test.signals import setting_changed
 
 from izumi_infra.utils.setting_helper import AppSettings
 
+def _optional_int(value):
+    return None if value in (None, '', 'None') else int(value)
+
 DEFAULTS = {
     'WEB3_HTTP_RPC_TIMEOUT': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.WEB3_HTTP_RPC_TIMEOUT", 15)),
     'CONTRACT_CHOICES_CLASS': 'izumi_infra.blockchain.constants.BaseContractInfoEnum',
     'SIGN_MAX_RETRY_COUNT': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.SIGN_MAX_RETRY_COUNT", 3)),
     'SIGN_RANDOM_GAS_PRICE_WEI_OFFSET': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.SIGN_RANDOM_GAS_PRICE_WEI_OFFSET", 10_000)),
     'BLOCK_NEAR_TIME_TOLERANCE_BLOCK': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.BLOCK_NEAR_TIME_TOLERANCE_BLOCK", 100)),
+    # Blockchain.rpc_url could be ordered endpoint list split by comma, idempotent read retry on next endpoint
+    'RPC_MAX_RETRY': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_MAX_RETRY", 2)),
+    'RPC_RETRY_BACKOFF_SEC': float(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_RETRY_BACKOFF_SEC", 0.2)),
+    # endpoint skipped for RPC_CIRCUIT_OPEN_SECONDS after consecutive failures
+    'RPC_CIRCUIT_FAILURE_THRESHOLD': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_CIRCUIT_FAILURE_THRESHOLD", 5)),
+    'RPC_CIRCUIT_OPEN_SECONDS': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_CIRCUIT_OPEN_SECONDS", 30)),
+    'RPC_LATENCY_WINDOW': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_LATENCY_WINDOW", 100)),
+    # send same read to next endpoint when no response after p95 latency
+    'ENABLE_RPC_HEDGE': os.environ.get("IZUMI_INFRA_BLOCKCHAIN.ENABLE_RPC_HEDGE", "False") == 'True',
+    'RPC_HEDGE_MIN_DELAY_MS': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_HEDGE_MIN_DELAY_MS", 50)),
+    # token bucket per chain, {chain_id: {'rate': request per second, 'burst': n}}, default for chain not in it
+    'RPC_RATE_LIMIT': {},
+    'RPC_RATE_LIMIT_DEFAULT': None,
+    # local: threads of one process, cache: django cache window counter, redis: atomic bucket shared by all workers
+    'RPC_RATE_LIMIT_BACKEND': os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_RATE_LIMIT_BACKEND", "local"),
+    'RPC_RATE_LIMIT_REDIS_URL': os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_RATE_LIMIT_REDIS_URL", "redis://127.0.0.1:6379/0"),
+    # cache response of block, transaction, receipt and eth_call at block not greater than head - finality offset
+    'ENABLE_RPC_RESPONSE_CACHE': os.environ.get("IZUMI_INFRA_BLOCKCHAIN.ENABLE_RPC_RESPONSE_CACHE", "False") == 'True',
+    'RPC_RESPONSE_CACHE_SIZE': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_RESPONSE_CACHE_SIZE", 50_000)),
+    # sqlite file of on disk tier, empty for memory only
+    'RPC_RESPONSE_CACHE_SQLITE_PATH': os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_RESPONSE_CACHE_SQLITE_PATH", ""),
+    # {chain_id: block offset}, default etherscan SAFE_BLOCK_NUM_OFFSET
+    'RPC_CACHE_FINALITY_OFFSET': {},
+    'RPC_CACHE_HEAD_TTL_SEC': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_CACHE_HEAD_TTL_SEC", 5)),
+    # parse eth_getLogs and full block response incrementally with gzip, require ijson
+    'ENABLE_RPC_STREAMING_RESPONSE': os.environ.get("IZUMI_INFRA_BLOCKCHAIN.ENABLE_RPC_STREAMING_RESPONSE", "False") == 'True',
+    # rpc metrics backend class path list, empty for disabled, eg: ['izumi_infra.blockchain.rpc_metrics.InMemoryRpcMetrics']
+    'RPC_METRICS_BACKEND_CLASSES': [],
+    'RPC_METRICS_LATENCY_BUCKETS': (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'RPC_METRICS_STATSD_HOST': os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_METRICS_STATSD_HOST", "127.0.0.1"),
+    'RPC_METRICS_STATSD_PORT': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_METRICS_STATSD_PORT", 8125)),
+    'RPC_METRICS_STATSD_PREFIX': os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_METRICS_STATSD_PREFIX", "izumi_infra"),
+    # max call in one JSON-RPC batch request, and max concurrent batch request
+    'RPC_BATCH_SIZE': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_BATCH_SIZE", 50)),
+    'RPC_BATCH_MAX_WORKERS': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.RPC_BATCH_MAX_WORKERS", 4)),
+    # Multicall3 contract, same address on most chains, {chain_id: address} override, empty address for disabled
+    'MULTICALL3_ADDRESS': os.environ.get("IZUMI_INFRA_BLOCKCHAIN.MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11"),
+    'MULTICALL3_ADDRESS_MAP': {},
+    # aggregate3 call chunked by sum of per call gas estimate and calldata size
+    'MULTICALL_MAX_GAS': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.MULTICALL_MAX_GAS", 30_000_000)),
+    'MULTICALL_CALL_GAS': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.MULTICALL_CALL_GAS", 100_000)),
+    'MULTICALL_MAX_CALLDATA_BYTES': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.MULTICALL_MAX_CALLDATA_BYTES", 100_000)),
+    # (token, account) pair per balance snapshot multicall task, and max concurrent task
+    'BALANCE_SNAPSHOT_CHUNK_SIZE': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.BALANCE_SNAPSHOT_CHUNK_SIZE", 1000)),
+    'BALANCE_SNAPSHOT_MAX_WORKERS': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.BALANCE_SNAPSHOT_MAX_WORKERS", 4)),
+    # max concurrent full block fetch of one block range scan
+    'BLOCK_FETCH_MAX_WORKERS': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.BLOCK_FETCH_MAX_WORKERS", 8)),
+    'BLOCK_HEADER_CACHE_SIZE': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.BLOCK_HEADER_CACHE_SIZE", 100_000)),
+    # finalized block time persist by django cache, None or empty env for forever
+    'BLOCK_HEADER_CACHE_PERSIST_SECONDS': _optional_int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.BLOCK_HEADER_CACHE_PERSIST_SECONDS", 7 * 24 * 3600)),
+    # max connections of async rpc pool of one chain, requests over it wait in pool
+    'ASYNC_RPC_MAX_CONNECTIONS': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.ASYNC_RPC_MAX_CONNECTIONS", 200)),
+    # max in flight eth_getLogs window and block request of one async facade fan-out
+    'ASYNC_RPC_MAX_CONCURRENCY': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.ASYNC_RPC_MAX_CONCURRENCY", 50)),
+    # max facade of ad-hoc (chain, address) in contract context, like erc20 token
+    'CONTRACT_INFO_FACADE_CACHE_SIZE': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.CONTRACT_INFO_FACADE_CACHE_SIZE", 2048)),
+    'TX_FROM_CACHE_SIZE': int(os.environ.get("IZUMI_INFRA_BLOCKCHAIN.TX_FROM_CACHE_SIZE", 100_000)),
 }
 
 IMPORT_STRINGS = {
-    'CONTRACT_CHOICES_CLASS'
+    'CONTRACT_CHOICES_CLASS',
+    'RPC_METRICS_BACKEND_CLASSES',
 }
 
 USER_SETTING_KEY = 'IZUMI_INFRA_BLOCKCHAIN'
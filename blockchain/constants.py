@@ -80,6 +80,15 @@ class ContractStatusEnum(IntegerFieldEnum):
     ACTIVATED = 2
     DISCARDED = -1
 
+class BalanceSnapshotStatusEnum(IntegerFieldEnum):
+    INITIAL = 0
+    FINISHED = 1
+
+class BalanceSnapshotItemStatusEnum(IntegerFieldEnum):
+    INITIAL = 0
+    SUCCESS = 1
+    FAIL = -1
+
 class BaseTopicEnum(StringFieldEnum):
     @classmethod
     def topic_list(cls):
@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
-from izumi_infra.blockchain.context.blockchainContext import BlockchainContext, BaseContext
+from izumi_infra.blockchain.context.blockchainContext import AsyncBlockchainContext, BlockchainContext, BaseContext
 
-__all__ = ['BaseContext', 'blockchainHolder', 'contractHolder', 'blockchainSimpleHolder', 'contractMetaHolder']
+__all__ = ['BaseContext', 'blockchainHolder', 'asyncBlockchainHolder', 'contractHolder', 'blockchainSimpleHolder', 'contractMetaHolder']
 
 blockchainHolder = BlockchainContext()
 blockchainMetaHolder = BlockchainContext()
+asyncBlockchainHolder = AsyncBlockchainContext()
 
 from izumi_infra.blockchain.context.contractContext import ContractContext
 
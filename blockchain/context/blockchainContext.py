@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 from izumi_infra.blockchain.constants import BlockChainVmEnum
-from izumi_infra.blockchain.facade import BlockchainFacade
+from izumi_infra.blockchain.facade import AsyncBlockchainFacade, BlockchainFacade
 from izumi_infra.blockchain.models import Blockchain
 from izumi_infra.blockchain.types import ChainMeta
 from izumi_infra.utils.base_context import BaseContext
 
+def blockchain_fingerprint(blockchain_model: Blockchain):
+    """
+    fields facade built from, facade rebuilt when changed
+    """
+    return (blockchain_model.symbol, blockchain_model.vm_type, blockchain_model.rpc_url, blockchain_model.gas_price_wei)
+
 class BlockchainContext(BaseContext):
     """
     Blockchain ability facade context
@@ -13,15 +19,11 @@ class BlockchainContext(BaseContext):
     def get_facade_by_model(self, blockchain_model: Blockchain) -> BlockchainFacade:
         if not isinstance(blockchain_model, Blockchain):
             raise ValueError("only support for Blockchain model, not {}".format(blockchain_model))
-        if blockchain_model.chain_id in self._instances:
-            return self._instances[blockchain_model.chain_id]
-
-        instance = self._instances.setdefault(blockchain_model.chain_id, self._build_facade(blockchain_model))
-        return instance
+        return self._registry.get_or_build(blockchain_model.chain_id, lambda: self._build_facade(blockchain_model),
+                                           blockchain_fingerprint(blockchain_model))
 
     def get_facade_by_meta(self, chainMeta: ChainMeta) -> BlockchainFacade:
-        instance = self._instances.setdefault(chainMeta['id'], self._simple_build_facade(chainMeta))
-        return instance
+        return self._registry.get_or_build(('meta', chainMeta['id']), lambda: self._simple_build_facade(chainMeta), chainMeta['rpc_url'])
 
     def _build_facade(self, blockchain_model: Blockchain) -> BlockchainFacade:
         blockchain_facade = BlockchainFacade(blockchain_model.symbol,
@@ -45,8 +47,7 @@ class BlockchainSimpleContext(BaseContext):
     """
 
     def get_facade_by_meta(self, chainMeta: ChainMeta) -> BlockchainFacade:
-        instance = self._instances.setdefault(chainMeta['id'], self._simple_build_facade(chainMeta))
-        return instance
+        return self._registry.get_or_build(('meta', chainMeta['id']), lambda: self._simple_build_facade(chainMeta), chainMeta['rpc_url'])
 
     def _simple_build_facade(self, chainMeta: ChainMeta) -> BlockchainFacade:
         blockchain_facade = BlockchainFacade(None,
@@ -55,3 +56,22 @@ class BlockchainSimpleContext(BaseContext):
                                              chainMeta['id'],
                                              5_000_000_000)
         return blockchain_facade
+
+class AsyncBlockchainContext(BaseContext):
+    """
+    Asyncio blockchain ability facade context
+    """
+
+    def get_facade_by_model(self, blockchain_model: Blockchain) -> AsyncBlockchainFacade:
+        if not isinstance(blockchain_model, Blockchain):
+            raise ValueError("only support for Blockchain model, not {}".format(blockchain_model))
+        return self._registry.get_or_build(blockchain_model.chain_id, lambda: self._build_facade(blockchain_model),
+                                           blockchain_fingerprint(blockchain_model))
+
+    def _build_facade(self, blockchain_model: Blockchain) -> AsyncBlockchainFacade:
+        blockchain_facade = AsyncBlockchainFacade(blockchain_model.symbol,
+                                                  blockchain_model.vm_type,
+                                                  blockchain_model.rpc_url,
+                                                  blockchain_model.chain_id,
+                                                  blockchain_model.gas_price_wei)
+        return blockchain_facade
@@ -1,16 +1,23 @@
 # -*- coding: utf-8 -*-
-from typing import Generic, TypeVar
+from typing import Dict, Generic, TypeVar
 
 from izumi_infra.blockchain.conf import blockchain_settings
 from izumi_infra.blockchain.context import blockchainHolder, blockchainMetaHolder
+from izumi_infra.blockchain.context.blockchainContext import blockchain_fingerprint
 from izumi_infra.blockchain.facade.contractFacade import ContractFacade
 from izumi_infra.blockchain.models import Blockchain, Contract
 from izumi_infra.blockchain.types import ContractMeta
-from izumi_infra.utils.base_context import BaseContext
+from izumi_infra.utils.base_context import BaseContext, FacadeRegistry
 
 
 F = TypeVar('F')
 
+def contract_fingerprint(contract_model: Contract):
+    """
+    fields facade built from with its chain, chain changed in other process rebuilt too
+    """
+    return (contract_model.type, contract_model.contract_address, contract_model.chain_id, blockchain_fingerprint(contract_model.chain))
+
 class BaseContractContext(BaseContext, Generic[F]):
     def get_contract_type(self) -> str:
         pass
@@ -23,40 +30,53 @@ class BaseContractContext(BaseContext, Generic[F]):
                 self.get_contract_type(), contract_model.type)
             )
 
-        if contract_model.id in self._instances: return self._instances[contract_model.id]
-        instance = self._instances.setdefault(contract_model.id, self._build_facade(contract_model))
-        return instance
+        return self._registry.get_or_build(contract_model.id, lambda: self._build_facade(contract_model),
+                                           contract_fingerprint(contract_model))
 
     def _build_facade(self, contract_model: Contract) -> F:
         pass
 
 class ContractContext(BaseContext):
     """
-    Contract ability facade context
+    Contract ability facade context, facade of ad-hoc meta or (chain, address) kept in bounded LRU
     """
 
+    def __init__(self):
+        super().__init__()
+        self._info_registry = FacadeRegistry(blockchain_settings.CONTRACT_INFO_FACADE_CACHE_SIZE)
+
     def get_facade_by_model(self, contract_model: Contract) -> ContractFacade:
         if not isinstance(contract_model, Contract):
             raise ValueError("only support for Blockchain model, not {}".format(contract_model))
-        if contract_model.id in self._instances:
-            return self._instances[contract_model.id]
-
-        instance = self._instances.setdefault(contract_model.id, self._build_facade(contract_model))
-        return instance
+        return self._registry.get_or_build(contract_model.id, lambda: self._build_facade(contract_model),
+                                           contract_fingerprint(contract_model))
 
     def get_facade_by_meta(self, contractMeta: ContractMeta) -> ContractFacade:
         contract_key = '{}-{}'.format(contractMeta['chainMeta']['id'], contractMeta['address'])
-        if contract_key in self._instances: return self._instances[contract_key]
-
-        instance = self._instances.setdefault(contract_key, self._simple_build_facade(contractMeta))
-        return instance
+        return self._info_registry.get_or_build(contract_key, lambda: self._simple_build_facade(contractMeta), contractMeta['abi'])
 
     def get_facade_by_info(self, blockchain_model: Blockchain, contract_addr: str, contract_abi: str) -> ContractFacade:
         contract_key = '{}-{}'.format(blockchain_model.chain_id, contract_addr)
-        if contract_key in self._instances: return self._instances[contract_key]
+        return self._info_registry.get_or_build(contract_key,
+                                                lambda: self._simple_info_build_facade(blockchain_model, contract_addr, contract_abi),
+                                                (contract_abi, blockchain_fingerprint(blockchain_model)))
+
+    def invalidate_chain(self, chain_id: int) -> None:
+        """
+        drop contract facades built on blockchain facade of chain_id
+        """
+        self._registry.invalidate_where(lambda _, facade: facade.blockchainFacade.chain_id == chain_id)
+        self._info_registry.invalidate_where(lambda _, facade: facade.blockchainFacade.chain_id == chain_id)
+
+    def get_context_size(self):
+        return self._registry.size() + self._info_registry.size()
 
-        instance = self._instances.setdefault(contract_key, self._simple_info_build_facade(blockchain_model, contract_addr, contract_abi))
-        return instance
+    def clear_context(self):
+        self._registry.clear()
+        self._info_registry.clear()
+
+    def get_info_metrics(self) -> Dict[str, int]:
+        return self._info_registry.get_metrics()
 
     def _build_facade(self, contract_model: Contract) -> ContractFacade:
         contract_abi_json_str = blockchain_settings.CONTRACT_CHOICES_CLASS[contract_model.type].abi
@@ -85,10 +105,7 @@ class ContractSimpleContext(BaseContext):
     """
     def get_facade_by_meta(self, contractMeta: ContractMeta) -> ContractFacade:
         contract_key = '{}-{}'.format(contractMeta['chainMeta']['id'], contractMeta['address'])
-        if contract_key in self._instances: return self._instances[contract_key]
-
-        instance = self._instances.setdefault(contract_key, self._simple_build_facade(contractMeta))
-        return instance
+        return self._registry.get_or_build(contract_key, lambda: self._simple_build_facade(contractMeta), contractMeta['abi'])
 
     def _simple_build_facade(self, contractMeta: ContractMeta) -> ContractFacade:
         blockchain_facade = blockchainMetaHolder.get_facade_by_meta(contractMeta['chainMeta'])
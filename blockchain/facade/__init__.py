@@ -1,11 +1,12 @@
 # -*- coding: utf-8 -*-
 from izumi_infra.blockchain.facade.blockchainFacade import BlockchainFacade
+from izumi_infra.blockchain.facade.asyncBlockchainFacade import AsyncBlockchainFacade
 from izumi_infra.blockchain.facade.contractFacade import ContractFacade
 from izumi_infra.blockchain.facade.accountFacade import AccountFacade
 from izumi_infra.blockchain.facade.uniswapPoolFacade import UniswapPoolFacade
 from izumi_infra.blockchain.facade.uniswapTokenFacade import UniswapTokenHourDataFacade, UniswapTokenPriceFacade
 
-__all__ = ['BlockchainFacade', 'ContractFacade', 'AccountFacade', 'tokenHolder', 'uniswapPoolHolder', 'uniswapTokenPriceHolder']
+__all__ = ['BlockchainFacade', 'AsyncBlockchainFacade', 'ContractFacade', 'AccountFacade', 'tokenHolder', 'uniswapPoolHolder', 'uniswapTokenPriceHolder']
 
 tokenHolder = UniswapTokenHourDataFacade()
 uniswapPoolHolder = UniswapPoolFacade()
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from typing import Any, Awaitable, Coroutine, Dict, Iterable, List, Set, Tuple, TypeVar
+from weakref import WeakKeyDictionary
+
+from eth_typing.encoding import HexStr
+from web3 import Web3
+from web3.eth import AsyncEth
+from web3.middleware import async_geth_poa_middleware
+from web3.types import BlockData, CallOverrideParams, LogReceipt, TxData, TxParams, TxReceipt
+
+from izumi_infra.blockchain.block_header_cache import blockHeaderHolder
+from izumi_infra.blockchain.block_window import (AdaptiveBlockWindow,
+                                                 blockWindowHolder,
+                                                 is_window_overflow_error)
+from izumi_infra.blockchain.conf import blockchain_settings
+from izumi_infra.blockchain.rate_limiter import rateLimiterHolder
+from izumi_infra.blockchain.rpc_metrics import rpcMetricsHolder
+from izumi_infra.blockchain.constants import BlockChainVmEnum
+from izumi_infra.blockchain.utils import is_transaction_to
+from izumi_infra.etherscan.conf import etherscan_settings
+from izumi_infra.utils.async_utils import EventLoopThread
+from izumi_infra.utils.exceptions import NoEntriesFound
+from izumi_infra.utils.web3.async_http_provider import (PooledAsyncHTTPProvider,
+                                                        async_attrdict_middleware)
+from izumi_infra.utils.web3.exception_log_middleware import async_rpc_exception_log_middleware
+from izumi_infra.utils.web3.multi_endpoint_provider import parse_rpc_url_list
+from izumi_infra.utils.web3.rate_limit_middleware import build_async_rate_limit_middleware
+from izumi_infra.utils.web3.rpc_metrics_middleware import build_async_rpc_metrics_middleware
+
+T = TypeVar('T')
+
+# event loop of sync entry run, connection pool of each facade kept in it between calls
+asyncRpcLoop = EventLoopThread('InfraAsyncRpcLoop')
+
+class AsyncBlockchainFacade():
+    """
+    Asyncio blockchain ability implement, same method surface as BlockchainFacade in coroutine,
+    all requests of one event loop share a bounded connection pool, fan-out bounded by ASYNC_RPC_MAX_CONCURRENCY
+    """
+
+    def __init__(self, chain_symbol: str, vm_type: str, rpc_url: str, chain_id: int, gas_price_wei: int) -> None:
+        self.chain_symbol = chain_symbol
+        self.vm_type = vm_type
+        self.rpc_url = rpc_url
+        self.rpc_url_list = parse_rpc_url_list(rpc_url)
+        self.chain_id = chain_id
+        self.gas_price_wei = gas_price_wei
+        # event loop: semaphore of fan-out request
+        self._semaphores: WeakKeyDictionary = WeakKeyDictionary()
+
+        if vm_type == BlockChainVmEnum.EVM:
+            self.provider = PooledAsyncHTTPProvider(
+                self.rpc_url_list,
+                blockchain_settings.WEB3_HTTP_RPC_TIMEOUT,
+                blockchain_settings.ASYNC_RPC_MAX_CONNECTIONS,
+                max_retry=blockchain_settings.RPC_MAX_RETRY,
+                retry_backoff_sec=blockchain_settings.RPC_RETRY_BACKOFF_SEC,
+                circuit_failure_threshold=blockchain_settings.RPC_CIRCUIT_FAILURE_THRESHOLD,
+                circuit_open_seconds=blockchain_settings.RPC_CIRCUIT_OPEN_SECONDS,
+                latency_window=blockchain_settings.RPC_LATENCY_WINDOW)
+            self.w3 = Web3(self.provider, modules={'eth': (AsyncEth,)}, middlewares=[])
+            self.w3.middleware_onion.inject(async_attrdict_middleware, layer=0)
+            self.w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+            self.w3.middleware_onion.inject(async_rpc_exception_log_middleware, layer=0)
+            self.rate_limiter = rateLimiterHolder.get_limiter(chain_id)
+            if self.rate_limiter is not None:
+                self.w3.middleware_onion.inject(build_async_rate_limit_middleware(self.rate_limiter), name='rate_limit', layer=0)
+            # innermost, rate limit wait not observed
+            if rpcMetricsHolder.is_enabled():
+                self.w3.middleware_onion.inject(build_async_rpc_metrics_middleware(chain_id, rpcMetricsHolder), name='rpc_metrics', layer=0)
+        else:
+            raise NoEntriesFound("No matching entries for '{}'".format(chain_symbol))
+
+    def run(self, coroutine: Coroutine[None, None, T]) -> T:
+        """
+        Run coroutine in shared event loop thread from sync code, connection pool kept for next run
+        """
+        return asyncRpcLoop.run(coroutine)
+
+    async def _bounded(self, awaitable: Awaitable[T]) -> T:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(blockchain_settings.ASYNC_RPC_MAX_CONCURRENCY)
+        async with semaphore:
+            return await awaitable
+
+    async def close(self) -> None:
+        await self.provider.close()
+
+    async def get_latest_block_number(self) -> int:
+        return await self.w3.eth.block_number
+
+    async def get_event_logs(self, from_block: int, to_block: int, contract_address: str, topics: List[HexStr]) -> List[LogReceipt]:
+        return await self.get_all_event_logs(from_block, to_block, [contract_address], topics)
+
+    async def get_all_event_logs(self, from_block: int, to_block: int, contract_addr_list: List[str], topics: List[HexStr]) -> List[LogReceipt]:
+        """
+        Get logs of [from_block, to_block], ETH_MAX_SCAN_BLOCK windows requested concurrently
+        """
+        if etherscan_settings.ENABLE_ADAPTIVE_SCAN_BLOCK:
+            return await self.get_all_event_logs_adaptive(from_block, to_block, contract_addr_list, topics)
+
+        window = etherscan_settings.ETH_MAX_SCAN_BLOCK
+        event_logs_list = await asyncio.gather(*[
+            self._bounded(self._get_logs(start, min(start + window - 1, to_block), contract_addr_list, topics))
+            for start in range(from_block, to_block + 1, window)
+        ])
+        return [log for event_logs in event_logs_list for log in event_logs]
+
+    async def get_all_event_logs_adaptive(self, from_block: int, to_block: int, contract_addr_list: List[str], topics: List[HexStr],
+                                          window: int = None) -> List[LogReceipt]:
+        """
+        Get logs of [from_block, to_block] by windows requested concurrently, window learned same as BlockchainFacade
+        and shared with it, rejected window split by shrunk window and retried.
+        """
+        window_key = AdaptiveBlockWindow.build_key(self.chain_id, contract_addr_list)
+        window = window or blockWindowHolder.get(window_key)
+        event_logs_list = await asyncio.gather(*[
+            self._get_window_logs_adaptive(window_key, start, min(start + window - 1, to_block), contract_addr_list, topics)
+            for start in range(from_block, to_block + 1, window)
+        ])
+        return [log for event_logs in event_logs_list for log in event_logs]
+
+    async def _get_window_logs_adaptive(self, window_key: str, from_block: int, to_block: int,
+                                        contract_addr_list: List[str], topics: List[HexStr]) -> List[LogReceipt]:
+        span = to_block - from_block + 1
+        try:
+            event_logs = await self._bounded(self._get_logs(from_block, to_block, contract_addr_list, topics))
+        except Exception as e:
+            if span <= etherscan_settings.ETH_ADAPTIVE_MIN_SCAN_BLOCK or not is_window_overflow_error(e): raise e
+            new_window = blockWindowHolder.shrink(window_key, span)
+            return await self.get_all_event_logs_adaptive(from_block, to_block, contract_addr_list, topics, new_window)
+
+        # tail span shorter than learned window not tested the window
+        if span == blockWindowHolder.get(window_key) and len(event_logs) < etherscan_settings.ETH_ADAPTIVE_GROW_LOGS_THRESHOLD:
+            blockWindowHolder.grow(window_key, span)
+        return event_logs
+
+    async def gather_event_logs(self, query_list: List[Tuple[int, int, List[str], List[HexStr]]]) -> List[Any]:
+        """
+        Get logs of many (from_block, to_block, contract_addr_list, topics) queries concurrently,
+        return logs or exception by query order
+        """
+        return await asyncio.gather(*[self.get_all_event_logs(*q) for q in query_list], return_exceptions=True)
+
+    async def _get_logs(self, from_block: int, to_block: int, contract_addr_list: List[str], topics: List[HexStr]) -> List[LogReceipt]:
+        return await self.w3.eth.get_logs({
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': contract_addr_list,
+            'topics': [topics]
+        })
+
+    async def get_full_block_info_by_id(self, block_id: int) -> BlockData:
+        full_block_info = await self.w3.eth.get_block(block_id, full_transactions=True)
+        blockHeaderHolder.set_many(self.chain_id, {full_block_info.number: full_block_info.timestamp})
+        return full_block_info
+
+    async def get_full_block_infos(self, block_ids: Iterable[int]) -> List[BlockData]:
+        """
+        Get full blocks concurrently, return by block_ids order
+        """
+        return await asyncio.gather(*[self._bounded(self.get_full_block_info_by_id(b)) for b in block_ids])
+
+    async def get_transactions_by_to_set(self, from_block: int, to_block: int, to_set: Set[str]) -> List[TxData]:
+        """
+        Get transactions of [from_block, to_block) sent to to_set
+        """
+        block_range = range(min(from_block, to_block), max(from_block, to_block))
+        to_lower_set = set(a.lower() for a in to_set)
+        full_block_info_list = await self.get_full_block_infos(block_range)
+        return [t for b in full_block_info_list for t in b.transactions if is_transaction_to(t, to_lower_set)]
+
+    async def get_transaction_by_tx_hash(self, tx_hash: str) -> TxData:
+        return await self.w3.eth.get_transaction(tx_hash)
+
+    async def get_transaction_receipt_by_tx_hash(self, tx_hash: str) -> TxReceipt:
+        return await self.w3.eth.get_transaction_receipt(tx_hash)
+
+    async def call(self, transaction: TxParams, block_identifier: Any = 'latest', state_override: CallOverrideParams = None) -> bytes:
+        return await self.w3.eth.call(transaction, block_identifier, state_override)
+
+    async def get_block_timestamps(self, block_ids: Iterable[int], finalized_block_id: int = None) -> Dict[int, int]:
+        """
+        Get block timestamp by header cache, missing block fetched concurrently without transactions
+        """
+        block_id_set = set(block_ids)
+        block_timestamps = blockHeaderHolder.get_many(self.chain_id, block_id_set)
+
+        missing_block_ids = sorted(block_id_set.difference(block_timestamps.keys()))
+        block_info_list = await asyncio.gather(*[self._bounded(self.w3.eth.get_block(b)) for b in missing_block_ids])
+        fetched_timestamps = {b.number: b.timestamp for b in block_info_list}
+
+        blockHeaderHolder.set_many(self.chain_id, fetched_timestamps, finalized_block_id)
+        block_timestamps.update(fetched_timestamps)
+        return block_timestamps
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import Dict, List, Tuple
+
+from django.utils import timezone
+from eth_utils import to_checksum_address
+
+from izumi_infra.blockchain.conf import blockchain_settings
+from izumi_infra.blockchain.constants import BalanceSnapshotItemStatusEnum, BalanceSnapshotStatusEnum
+from izumi_infra.blockchain.facade.erc20Facade import get_erc20_raw_balances
+from izumi_infra.blockchain.models import BalanceSnapshot, BalanceSnapshotItem
+from izumi_infra.utils.collection_utils import chunks
+from izumi_infra.utils.db_utils import DjangoDbConnSafeThreadPoolExecutor, order_chunked_iterator
+
+logger = logging.getLogger(__name__)
+
+def create_balance_snapshot(name: str, chain_id: int, block_number: int, token_addr_list: List[str], account_addr_list: List[str]) -> BalanceSnapshot:
+    """
+    Create snapshot with INITIAL item of each (token, account), snapshot of same name reused and missing item added,
+    so call again with same args after crash is safe
+    """
+    snapshot, _ = BalanceSnapshot.objects.get_or_create(name=name, defaults={'chain_id': chain_id, 'block_number': block_number})
+    if snapshot.chain_id != chain_id or snapshot.block_number != block_number:
+        raise ValueError(f'balance snapshot {name} exist at {snapshot.chain_id}, {snapshot.block_number}')
+
+    token_addr_list = list(dict.fromkeys(to_checksum_address(t) for t in token_addr_list))
+    account_addr_list = list(dict.fromkeys(to_checksum_address(a) for a in account_addr_list))
+    pair_list = [(t, a) for t in token_addr_list for a in account_addr_list]
+    for pair_chunk in chunks(pair_list, blockchain_settings.BALANCE_SNAPSHOT_CHUNK_SIZE):
+        BalanceSnapshotItem.objects.bulk_create([BalanceSnapshotItem(snapshot=snapshot, token_address=t, account_address=a) for t, a in pair_chunk],
+                                                ignore_conflicts=True)
+    if snapshot.status == BalanceSnapshotStatusEnum.FINISHED and _has_unfinished_item(snapshot):
+        BalanceSnapshot.objects.filter(id=snapshot.id).update(status=BalanceSnapshotStatusEnum.INITIAL)
+        snapshot.status = BalanceSnapshotStatusEnum.INITIAL
+    return snapshot
+
+def run_balance_snapshot(snapshot: BalanceSnapshot) -> Dict[str, int]:
+    """
+    Fetch balanceOf of unfinished item at snapshot block by multicall, BALANCE_SNAPSHOT_CHUNK_SIZE item per task,
+    BALANCE_SNAPSHOT_MAX_WORKERS task concurrently, each task result persisted once done.
+    Rerun continue from INITIAL and FAIL item, snapshot FINISHED when all item SUCCESS. Return item count of this run.
+    """
+    unfinished_query = BalanceSnapshotItem.objects.filter(snapshot=snapshot).exclude(status=BalanceSnapshotItemStatusEnum.SUCCESS)
+    success_count, fail_count = 0, 0
+    with DjangoDbConnSafeThreadPoolExecutor(max_workers=blockchain_settings.BALANCE_SNAPSHOT_MAX_WORKERS,
+                                            thread_name_prefix='InfraBalanceSnapshot') as e:
+        future_list = [e.submit(_fetch_balance_snapshot_items, snapshot, list(item_list))
+                       for item_list in order_chunked_iterator(unfinished_query, chunk_size=blockchain_settings.BALANCE_SNAPSHOT_CHUNK_SIZE)
+                       if item_list]
+        for future in future_list:
+            try:
+                chunk_success_count, chunk_fail_count = future.result()
+            except Exception as ex:
+                # item stay INITIAL, fetched by next run
+                logger.exception(ex)
+                continue
+            success_count += chunk_success_count
+            fail_count += chunk_fail_count
+
+    if not _has_unfinished_item(snapshot):
+        BalanceSnapshot.objects.filter(id=snapshot.id).update(status=BalanceSnapshotStatusEnum.FINISHED)
+        snapshot.status = BalanceSnapshotStatusEnum.FINISHED
+    else:
+        logger.warn(f'balance snapshot {snapshot.name} unfinished, run again to continue')
+    return {'success': success_count, 'fail': fail_count}
+
+def _fetch_balance_snapshot_items(snapshot: BalanceSnapshot, item_list: List[BalanceSnapshotItem]) -> Tuple[int, int]:
+    raw_balance_list = get_erc20_raw_balances(snapshot.chain_id, [(i.token_address, i.account_address) for i in item_list], snapshot.block_number)
+    # bulk_update skip auto_now of update_time
+    update_time = timezone.now()
+    for item, raw_balance in zip(item_list, raw_balance_list):
+        item.update_time = update_time
+        if raw_balance is None:
+            item.status = BalanceSnapshotItemStatusEnum.FAIL
+        else:
+            item.balance = str(raw_balance)
+            item.status = BalanceSnapshotItemStatusEnum.SUCCESS
+    BalanceSnapshotItem.objects.bulk_update(item_list, ['balance', 'status', 'update_time'])
+    fail_count = sum(1 for b in raw_balance_list if b is None)
+    return len(item_list) - fail_count, fail_count
+
+def _has_unfinished_item(snapshot: BalanceSnapshot) -> bool:
+    return BalanceSnapshotItem.objects.filter(snapshot=snapshot).exclude(status=BalanceSnapshotItemStatusEnum.SUCCESS).exists()
+
+def get_balance_snapshot_balances(snapshot: BalanceSnapshot, token_addr: str) -> Dict[str, int]:
+    """
+    {account_addr: balance without decimals} of SUCCESS item of token
+    """
+    item_query = BalanceSnapshotItem.objects.filter(snapshot=snapshot, token_address=to_checksum_address(token_addr),
+                                                    status=BalanceSnapshotItemStatusEnum.SUCCESS)
+    return {account_addr: int(balance) for account_addr, balance in item_query.values_list('account_address', 'balance')}
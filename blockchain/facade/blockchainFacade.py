@@ -1,20 +1,68 @@
 # -*- coding: utf-8 -*-
-from typing import List, Set, Type
+import contextvars
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple, Type
 
+from cachetools import LRUCache
+from eth_abi import decode_abi, encode_abi
 from eth_typing.encoding import HexStr
+from eth_utils import (function_signature_to_4byte_selector, is_dict,
+                       to_checksum_address)
+from hexbytes import HexBytes
 from web3 import Web3
+from web3._utils.method_formatters import (get_error_formatters,
+                                           get_null_result_formatters,
+                                           get_request_formatters,
+                                           get_result_formatters)
 from web3.contract import Contract
+from web3.datastructures import AttributeDict
+from web3.exceptions import ContractLogicError
 from web3.middleware import geth_poa_middleware
-from web3.types import TxData, TxReceipt
+from web3.middleware.geth_poa import geth_poa_cleanup
+from web3.module import apply_result_formatters
+from web3.types import BlockData, LogReceipt, TxData, TxParams, TxReceipt
 
+from izumi_infra.blockchain.block_header_cache import blockHeaderHolder
+from izumi_infra.blockchain.block_window import (AdaptiveBlockWindow,
+                                                 blockWindowHolder,
+                                                 is_window_overflow_error)
 from izumi_infra.blockchain.conf import blockchain_settings
+from izumi_infra.blockchain.rate_limiter import rateLimiterHolder
+from izumi_infra.blockchain.rpc_metrics import rpcMetricsHolder
+from izumi_infra.blockchain.rpc_response_cache import rpcResponseCacheHolder
 from izumi_infra.blockchain.constants import BlockChainVmEnum
 from izumi_infra.blockchain.types import ContractMeta
+from izumi_infra.blockchain.utils import is_transaction_to
 from izumi_infra.etherscan.conf import etherscan_settings
+from izumi_infra.utils.abi_registry import abiRegistry
 from izumi_infra.utils.collection_utils import chunks
 from izumi_infra.utils.exceptions import NoEntriesFound
 from izumi_infra.utils.web3.exception_log_middleware import rpc_exception_log_middleware
+from izumi_infra.utils.web3.multi_endpoint_provider import (MultiEndpointHTTPProvider,
+                                                            is_idempotent_read,
+                                                            parse_rpc_url_list)
+from izumi_infra.utils.web3.rate_limit_middleware import build_rate_limit_middleware
+from izumi_infra.utils.web3.response_cache_middleware import build_response_cache_middleware
+from izumi_infra.utils.web3.rpc_metrics_middleware import build_rpc_metrics_middleware
 
+logger = logging.getLogger(__name__)
+
+# transaction hash to from address, key: (chain_id, tx_hash)
+_tx_from_cache = LRUCache(maxsize=blockchain_settings.TX_FROM_CACHE_SIZE)
+_tx_from_cache_lock = Lock()
+
+# result cleaned by geth_poa_middleware in single request
+_POA_RESULT_METHODS = {'eth_getBlockByNumber', 'eth_getBlockByHash'}
+
+_MULTICALL3_AGGREGATE3_SELECTOR = function_signature_to_4byte_selector('aggregate3((address,bool,bytes)[])')
+# head and offset of one (address,bool,bytes) in aggregate3 calldata
+_MULTICALL3_CALL_OVERHEAD_BYTES = 7 * 32
 
 class BlockchainFacade():
     """
@@ -25,13 +73,35 @@ class BlockchainFacade():
         self.chain_symbol = chain_symbol
         self.vm_type = vm_type
         self.rpc_url = rpc_url
+        self.rpc_url_list = parse_rpc_url_list(rpc_url)
         self.chain_id = chain_id
         self.gas_price_wei = gas_price_wei
+        # contract factory of w3 by abi hash
+        self._contract_factories: Dict[str, Type[Contract]] = {}
 
         if vm_type == BlockChainVmEnum.EVM:
-            self.w3 = Web3(Web3.HTTPProvider(self.rpc_url, request_kwargs={'timeout': blockchain_settings.WEB3_HTTP_RPC_TIMEOUT}))
+            self.w3 = Web3(MultiEndpointHTTPProvider(
+                self.rpc_url_list,
+                request_kwargs={'timeout': blockchain_settings.WEB3_HTTP_RPC_TIMEOUT},
+                max_retry=blockchain_settings.RPC_MAX_RETRY,
+                retry_backoff_sec=blockchain_settings.RPC_RETRY_BACKOFF_SEC,
+                circuit_failure_threshold=blockchain_settings.RPC_CIRCUIT_FAILURE_THRESHOLD,
+                circuit_open_seconds=blockchain_settings.RPC_CIRCUIT_OPEN_SECONDS,
+                latency_window=blockchain_settings.RPC_LATENCY_WINDOW,
+                enable_hedge=blockchain_settings.ENABLE_RPC_HEDGE,
+                hedge_min_delay_sec=blockchain_settings.RPC_HEDGE_MIN_DELAY_MS / 1000))
             self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
             self.w3.middleware_onion.inject(rpc_exception_log_middleware, layer=0)
+            # cache hit not take rate limit token, inject inner layer later
+            self.response_cache = rpcResponseCacheHolder.get_cache(chain_id) if blockchain_settings.ENABLE_RPC_RESPONSE_CACHE else None
+            if self.response_cache is not None:
+                self.w3.middleware_onion.inject(build_response_cache_middleware(self.response_cache), name='response_cache', layer=0)
+            self.rate_limiter = rateLimiterHolder.get_limiter(chain_id)
+            if self.rate_limiter is not None:
+                self.w3.middleware_onion.inject(build_rate_limit_middleware(self.rate_limiter), name='rate_limit', layer=0)
+            # innermost, cache hit and rate limit wait not observed
+            if rpcMetricsHolder.is_enabled():
+                self.w3.middleware_onion.inject(build_rpc_metrics_middleware(chain_id, rpcMetricsHolder), name='rpc_metrics', layer=0)
         else:
             raise NoEntriesFound("No matching entries for '{}'".format(chain_symbol))
 
@@ -39,7 +109,17 @@ class BlockchainFacade():
         return self.w3.isConnected()
 
     def init_contract(self, contract_address: str, abi_json_str: str) -> Type[Contract]:
-        return self.w3.eth.contract(address=contract_address, abi=abi_json_str)
+        return self.get_contract_factory(abi_json_str)(address=contract_address)
+
+    def get_contract_factory(self, abi_json_str: str) -> Type[Contract]:
+        """
+        Contract class of abi built once, abi parsed once by abiRegistry
+        """
+        abi_entry = abiRegistry.register(abi_json_str)
+        factory = self._contract_factories.get(abi_entry.abi_hash)
+        if factory is None:
+            factory = self._contract_factories.setdefault(abi_entry.abi_hash, self.w3.eth.contract(abi=abi_entry.abi))
+        return factory
 
     def get_latest_block_number(self) -> int:
         return self.w3.eth.block_number
@@ -50,45 +130,381 @@ class BlockchainFacade():
     # https://docs.alchemy.com/alchemy/guides/eth_getlogs#making-a-request-to-eth-get-logs
     # A note on specifying topic filters
     def get_all_event_logs(self, from_block: int, to_block: int, contract_addr_list: List[str], topics: List[HexStr]):
+        if etherscan_settings.ENABLE_ADAPTIVE_SCAN_BLOCK:
+            return self.get_all_event_logs_adaptive(from_block, to_block, contract_addr_list, topics)
+
         block_range_partition = list(chunks(range(from_block, to_block), etherscan_settings.ETH_MAX_SCAN_BLOCK))
         all_info = []
         if from_block == to_block: block_range_partition = [range(from_block, to_block)]
         for block_range in block_range_partition:
-            event_logs = self.w3.eth.get_logs({
-                'fromBlock': block_range.start,
-                'toBlock': block_range.stop,
-                'address': contract_addr_list,
-                'topics': [topics]
-            })
+            event_logs = self._get_logs(block_range.start, block_range.stop, contract_addr_list, topics)
+            all_info.extend(event_logs)
+
+        return all_info
+
+    def get_all_event_logs_adaptive(self, from_block: int, to_block: int, contract_addr_list: List[str], topics: List[HexStr]):
+        """
+        Get logs of [from_block, to_block] by window learned for this chain and address set,
+        halve and retry when provider reject the window, grow when response small.
+        """
+        window_key = AdaptiveBlockWindow.build_key(self.chain_id, contract_addr_list)
+        all_info = []
+        cursor = from_block
+        while cursor <= to_block:
+            window = blockWindowHolder.get(window_key)
+            window_stop = min(cursor + window - 1, to_block)
+            # tail span may be shorter than window
+            span = window_stop - cursor + 1
+            try:
+                event_logs = self._get_logs(cursor, window_stop, contract_addr_list, topics)
+            except Exception as e:
+                if span <= etherscan_settings.ETH_ADAPTIVE_MIN_SCAN_BLOCK or not is_window_overflow_error(e): raise e
+                blockWindowHolder.shrink(window_key, span)
+                continue
+
             all_info.extend(event_logs)
+            if span == window and len(event_logs) < etherscan_settings.ETH_ADAPTIVE_GROW_LOGS_THRESHOLD:
+                blockWindowHolder.grow(window_key, span)
+            cursor = window_stop + 1
 
         return all_info
 
+    def _get_logs(self, from_block: int, to_block: int, contract_addr_list: List[str], topics: List[HexStr]) -> List[LogReceipt]:
+        if blockchain_settings.ENABLE_RPC_STREAMING_RESPONSE:
+            return list(self.iter_event_logs(from_block, to_block, contract_addr_list, topics))
+        return self.w3.eth.get_logs({
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': contract_addr_list,
+            'topics': [topics]
+        })
+
+    def iter_event_logs(self, from_block: int, to_block: int, contract_addr_list: List[str], topics: List[HexStr]) -> Iterator[LogReceipt]:
+        """
+        Yield logs of [from_block, to_block] in one eth_getLogs parsed incrementally,
+        raw log out of address and topic filter dropped before formatted
+        """
+        params = get_request_formatters('eth_getLogs')([{
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': contract_addr_list,
+            'topics': [topics]
+        }])
+        address_set = set(a.lower() for a in contract_addr_list)
+        topic_set = set(HexBytes(t).hex() for t in topics)
+        for raw_log in self._make_stream_request('eth_getLogs', params, 'result.item'):
+            if address_set and raw_log['address'].lower() not in address_set: continue
+            if topic_set and (not raw_log['topics'] or raw_log['topics'][0].lower() not in topic_set): continue
+            yield self._format_batch_response('eth_getLogs', params, {'result': [raw_log]})[0]
+
     def get_full_block_info_by_id(self, block_id: int):
-        return self.w3.eth.get_block(block_id, full_transactions=True)
+        full_block_info = self.w3.eth.get_block(block_id, full_transactions=True)
+        blockHeaderHolder.set_many(self.chain_id, {full_block_info.number: full_block_info.timestamp})
+        return full_block_info
+
+    def iter_full_block_info(self, from_block: int, to_block: int) -> Iterator[BlockData]:
+        """
+        Yield full block of [from_block, to_block) by block order, fetched concurrently in bounded window
+        """
+        block_range = range(min(from_block, to_block), max(from_block, to_block))
+        max_workers = max(1, min(blockchain_settings.BLOCK_FETCH_MAX_WORKERS, len(block_range)))
+        block_id_iter = iter(block_range)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='InfraBlockFetch') as e:
+            for block_id in islice(block_id_iter, max_workers * 2):
+                pending.append(e.submit(contextvars.copy_context().run, self.get_full_block_info_by_id, block_id))
+
+            try:
+                while pending:
+                    full_block_info = pending.popleft().result()
+                    next_block_id = next(block_id_iter, None)
+                    if next_block_id is not None:
+                        pending.append(e.submit(contextvars.copy_context().run, self.get_full_block_info_by_id, next_block_id))
+                    yield full_block_info
+            finally:
+                for future in pending: future.cancel()
 
     def get_transactions_by_to_set(self, from_block: int, to_block: int, to_set: Set[str]) -> List[TxData]:
         """
         Get contract transactions
         """
-        block_range = range(min(from_block, to_block), max(from_block, to_block))
+        if blockchain_settings.ENABLE_RPC_STREAMING_RESPONSE:
+            return list(self.iter_transactions_by_to_set(from_block, to_block, to_set))
+
+        to_lower_set = set(a.lower() for a in to_set)
         transactions = []
-        for block_id in block_range:
-            full_block_info = self.get_full_block_info_by_id(block_id)
-            # timestamp???
-            transactions.extend(list(filter(lambda t: t['to'] in to_set, full_block_info.transactions)))
+        for full_block_info in self.iter_full_block_info(from_block, to_block):
+            transactions.extend(t for t in full_block_info.transactions if is_transaction_to(t, to_lower_set))
 
         return transactions
 
+    def iter_transactions_by_to_set(self, from_block: int, to_block: int, to_set: Set[str]) -> Iterator[TxData]:
+        """
+        Yield transactions of [from_block, to_block) sent to to_set by block order, full block parsed incrementally
+        and only matched transaction formatted, blocks fetched concurrently in bounded window
+        """
+        block_range = range(min(from_block, to_block), max(from_block, to_block))
+        to_lower_set = set(a.lower() for a in to_set)
+        max_workers = max(1, min(blockchain_settings.BLOCK_FETCH_MAX_WORKERS, len(block_range)))
+        block_id_iter = iter(block_range)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='InfraBlockStream') as e:
+            for block_id in islice(block_id_iter, max_workers * 2):
+                pending.append(e.submit(contextvars.copy_context().run, self._get_block_transactions_by_to_set, block_id, to_lower_set))
+
+            try:
+                while pending:
+                    transactions = pending.popleft().result()
+                    next_block_id = next(block_id_iter, None)
+                    if next_block_id is not None:
+                        pending.append(e.submit(contextvars.copy_context().run, self._get_block_transactions_by_to_set, next_block_id, to_lower_set))
+                    yield from transactions
+            finally:
+                for future in pending: future.cancel()
+
+    def _get_block_transactions_by_to_set(self, block_id: int, to_lower_set: Set[str]) -> List[TxData]:
+        params = [hex(block_id), True]
+        return [self._format_batch_response('eth_getTransactionByHash', params, {'result': raw_tx})
+                for raw_tx in self._make_stream_request('eth_getBlockByNumber', params, 'result.transactions.item')
+                if is_transaction_to(raw_tx, to_lower_set)]
+
+    def _make_stream_request(self, method: str, params: List[Any], item_prefix: str) -> Iterator[Any]:
+        """
+        Yield raw items of streaming response, rate limited and observed as single request
+        """
+        if self.rate_limiter is not None: self.rate_limiter.acquire(1)
+        error_class = None
+        start = time.monotonic()
+        try:
+            yield from self.w3.provider.make_stream_request(method, params, item_prefix)
+        except Exception as e:
+            error_class = type(e).__name__
+            raise
+        finally:
+            if rpcMetricsHolder.is_enabled():
+                endpoint_uri, response_bytes = self.w3.provider.get_last_request_info()
+                rpcMetricsHolder.observe(self.chain_id, endpoint_uri, method, time.monotonic() - start, response_bytes, error_class)
 
     def get_transaction_by_tx_hash(self, tx_hash: str) -> TxData:
         return self.w3.eth.get_transaction(tx_hash)
 
     def build_contract_from_meta(self, contactMeta: ContractMeta) -> Contract:
-        return self.w3.eth.contract(address=contactMeta['address'], abi=contactMeta['abi'])
+        return self.init_contract(contactMeta['address'], contactMeta['abi'])
 
     def build_contract(self, address: str, abi: str) -> Contract:
-        return self.w3.eth.contract(address=address, abi=abi)
+        return self.init_contract(address, abi)
 
     def get_transaction_receipt_by_tx_hash(self, tx_hash: str) -> TxReceipt:
         return self.w3.eth.get_transaction_receipt(tx_hash)
+
+    def _make_batch_request(self, method_params_list: List[Tuple[str, List[Any]]]) -> List[Dict]:
+        """
+        Send calls in one JSON-RPC batch, return raw response item by request order
+        """
+        request_data = [{'jsonrpc': '2.0', 'method': method, 'params': params, 'id': i}
+                        for i, (method, params) in enumerate(method_params_list)]
+        if self.rate_limiter is not None: self.rate_limiter.acquire(len(request_data))
+        is_idempotent = all(is_idempotent_read(method) for method, _ in method_params_list)
+        error_class = None
+        start = time.monotonic()
+        try:
+            raw_response = self.w3.provider.make_raw_request(json.dumps(request_data).encode('utf-8'), is_idempotent)
+            response_list = json.loads(raw_response)
+            if not isinstance(response_list, list):
+                raise ValueError(f'batch request fail: {response_list}')
+        except Exception as e:
+            error_class = type(e).__name__
+            raise
+        finally:
+            if rpcMetricsHolder.is_enabled():
+                endpoint_uri, response_bytes = self.w3.provider.get_last_request_info()
+                method_set = set(method for method, _ in method_params_list)
+                batch_method = f'batch:{method_set.pop()}' if len(method_set) == 1 else 'batch'
+                rpcMetricsHolder.observe(self.chain_id, endpoint_uri, batch_method, time.monotonic() - start, response_bytes, error_class)
+
+        id_to_response = {r.get('id'): r for r in response_list}
+        return [id_to_response.get(i, {'error': f'missing batch response id: {i}'}) for i in range(len(request_data))]
+
+    def _make_batch_request_concurrently(self, method_params_list: List[Tuple[str, List[Any]]]) -> List[Dict]:
+        """
+        Split calls to RPC_BATCH_SIZE batches and send concurrently, return raw response item by request order.
+        Immutable response served and stored by response cache if enabled.
+        """
+        if not method_params_list: return []
+        response_list: List[Dict] = [None] * len(method_params_list)
+        if self.response_cache is not None:
+            for i, (method, params) in enumerate(method_params_list):
+                response_list[i] = self.response_cache.get(method, params)
+        missing_index_list = [i for i, r in enumerate(response_list) if r is None]
+        if not missing_index_list: return response_list
+
+        method_params_chunks = list(chunks([method_params_list[i] for i in missing_index_list], blockchain_settings.RPC_BATCH_SIZE))
+        max_workers = min(blockchain_settings.RPC_BATCH_MAX_WORKERS, len(method_params_chunks))
+        fetched_list = []
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='InfraRpcBatch') as e:
+            # copied context keep rpc metrics tag of caller
+            future_list = [e.submit(contextvars.copy_context().run, self._make_batch_request, c) for c in method_params_chunks]
+            for future in future_list:
+                fetched_list.extend(future.result())
+
+        for i, response in zip(missing_index_list, fetched_list):
+            response_list[i] = response
+            if self.response_cache is not None:
+                method, params = method_params_list[i]
+                self.response_cache.put(method, params, response, self.get_latest_block_number)
+        return response_list
+
+    def batch_request(self, method_params_list: List[Tuple[str, List[Any]]], raise_on_error: bool = False) -> List[Any]:
+        """
+        Send calls by JSON-RPC batch of RPC_BATCH_SIZE, params and result formatted as web3 single request,
+        eg: [('eth_getTransactionByHash', [tx_hash]), ('eth_call', [{'to': addr, 'data': data}, 'latest'])].
+        Return result by request order, failed item as its exception unless raise_on_error.
+        """
+        formatted_params_list = [(method, get_request_formatters(method)(params)) for method, params in method_params_list]
+        response_list = self._make_batch_request_concurrently(formatted_params_list)
+
+        result_list = []
+        for (method, params), response in zip(formatted_params_list, response_list):
+            try:
+                result_list.append(self._format_batch_response(method, params, response))
+            except Exception as e:
+                if raise_on_error: raise e
+                result_list.append(e)
+        return result_list
+
+    def _format_batch_response(self, method: str, params: List[Any], response: Dict) -> Any:
+        if isinstance(response.get('error'), str): raise ValueError(response['error'])
+        if method in _POA_RESULT_METHODS and is_dict(response.get('result')):
+            response = {**response, 'result': geth_poa_cleanup(response['result'])}
+        result = self.w3.manager.formatted_response(response, params, get_error_formatters(method), get_null_result_formatters(method))
+        result = apply_result_formatters(get_result_formatters(method, self.w3.eth), result)
+        if is_dict(result): return AttributeDict.recursive(result)
+        if isinstance(result, list): return [AttributeDict.recursive(r) if is_dict(r) else r for r in result]
+        return result
+
+    def get_transactions_by_tx_hashes(self, tx_hash_list: List[str]) -> List[TxData]:
+        """
+        Batch version of get_transaction_by_tx_hash, return by tx_hash_list order
+        """
+        return self.batch_request([('eth_getTransactionByHash', [h]) for h in tx_hash_list], raise_on_error=True)
+
+    def get_transaction_receipts_by_tx_hashes(self, tx_hash_list: List[str]) -> List[TxReceipt]:
+        """
+        Batch version of get_transaction_receipt_by_tx_hash, return by tx_hash_list order
+        """
+        return self.batch_request([('eth_getTransactionReceipt', [h]) for h in tx_hash_list], raise_on_error=True)
+
+    def get_full_block_infos_by_ids(self, block_ids: Iterable[int]) -> List[BlockData]:
+        """
+        Batch version of get_full_block_info_by_id, return by block_ids order
+        """
+        full_block_info_list = self.batch_request([('eth_getBlockByNumber', [b, True]) for b in block_ids], raise_on_error=True)
+        blockHeaderHolder.set_many(self.chain_id, {b.number: b.timestamp for b in full_block_info_list})
+        return full_block_info_list
+
+    def call_batch(self, transaction_list: List[TxParams], block_identifier: Any = 'latest') -> List[Any]:
+        """
+        eth_call of transactions at same block by batch request, return bytes or exception of reverted call by order
+        """
+        return self.batch_request([('eth_call', [t, block_identifier]) for t in transaction_list])
+
+    def get_multicall3_address(self) -> str:
+        return blockchain_settings.MULTICALL3_ADDRESS_MAP.get(self.chain_id, blockchain_settings.MULTICALL3_ADDRESS)
+
+    def multicall(self, call_list: List[Tuple[str, Any]], block_identifier: Any = 'latest', gas_list: List[int] = None) -> List[Any]:
+        """
+        Calls of (to, data) at same block packed to Multicall3 aggregate3 eth_call with allowFailure,
+        chunked by MULTICALL_MAX_GAS of gas_list or MULTICALL_CALL_GAS per call and MULTICALL_MAX_CALLDATA_BYTES, chunks sent by batch request.
+        Return bytes or exception of failed call by order, chunk fallback to call_batch when aggregate3 fail, eg: block before multicall deployed.
+        """
+        if not call_list: return []
+        call_list = [(to_checksum_address(to), HexBytes(data)) for to, data in call_list]
+        multicall_address = self.get_multicall3_address()
+        if not multicall_address:
+            return self.call_batch([{'to': to, 'data': data.hex()} for to, data in call_list], block_identifier)
+
+        index_chunks = self._chunk_multicall(call_list, gas_list)
+        transaction_list = [{
+            'to': multicall_address,
+            'data': (_MULTICALL3_AGGREGATE3_SELECTOR + encode_abi(['(address,bool,bytes)[]'], [[(call_list[i][0], True, call_list[i][1]) for i in c]])).hex(),
+        } for c in index_chunks]
+        chunk_result_list = self.call_batch(transaction_list, block_identifier)
+
+        result_list = [None] * len(call_list)
+        for index_list, chunk_result in zip(index_chunks, chunk_result_list):
+            try:
+                if isinstance(chunk_result, Exception): raise chunk_result
+                (aggregate_result,) = decode_abi(['(bool,bytes)[]'], chunk_result)
+                if len(aggregate_result) != len(index_list): raise ValueError(f'aggregate3 result size mismatch: {len(aggregate_result)}')
+            except Exception as e:
+                logger.warn(f'multicall aggregate3 fail, fallback to call_batch: {self.chain_id}, {block_identifier}, {e}')
+                aggregate_result = None
+
+            if aggregate_result is None:
+                fallback_list = self.call_batch([{'to': call_list[i][0], 'data': call_list[i][1].hex()} for i in index_list], block_identifier)
+                for i, r in zip(index_list, fallback_list): result_list[i] = r
+                continue
+            for i, (success, return_data) in zip(index_list, aggregate_result):
+                result_list[i] = HexBytes(return_data) if success else ContractLogicError(f'execution reverted: {HexBytes(return_data).hex()}')
+        return result_list
+
+    def _chunk_multicall(self, call_list: List[Tuple[str, bytes]], gas_list: List[int] = None) -> List[List[int]]:
+        index_chunks = []
+        index_list, chunk_gas, chunk_bytes = [], 0, 0
+        for i, (_, data) in enumerate(call_list):
+            call_gas = gas_list[i] if gas_list else blockchain_settings.MULTICALL_CALL_GAS
+            call_bytes = _MULTICALL3_CALL_OVERHEAD_BYTES + len(data)
+            if index_list and (chunk_gas + call_gas > blockchain_settings.MULTICALL_MAX_GAS
+                               or chunk_bytes + call_bytes > blockchain_settings.MULTICALL_MAX_CALLDATA_BYTES):
+                index_chunks.append(index_list)
+                index_list, chunk_gas, chunk_bytes = [], 0, 0
+            index_list.append(i)
+            chunk_gas += call_gas
+            chunk_bytes += call_bytes
+        if index_list: index_chunks.append(index_list)
+        return index_chunks
+
+    def get_transaction_from_by_tx_hashes(self, tx_hash_list: List[str]) -> Dict[str, str]:
+        """
+        Get from address of transactions, return {tx_hash hex: from}.
+        Duplicated hash fetch once, by batch request concurrently and LRU cache.
+        """
+        tx_hash_set = set(HexBytes(h).hex() for h in tx_hash_list)
+        tx_from_dict = {}
+        with _tx_from_cache_lock:
+            for tx_hash in tx_hash_set:
+                from_address = _tx_from_cache.get((self.chain_id, tx_hash))
+                if from_address is not None: tx_from_dict[tx_hash] = from_address
+
+        missing_tx_hash_list = [h for h in tx_hash_set if h not in tx_from_dict]
+        response_list = self._make_batch_request_concurrently([('eth_getTransactionByHash', [h]) for h in missing_tx_hash_list])
+        for tx_hash, response in zip(missing_tx_hash_list, response_list):
+            if response.get('error') is not None or not response.get('result'):
+                raise ValueError(f'get transaction: {tx_hash} fail: {response}')
+            tx_from_dict[tx_hash] = to_checksum_address(response['result']['from'])
+
+        with _tx_from_cache_lock:
+            for tx_hash in missing_tx_hash_list:
+                _tx_from_cache[(self.chain_id, tx_hash)] = tx_from_dict[tx_hash]
+
+        return tx_from_dict
+
+    def get_block_timestamps(self, block_ids: Iterable[int], finalized_block_id: int = None) -> Dict[int, int]:
+        """
+        Get block timestamp by header cache, missing block fetch by batch eth_getBlockByNumber without transactions.
+        Block not greater than finalized_block_id will persist in cache.
+        """
+        block_id_set = set(block_ids)
+        block_timestamps = blockHeaderHolder.get_many(self.chain_id, block_id_set)
+
+        missing_block_ids = sorted(block_id_set.difference(block_timestamps.keys()))
+        response_list = self._make_batch_request_concurrently([('eth_getBlockByNumber', [hex(b), False]) for b in missing_block_ids])
+        fetched_timestamps = {}
+        for block_id, response in zip(missing_block_ids, response_list):
+            if response.get('error') is not None or not response.get('result'):
+                raise ValueError(f'get block: {block_id} fail: {response}')
+            fetched_timestamps[block_id] = int(response['result']['timestamp'], 16)
+
+        blockHeaderHolder.set_many(self.chain_id, fetched_timestamps, finalized_block_id)
+        block_timestamps.update(fetched_timestamps)
+        return block_timestamps
@@ -3,17 +3,18 @@ import json
 import logging
 from typing import Dict, List, Set, Tuple, Type, TypeVar
 
-import eth_event
 from eth_typing.encoding import HexStr
 from eth_utils import encode_hex, event_abi_to_log_topic
 from hexbytes import HexBytes
+from web3.contract import Contract
 from web3.datastructures import AttributeDict
 from web3.types import EventData, TxData, TxReceipt
 
 from izumi_infra.blockchain.constants import ZERO_ADDRESS
 from izumi_infra.blockchain.facade import BlockchainFacade
-from izumi_infra.utils.collection_utils import merge_dict_in_list, tuple_to_typedict
-from izumi_infra.utils.eth_utils import covert_decode_log_to_event
+from izumi_infra.utils.abi_decoder import abiDecoderRegistry
+from izumi_infra.utils.abi_registry import abiRegistry
+from izumi_infra.utils.collection_utils import tuple_to_typedict
 
 logger = logging.getLogger(__name__)
 
@@ -33,15 +34,34 @@ class ContractFacade():
         self.abi_json_str = contract_abi_json_str
         self.contract_address = contract_address
 
-        # TODO valid contract_address
-        # zero as fake contact only use abi and blockchain ability
-        if not contract_address ==  ZERO_ADDRESS:
-            self.contract = self.blockchainFacade.init_contract(self.contract_address, self.abi_json_str)
-        # build all event name to topic mapping
-        self.topic_name_to_topic_mapping = merge_dict_in_list(ContractFacade.build_all_event_topic(self.abi_json_str))
-        self.topic_to_topic_name_mapping = {v: k for k, v in self.topic_name_to_topic_mapping.items()}
+        self._contract = None
+        # parsed abi and event name to topic mapping shared by facades of same abi, should not be modified
+        self.abi_entry = abiRegistry.register(self.abi_json_str)
+        self.topic_name_to_topic_mapping = self.abi_entry.topic_name_to_topic
+        self.topic_to_topic_name_mapping = self.abi_entry.topic_to_topic_name
 
-        self.topic_map = eth_event.get_topic_map(json.loads(self.abi_json_str))
+        # decoder compiled once per abi and topic/selector
+        self.abi_hash = self.abi_entry.abi_hash
+        self._selector_to_function = {}
+
+    @property
+    def contract(self) -> Contract:
+        """
+        web3 contract built on first use, zero address as fake contact only use abi and blockchain ability
+        """
+        # TODO valid contract_address
+        if self._contract is None:
+            if self.contract_address == ZERO_ADDRESS:
+                raise AttributeError("no contract of zero address facade")
+            self._contract = self.blockchainFacade.init_contract(self.contract_address, self.abi_json_str)
+        return self._contract
+
+    @property
+    def topic_map(self) -> Dict:
+        """
+        eth_event topic map of abi
+        """
+        return self.abi_entry.topic_map
 
     def is_connected(self) -> bool:
         """
@@ -49,13 +69,6 @@ class ContractFacade():
         """
         return self.blockchainFacade.is_connected()
 
-    @staticmethod
-    def build_all_event_topic(abi_json_str):
-        event_abi_list = list(filter(lambda a: a['type'] == 'event', json.loads(abi_json_str)))
-        topic_list = list(map(lambda e: { e['name'] : encode_hex(event_abi_to_log_topic({'name': e['name'], 'inputs': e['inputs']})) },
-                              event_abi_list))
-        return topic_list
-
     @staticmethod
     def build_event_topic(abi_json_str: str, topic_name) -> HexStr:
         """
@@ -82,43 +95,59 @@ class ContractFacade():
         Get event by topics limit with block_id in [from_block, to_block].
         topic_name_list, default all if missing
         """
+        return self.blockchainFacade.get_all_event_logs(*self.build_event_logs_query(from_block, to_block, topic_name_list, addr_set))
+
+    def build_event_logs_query(self, from_block: int, to_block: int, topic_name_list: List[str],
+                               addr_set: Set[str] = None) -> Tuple[int, int, List[str], List[HexStr]]:
+        """
+        return get_all_event_logs args of get_event_logs_by_name
+        """
         if topic_name_list:
             topics = list(filter(lambda t: t, map(lambda t: self.topic_name_to_topic_mapping.get(t), topic_name_list)))
         else:
             topics = list(self.topic_name_to_topic_mapping.values())
 
         if addr_set:
-            return self.blockchainFacade.get_all_event_logs(from_block, to_block, list(addr_set), topics)
+            return from_block, to_block, list(addr_set), topics
         else:
             filter_contract = [] if self.contract_address.lower() == ZERO_ADDRESS else [self.contract_address]
-            return self.blockchainFacade.get_all_event_logs(from_block, to_block, filter_contract, topics)
+            return from_block, to_block, filter_contract, topics
 
     def get_contract_transactions(self, from_block: int, to_block: int) -> List[TxData]:
         """
         Get contract transactions
         """
-        block_range = range(min(from_block, to_block), max(from_block, to_block))
-        transactions = []
-        for block_id in block_range:
-            full_block_info = self.blockchainFacade.get_full_block_info_by_id(block_id)
-            transactions.extend(list(filter(lambda t: t['to'] == self.contract_address, full_block_info.transactions)))
-
-        return transactions
+        return self.blockchainFacade.get_transactions_by_to_set(from_block, to_block, {self.contract_address})
 
     def decode_event_log(self, event_log: AttributeDict):
-        decode_log = eth_event.decode_log(event_log, self.topic_map)
-        event_data = covert_decode_log_to_event(decode_log)
+        return abiDecoderRegistry.decode_event_log(self.abi_hash, event_log)
 
-        return event_data
+    def decode_event_logs(self, event_logs: List[AttributeDict]) -> List[Dict]:
+        return abiDecoderRegistry.decode_event_logs(self.abi_hash, event_logs)
 
     def decode_trans_input(self, input_raw_data: HexStr):
-        return self.contract.decode_function_input(input_raw_data)
+        """
+        same as contract.decode_function_input, return (ContractFunction, params)
+        """
+        fn_decoder, params = abiDecoderRegistry.decode_function_input(self.abi_hash, input_raw_data)
+        return self._get_function_by_decoder(fn_decoder), params
+
+    def decode_trans_inputs(self, input_raw_data_list: List[HexStr]) -> List[Tuple[object, Dict]]:
+        fn_input_list = abiDecoderRegistry.decode_function_inputs(self.abi_hash, input_raw_data_list)
+        return [(self._get_function_by_decoder(d), params) for d, params in fn_input_list]
+
+    def _get_function_by_decoder(self, fn_decoder):
+        func = self._selector_to_function.get(fn_decoder.selector)
+        if func is None:
+            func = self.contract.get_function_by_selector(fn_decoder.selector)
+            self._selector_to_function[fn_decoder.selector] = func
+        return func
 
     def find_fn_trans_input(self, input_raw_data: HexStr, target_fn_name: str, type_class: Type[T]) -> T:
         """
         support multicall(bytes[])
         """
-        input_data = self.contract.decode_function_input(input_raw_data)
+        input_data = self.decode_trans_input(input_raw_data)
         fn_name: str = input_data[0].fn_name
         input_param: Dict = input_data[1]
         if fn_name == target_fn_name:
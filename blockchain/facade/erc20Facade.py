@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 import logging
+from typing import Any, Dict, List, Optional, Tuple
 
 from cachetools import LRUCache, cached
-from eth_utils import to_checksum_address
+from cachetools.keys import hashkey
+from eth_abi import decode_single, encode_single
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
 
 from izumi_infra.blockchain.conf import blockchain_settings
 from izumi_infra.blockchain.constants import BaseContractInfoEnum
@@ -12,7 +15,15 @@ from izumi_infra.blockchain.types import Erc20TokenInfo
 
 logger = logging.getLogger(__name__)
 
-@cached(cache=LRUCache(maxsize=2048))
+_ERC20_SYMBOL_SELECTOR = function_signature_to_4byte_selector('symbol()')
+_ERC20_DECIMALS_SELECTOR = function_signature_to_4byte_selector('decimals()')
+_ERC20_NAME_SELECTOR = function_signature_to_4byte_selector('name()')
+_ERC20_BALANCE_OF_SELECTOR = function_signature_to_4byte_selector('balanceOf(address)')
+
+# shared by get_erc20_token_info and get_erc20_token_infos, key: hashkey(chain_id, token_addr)
+_erc20_token_info_cache = LRUCache(maxsize=2048)
+
+@cached(cache=_erc20_token_info_cache)
 def get_erc20_token_info(chain_id: int, token_addr: str) -> Erc20TokenInfo:
     blockchain = Blockchain.objects.get(chain_id=chain_id)
     tokenContract = contractHolder.get_facade_by_info(blockchain, to_checksum_address(token_addr), BaseContractInfoEnum.ERC20.abi)
@@ -38,6 +49,99 @@ def get_erc20_token_balance(chain_id: int, token_addr: str, account_addr: str, d
         logger.warn(f'get_erc20_token_balance error: {chain_id}, {token_addr}, {account_addr}')
         raise e
 
+def get_erc20_token_balances(chain_id: int, token_addr: str, account_addr_list: List[str], decimal: int=None,
+                             block_id: Any='latest') -> List[float]:
+    """
+    balanceOf of many account by one batch request, return by account_addr_list order
+    """
+    blockchain = Blockchain.objects.get(chain_id=chain_id)
+    tokenContract = contractHolder.get_facade_by_info(blockchain, to_checksum_address(token_addr), BaseContractInfoEnum.ERC20.abi)
+    transaction_list = [{'to': tokenContract.contract_address, 'data': tokenContract.contract.encodeABI('balanceOf', [to_checksum_address(a)])}
+                        for a in account_addr_list]
+    call_result_list = tokenContract.blockchainFacade.call_batch(transaction_list, block_id)
+
+    token_decimal = decimal if decimal is not None else get_erc20_token_info(chain_id, token_addr)['decimals']
+    balance_list = []
+    for account_addr, call_result in zip(account_addr_list, call_result_list):
+        if isinstance(call_result, Exception):
+            logger.warn(f'get_erc20_token_balances error: {chain_id}, {token_addr}, {account_addr}, {block_id}')
+            raise call_result
+        balance_list.append(decode_single('uint256', call_result) / (10 ** token_decimal))
+    return balance_list
+
+def _decode_erc20_string(return_data: bytes) -> str:
+    try:
+        return decode_single('string', return_data)
+    except Exception:
+        # old token like MKR return bytes32
+        return decode_single('bytes32', return_data).rstrip(b'\x00').decode('utf-8', errors='ignore')
+
+def get_erc20_token_infos(chain_id: int, token_addr_list: List[str]) -> List[Optional[Erc20TokenInfo]]:
+    """
+    symbol, decimals and name of many token by multicall, return by token_addr_list order, None of failed token
+    """
+    token_info_map: Dict[str, Erc20TokenInfo] = {}
+    missing_addr_list = []
+    for token_addr in dict.fromkeys(token_addr_list):
+        token_info = _erc20_token_info_cache.get(hashkey(chain_id, token_addr))
+        if token_info is None: missing_addr_list.append(token_addr)
+        else: token_info_map[token_addr] = token_info
+
+    if missing_addr_list:
+        blockchainFacade = blockchainHolder.get_facade_by_model(Blockchain.objects.get(chain_id=chain_id))
+        call_list = []
+        for token_addr in missing_addr_list:
+            call_list.extend((token_addr, selector) for selector in (_ERC20_SYMBOL_SELECTOR, _ERC20_DECIMALS_SELECTOR, _ERC20_NAME_SELECTOR))
+        call_result_list = blockchainFacade.multicall(call_list)
+
+        for i, token_addr in enumerate(missing_addr_list):
+            symbol_result, decimals_result, name_result = call_result_list[3 * i: 3 * i + 3]
+            try:
+                for call_result in (symbol_result, decimals_result, name_result):
+                    if isinstance(call_result, Exception): raise call_result
+                token_info = Erc20TokenInfo(address=token_addr, symbol=_decode_erc20_string(symbol_result),
+                                            decimals=decode_single('uint8', decimals_result), name=_decode_erc20_string(name_result))
+            except Exception as e:
+                logger.warn(f'get_erc20_token_infos error: {chain_id}, {token_addr}, {e}')
+                continue
+            token_info_map[token_addr] = _erc20_token_info_cache[hashkey(chain_id, token_addr)] = token_info
+
+    return [token_info_map.get(token_addr) for token_addr in token_addr_list]
+
+def get_erc20_raw_balances(chain_id: int, token_account_pair_list: List[Tuple[str, str]], block_id: Any='latest') -> List[Optional[int]]:
+    """
+    balanceOf without decimals of many (token_addr, account_addr) by multicall at block_id, return by pair order, None of failed pair
+    """
+    blockchainFacade = blockchainHolder.get_facade_by_model(Blockchain.objects.get(chain_id=chain_id))
+    call_list = [(token_addr, _ERC20_BALANCE_OF_SELECTOR + encode_single('address', to_checksum_address(account_addr)))
+                 for token_addr, account_addr in token_account_pair_list]
+    call_result_list = blockchainFacade.multicall(call_list, block_id)
+
+    raw_balance_list = []
+    for (token_addr, account_addr), call_result in zip(token_account_pair_list, call_result_list):
+        if isinstance(call_result, Exception):
+            logger.warn(f'get_erc20_raw_balances error: {chain_id}, {token_addr}, {account_addr}, {block_id}, {call_result}')
+            raw_balance_list.append(None)
+            continue
+        raw_balance_list.append(decode_single('uint256', call_result))
+    return raw_balance_list
+
+def get_erc20_balances(chain_id: int, token_account_pair_list: List[Tuple[str, str]], block_id: Any='latest') -> List[Optional[float]]:
+    """
+    balanceOf of many (token_addr, account_addr) by multicall at block_id, return by pair order, None of failed pair
+    """
+    raw_balance_list = get_erc20_raw_balances(chain_id, token_account_pair_list, block_id)
+    token_addr_list = list(dict.fromkeys(token_addr for token_addr, _ in token_account_pair_list))
+    token_info_map = dict(zip(token_addr_list, get_erc20_token_infos(chain_id, token_addr_list)))
+    balance_list = []
+    for (token_addr, _), raw_balance in zip(token_account_pair_list, raw_balance_list):
+        token_info = token_info_map[token_addr]
+        if raw_balance is None or token_info is None:
+            balance_list.append(None)
+            continue
+        balance_list.append(raw_balance / (10 ** token_info['decimals']))
+    return balance_list
+
 @cached(cache=LRUCache(maxsize=1024))
 def get_erc20_token_hist_balance(chain_id: int, token_addr: str, account_addr: str, block_id: int) -> float:
     blockchain = Blockchain.objects.get(chain_id=chain_id)
@@ -87,8 +191,7 @@ def estimate_block_number_by_time(chain_id: int, timestamp: int):
     ilatest = blockchain.w3.eth.get_block('latest')['number']
     def get_block_timestamp(block_number: int):
         try:
-            block = blockchain.w3.eth.getBlock(block_number)
-            return block.timestamp
+            return blockchain.get_block_timestamps([block_number])[block_number]
         except Exception as e:
             logger.error(f"block number: {block_number}")
 
@@ -4,7 +4,8 @@ from django.db.utils import IntegrityError
 from django.utils.translation import gettext as _
 from django.core.validators import MaxValueValidator
 
-from izumi_infra.blockchain.constants import ContractStatusEnum, BlockChainVmEnum, AccountContractRelationshipTypeEnum
+from izumi_infra.blockchain.constants import (ContractStatusEnum, BlockChainVmEnum, AccountContractRelationshipTypeEnum,
+    BalanceSnapshotStatusEnum, BalanceSnapshotItemStatusEnum)
 from izumi_infra.blockchain.conf import blockchain_settings
 from izumi_infra.utils.model_utils import validate_eth_address
 
@@ -14,7 +15,7 @@ class Blockchain(models.Model):
     symbol = models.CharField("Symbol", unique=True, max_length=30, default="")
     vm_type = models.CharField("VmType", max_length=30, default=BlockChainVmEnum.EVM.value, choices=BlockChainVmEnum.choices())
 
-    rpc_url = models.CharField("RPCUrl", max_length=300, default="")
+    rpc_url = models.CharField("RPCUrl", max_length=1000, default="", help_text="ordered endpoint list split by comma")
     ws_rpc_url = models.CharField("WebsocketRPCUrl", max_length=300, default="", blank=True)
     scan_url = models.CharField("ScanUrl", max_length=300, default="", blank=True)
     chain_id = models.PositiveBigIntegerField("ChainId", unique=True, primary_key=True)
@@ -105,3 +106,46 @@ class TransactionSignInfo(models.Model):
 
     def __str__(self):
         return self.r_hex[:8]
+
+class BalanceSnapshot(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField("Name", unique=True, max_length=128)
+
+    chain = models.ForeignKey(Blockchain, on_delete=models.SET_NULL, null=True, related_name='RelatedBalanceSnapshot')
+    block_number = models.PositiveBigIntegerField("BlockNumber")
+
+    status = models.SmallIntegerField("Status", default=BalanceSnapshotStatusEnum.INITIAL.value, choices=BalanceSnapshotStatusEnum.choices())
+
+    create_time = models.DateTimeField("CreateTime", auto_now_add=True)
+    update_time = models.DateTimeField("UpdateTime", auto_now=True)
+
+    class Meta:
+        verbose_name = _("BalanceSnapshot")
+        verbose_name_plural = _("BalanceSnapshot")
+
+    def __str__(self):
+        return self.name
+
+class BalanceSnapshotItem(models.Model):
+    id = models.BigAutoField(primary_key=True)
+
+    snapshot = models.ForeignKey(BalanceSnapshot, on_delete=models.CASCADE, related_name='RelatedItem')
+    token_address = models.CharField("TokenAddress", max_length=42)
+    account_address = models.CharField("AccountAddress", max_length=42)
+    # uint256 balance without decimals
+    balance = models.CharField("Balance", max_length=80, blank=True, default="")
+
+    status = models.SmallIntegerField("Status", default=BalanceSnapshotItemStatusEnum.INITIAL.value, choices=BalanceSnapshotItemStatusEnum.choices())
+
+    update_time = models.DateTimeField("UpdateTime", auto_now=True)
+
+    class Meta:
+        verbose_name = _("BalanceSnapshotItem")
+        verbose_name_plural = _("BalanceSnapshotItem")
+        indexes = [
+            models.Index(fields=['snapshot', 'status']),
+        ]
+        unique_together = [['snapshot', 'token_address', 'account_address']]
+
+    def __str__(self):
+        return f"BalanceSnapshotItem-{self.id}"
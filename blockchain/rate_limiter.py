@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from threading import Lock
+from typing import Dict, Optional, TypedDict
+
+from django.core.cache import cache
+
+from izumi_infra.blockchain.conf import blockchain_settings
+
+logger = logging.getLogger(__name__)
+
+class RateLimitConfig(TypedDict):
+    rate: float
+    burst: int
+
+class RateLimitMetrics(TypedDict):
+    acquire_count: int
+    token_count: int
+    wait_count: int
+    total_wait_sec: float
+    max_wait_sec: float
+
+class TokenBucket():
+    """
+    Token bucket by reservation, reserve return seconds caller should wait before send
+    """
+
+    def __init__(self, chain_id: int, rate: float, burst: int) -> None:
+        self.chain_id = chain_id
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._metrics = RateLimitMetrics(acquire_count=0, token_count=0, wait_count=0, total_wait_sec=0.0, max_wait_sec=0.0)
+        self._metrics_lock = Lock()
+
+    def reserve(self, tokens: int = 1) -> float:
+        wait_sec = self._reserve(tokens)
+        with self._metrics_lock:
+            self._metrics['acquire_count'] += 1
+            self._metrics['token_count'] += tokens
+            if wait_sec > 0:
+                self._metrics['wait_count'] += 1
+                self._metrics['total_wait_sec'] += wait_sec
+                self._metrics['max_wait_sec'] = max(self._metrics['max_wait_sec'], wait_sec)
+        return wait_sec
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        block until tokens available, return waited seconds
+        """
+        wait_sec = self.reserve(tokens)
+        if wait_sec > 0: time.sleep(wait_sec)
+        return wait_sec
+
+    def get_metrics(self) -> RateLimitMetrics:
+        with self._metrics_lock:
+            return RateLimitMetrics(**self._metrics)
+
+    def _reserve(self, tokens: int) -> float:
+        raise NotImplementedError()
+
+class LocalTokenBucket(TokenBucket):
+    """
+    Token bucket shared by threads of current process
+    """
+
+    def __init__(self, chain_id: int, rate: float, burst: int) -> None:
+        super().__init__(chain_id, rate, burst)
+        self._tokens = float(self.burst)
+        self._last_time = time.monotonic()
+        self._lock = Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_time) * self.rate)
+            self._last_time = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+# tokens may go negative as reservation, return wait seconds of this reservation
+REDIS_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tokens_req = tonumber(ARGV[3])
+local redis_time = redis.call('TIME')
+local now = tonumber(redis_time[1]) + tonumber(redis_time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - tokens_req
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+if tokens >= 0 then return '0' end
+return tostring(-tokens / rate)
+"""
+
+class RedisTokenBucket(TokenBucket):
+    """
+    Token bucket shared by all workers through redis, refill and take atomic by lua script
+    """
+    KEY_PREFIX = 'izumi_infra:rpc_rate_limit'
+
+    def __init__(self, chain_id: int, rate: float, burst: int, redis_url: str) -> None:
+        super().__init__(chain_id, rate, burst)
+        import redis
+        self._redis = redis.Redis.from_url(redis_url)
+        self._script = self._redis.register_script(REDIS_TOKEN_BUCKET_SCRIPT)
+        self._key = f'{self.KEY_PREFIX}:{chain_id}'
+
+    def _reserve(self, tokens: int) -> float:
+        return float(self._script(keys=[self._key], args=[self.rate, self.burst, tokens]))
+
+class CacheTokenBucket(TokenBucket):
+    """
+    Approximate bucket shared through django cache by one second window counter,
+    request over rate + burst of current window wait for later window
+    """
+    KEY_PREFIX = 'izumi_infra:rpc_rate_limit'
+
+    def _reserve(self, tokens: int) -> float:
+        now = time.time()
+        window = int(now)
+        key = f'{self.KEY_PREFIX}:{self.chain_id}:{window}'
+        cache.add(key, 0, timeout=60)
+        try:
+            count = cache.incr(key, tokens)
+        except ValueError:
+            # expired between add and incr
+            cache.add(key, tokens, timeout=60)
+            count = tokens
+
+        limit = self.rate + self.burst
+        if count <= limit: return 0.0
+        # overflow tokens spread to following windows by rate
+        return (window + 1 - now) + (count - limit) / self.rate
+
+class RpcRateLimiterHolder():
+    """
+    Token bucket per chain configured by RPC_RATE_LIMIT, None if chain not limited
+    """
+
+    def __init__(self) -> None:
+        self._limiters: Dict[int, Optional[TokenBucket]] = {}
+        self._lock = Lock()
+
+    def get_limiter(self, chain_id: int) -> Optional[TokenBucket]:
+        if chain_id in self._limiters: return self._limiters[chain_id]
+        with self._lock:
+            if chain_id not in self._limiters:
+                self._limiters[chain_id] = self._build_limiter(chain_id)
+            return self._limiters[chain_id]
+
+    def _build_limiter(self, chain_id: int) -> Optional[TokenBucket]:
+        rate_limit_config = blockchain_settings.RPC_RATE_LIMIT.get(chain_id, blockchain_settings.RPC_RATE_LIMIT_DEFAULT)
+        if not rate_limit_config or not rate_limit_config.get('rate'): return None
+
+        rate = float(rate_limit_config['rate'])
+        burst = int(rate_limit_config.get('burst', rate))
+        backend = blockchain_settings.RPC_RATE_LIMIT_BACKEND
+        logger.info(f'rpc rate limit of chain {chain_id}: {rate}/s, burst: {burst}, backend: {backend}')
+        if backend == 'redis':
+            return RedisTokenBucket(chain_id, rate, burst, blockchain_settings.RPC_RATE_LIMIT_REDIS_URL)
+        if backend == 'cache':
+            return CacheTokenBucket(chain_id, rate, burst)
+        return LocalTokenBucket(chain_id, rate, burst)
+
+    def get_metrics(self) -> Dict[int, RateLimitMetrics]:
+        """
+        wait metrics of limited chain in current process
+        """
+        return {chain_id: limiter.get_metrics() for chain_id, limiter in list(self._limiters.items()) if limiter is not None}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._limiters.clear()
+
+rateLimiterHolder = RpcRateLimiterHolder()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import bisect
+import logging
+import socket
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from izumi_infra.blockchain.conf import blockchain_settings
+
+logger = logging.getLogger(__name__)
+
+# caller tag of rpc request, eg: scan config or task, see rpc_metrics_tag
+_rpc_metrics_tag: ContextVar[str] = ContextVar('rpc_metrics_tag', default='')
+
+@contextmanager
+def rpc_metrics_tag(tag: str) -> Iterator[None]:
+    """
+    Tag rpc requests in this context, thread pool task should run in copied context to keep tag
+    """
+    token = _rpc_metrics_tag.set(tag)
+    try:
+        yield
+    finally:
+        _rpc_metrics_tag.reset(token)
+
+def get_rpc_metrics_tag() -> str:
+    return _rpc_metrics_tag.get()
+
+def endpoint_label(endpoint_uri: Optional[str]) -> str:
+    """
+    host of endpoint only, path and user info of rpc url may contain api key
+    """
+    if not endpoint_uri: return ''
+    return urlparse(endpoint_uri).hostname or ''
+
+class RpcMetricsBackend():
+    """
+    Receive one observation per rpc request
+    """
+
+    def observe(self, chain_id: int, endpoint: str, method: str, tag: str, latency_sec: float,
+                response_bytes: int, error_class: Optional[str]) -> None:
+        raise NotImplementedError()
+
+class InMemoryRpcMetrics(RpcMetricsBackend):
+    """
+    Counter and latency histogram by (chain_id, endpoint, method, tag) in current process
+    """
+
+    def __init__(self) -> None:
+        self.latency_buckets: Tuple[float] = tuple(sorted(blockchain_settings.RPC_METRICS_LATENCY_BUCKETS))
+        self._series: Dict[Tuple[int, str, str, str], Dict] = {}
+        self._errors: Dict[Tuple[int, str, str, str, str], int] = {}
+        self._lock = Lock()
+
+    def observe(self, chain_id: int, endpoint: str, method: str, tag: str, latency_sec: float,
+                response_bytes: int, error_class: Optional[str]) -> None:
+        key = (chain_id, endpoint, method, tag)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'count': 0, 'latency_sum': 0.0, 'response_bytes': 0,
+                    # last bucket for +Inf
+                    'latency_buckets': [0] * (len(self.latency_buckets) + 1),
+                }
+            series['count'] += 1
+            series['latency_sum'] += latency_sec
+            series['response_bytes'] += response_bytes
+            series['latency_buckets'][bisect.bisect_left(self.latency_buckets, latency_sec)] += 1
+            if error_class:
+                error_key = key + (error_class,)
+                self._errors[error_key] = self._errors.get(error_key, 0) + 1
+
+    def snapshot(self) -> Tuple[Dict[Tuple[int, str, str, str], Dict], Dict[Tuple[int, str, str, str, str], int]]:
+        """
+        copy of (series, errors), bucket count not cumulative
+        """
+        with self._lock:
+            series = {k: {**v, 'latency_buckets': list(v['latency_buckets'])} for k, v in self._series.items()}
+            return series, dict(self._errors)
+
+    def get_slowest(self, limit: int = 10) -> List[Dict]:
+        """
+        series by average latency desc, for finding slow chain or method in incident
+        """
+        series, _ = self.snapshot()
+        slowest = sorted(series.items(), key=lambda kv: kv[1]['latency_sum'] / kv[1]['count'], reverse=True)[:limit]
+        return [{'chain_id': k[0], 'endpoint': k[1], 'method': k[2], 'tag': k[3], 'count': v['count'],
+                 'avg_latency_sec': v['latency_sum'] / v['count']} for k, v in slowest]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._errors.clear()
+
+    def render_prometheus(self) -> str:
+        """
+        Prometheus text exposition format 0.0.4
+        """
+        series, errors = self.snapshot()
+        lines = [
+            '# HELP izumi_infra_rpc_requests_total RPC request count.',
+            '# TYPE izumi_infra_rpc_requests_total counter',
+        ]
+        lines.extend(f'izumi_infra_rpc_requests_total{{{_labels(k)}}} {v["count"]}' for k, v in series.items())
+        lines.extend([
+            '# HELP izumi_infra_rpc_response_bytes_total RPC response body bytes.',
+            '# TYPE izumi_infra_rpc_response_bytes_total counter',
+        ])
+        lines.extend(f'izumi_infra_rpc_response_bytes_total{{{_labels(k)}}} {v["response_bytes"]}' for k, v in series.items())
+        lines.extend([
+            '# HELP izumi_infra_rpc_errors_total RPC request error count by error class.',
+            '# TYPE izumi_infra_rpc_errors_total counter',
+        ])
+        lines.extend(f'izumi_infra_rpc_errors_total{{{_labels(k[:4])},error_class="{_escape(k[4])}"}} {v}' for k, v in errors.items())
+        lines.extend([
+            '# HELP izumi_infra_rpc_latency_seconds RPC request latency.',
+            '# TYPE izumi_infra_rpc_latency_seconds histogram',
+        ])
+        for k, v in series.items():
+            labels = _labels(k)
+            cumulative = 0
+            for bound, bucket_count in zip(self.latency_buckets + (float('inf'),), v['latency_buckets']):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'izumi_infra_rpc_latency_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'izumi_infra_rpc_latency_seconds_sum{{{labels}}} {v["latency_sum"]}')
+            lines.append(f'izumi_infra_rpc_latency_seconds_count{{{labels}}} {v["count"]}')
+        return '\n'.join(lines) + '\n'
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(key: Tuple[int, str, str, str]) -> str:
+    chain_id, endpoint, method, tag = key
+    return f'chain_id="{chain_id}",endpoint="{_escape(endpoint)}",method="{_escape(method)}",tag="{_escape(tag)}"'
+
+class StatsdRpcMetrics(RpcMetricsBackend):
+    """
+    Emit to StatsD over UDP with DogStatsD style tags, fire and forget
+    """
+
+    def __init__(self) -> None:
+        self.address = (blockchain_settings.RPC_METRICS_STATSD_HOST, blockchain_settings.RPC_METRICS_STATSD_PORT)
+        self.prefix = blockchain_settings.RPC_METRICS_STATSD_PREFIX
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def observe(self, chain_id: int, endpoint: str, method: str, tag: str, latency_sec: float,
+                response_bytes: int, error_class: Optional[str]) -> None:
+        tags = f'chain_id:{chain_id},endpoint:{endpoint},method:{method}'
+        if tag: tags += f',tag:{tag}'
+        lines = [
+            f'{self.prefix}.rpc.requests:1|c|#{tags}',
+            f'{self.prefix}.rpc.latency:{latency_sec * 1000:.3f}|ms|#{tags}',
+            f'{self.prefix}.rpc.response_bytes:{response_bytes}|c|#{tags}',
+        ]
+        if error_class: lines.append(f'{self.prefix}.rpc.errors:1|c|#{tags},error_class:{error_class}')
+        try:
+            self._socket.sendto('\n'.join(lines).encode('utf-8'), self.address)
+        except OSError as e:
+            logger.debug(f'send rpc metrics to statsd fail: {e}')
+
+class RpcMetricsHolder():
+    """
+    Metrics backends configured by RPC_METRICS_BACKEND_CLASSES, shared in process
+    """
+
+    def __init__(self) -> None:
+        self._backends: Optional[List[RpcMetricsBackend]] = None
+        self._lock = Lock()
+
+    def get_backends(self) -> List[RpcMetricsBackend]:
+        if self._backends is not None: return self._backends
+        with self._lock:
+            if self._backends is None:
+                self._backends = [backend_class() for backend_class in blockchain_settings.RPC_METRICS_BACKEND_CLASSES or []]
+            return self._backends
+
+    def is_enabled(self) -> bool:
+        return bool(self.get_backends())
+
+    def get_backend(self, backend_class: type) -> Optional[RpcMetricsBackend]:
+        return next((b for b in self.get_backends() if isinstance(b, backend_class)), None)
+
+    def observe(self, chain_id: int, endpoint_uri: Optional[str], method: str, latency_sec: float,
+                response_bytes: int, error_class: Optional[str]) -> None:
+        endpoint = endpoint_label(endpoint_uri)
+        tag = get_rpc_metrics_tag()
+        for backend in self.get_backends():
+            try:
+                backend.observe(chain_id, endpoint, method, tag, latency_sec, response_bytes, error_class)
+            except Exception as e:
+                logger.warn(f'rpc metrics backend {backend} observe fail: {e}')
+
+    def clear(self) -> None:
+        with self._lock:
+            self._backends = None
+
+rpcMetricsHolder = RpcMetricsHolder()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+from cachetools import LRUCache
+
+from izumi_infra.blockchain.conf import blockchain_settings
+from izumi_infra.etherscan.conf import etherscan_settings
+
+logger = logging.getLogger(__name__)
+
+# method of immutable response once its block final, block given in params
+BLOCK_PARAM_METHODS = {
+    'eth_getBlockByNumber': 0,
+    'eth_call': 1,
+}
+# method of immutable response once its block final, block known from result
+BLOCK_RESULT_METHODS = {'eth_getTransactionByHash', 'eth_getTransactionReceipt'}
+
+def _parse_block_number(block_identifier: Any) -> Optional[int]:
+    if isinstance(block_identifier, int): return block_identifier
+    if isinstance(block_identifier, str) and block_identifier.startswith('0x'): return int(block_identifier, 16)
+    # latest, pending, safe, block hash object etc.
+    return None
+
+class SqliteResponseStore():
+    """
+    On disk tier of rpc response cache, one connection per thread
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._get_conn().execute('CREATE TABLE IF NOT EXISTS rpc_response_cache '
+                                 '(chain_id INTEGER, cache_key TEXT, response TEXT, PRIMARY KEY (chain_id, cache_key))')
+
+    def _get_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, chain_id: int, cache_key: str) -> Optional[Dict]:
+        row = self._get_conn().execute('SELECT response FROM rpc_response_cache WHERE chain_id = ? AND cache_key = ?',
+                                       (chain_id, cache_key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, chain_id: int, cache_key: str, response: Dict) -> None:
+        self._get_conn().execute('INSERT OR REPLACE INTO rpc_response_cache (chain_id, cache_key, response) VALUES (?, ?, ?)',
+                                 (chain_id, cache_key, json.dumps(response)))
+
+class RpcResponseCache():
+    """
+    Raw JSON-RPC response cache of immutable method whose block not greater than head - finality offset,
+    bounded LRU in memory with optional sqlite tier, concurrent identical request coalesced to one
+    """
+
+    def __init__(self, chain_id: int, finality_offset: int, max_size: int, head_ttl_sec: float,
+                 disk_store: Optional[SqliteResponseStore] = None) -> None:
+        self.chain_id = chain_id
+        self.finality_offset = finality_offset
+        self.head_ttl_sec = head_ttl_sec
+        self.disk_store = disk_store
+        self._memory = LRUCache(maxsize=max_size)
+        self._lock = Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._head_block: Optional[int] = None
+        self._head_time = 0.0
+        self._head_lock = Lock()
+        self._metrics = {'memory_hit': 0, 'disk_hit': 0, 'miss': 0, 'coalesced': 0, 'store': 0}
+
+    @staticmethod
+    def is_cacheable_method(method: str) -> bool:
+        return method in BLOCK_PARAM_METHODS or method in BLOCK_RESULT_METHODS
+
+    @staticmethod
+    def build_key(method: str, params: Any) -> str:
+        return f'{method}:{json.dumps(params, sort_keys=True, default=str)}'
+
+    def observe_head(self, block_number: int) -> None:
+        with self._head_lock:
+            if self._head_block is None or block_number >= self._head_block:
+                self._head_block = block_number
+                self._head_time = time.monotonic()
+
+    def _get_final_block(self, head_fetcher: Callable[[], int], refresh: bool) -> Optional[int]:
+        with self._head_lock:
+            is_fresh = self._head_block is not None and time.monotonic() - self._head_time < self.head_ttl_sec
+            if is_fresh or not refresh:
+                return None if self._head_block is None else self._head_block - self.finality_offset
+        self.observe_head(head_fetcher())
+        return self._head_block - self.finality_offset
+
+    def _is_final(self, block_number: Optional[int], head_fetcher: Callable[[], int]) -> bool:
+        if block_number is None: return False
+        final_block = self._get_final_block(head_fetcher, refresh=False)
+        if final_block is not None and block_number <= final_block: return True
+        # head may be stale, refresh at most once per head_ttl_sec
+        final_block = self._get_final_block(head_fetcher, refresh=True)
+        return block_number <= final_block
+
+    def _is_immutable(self, method: str, params: Any, response: Dict, head_fetcher: Callable[[], int]) -> bool:
+        if response.get('error') is not None or response.get('result') is None: return False
+        if method in BLOCK_PARAM_METHODS:
+            return self._is_final(_parse_block_number(params[BLOCK_PARAM_METHODS[method]]), head_fetcher)
+        return self._is_final(_parse_block_number(response['result'].get('blockNumber')), head_fetcher)
+
+    def _is_candidate(self, method: str, params: Any) -> bool:
+        if method not in BLOCK_PARAM_METHODS: return method in BLOCK_RESULT_METHODS
+        block_param_index = BLOCK_PARAM_METHODS[method]
+        return len(params) > block_param_index and _parse_block_number(params[block_param_index]) is not None
+
+    def get(self, method: str, params: Any) -> Optional[Dict]:
+        """
+        cached response or None, not count miss
+        """
+        if not self._is_candidate(method, params): return None
+        cache_key = self.build_key(method, params)
+        with self._lock:
+            response = self._memory.get(cache_key)
+            if response is not None:
+                self._metrics['memory_hit'] += 1
+                return response
+
+        if self.disk_store is None: return None
+        try:
+            response = self.disk_store.get(self.chain_id, cache_key)
+        except Exception as e:
+            logger.warn(f'get rpc response from disk cache fail: {e}')
+            return None
+        if response is None: return None
+        with self._lock:
+            self._memory[cache_key] = response
+            self._metrics['disk_hit'] += 1
+        return response
+
+    def put(self, method: str, params: Any, response: Dict, head_fetcher: Callable[[], int]) -> None:
+        """
+        store response if immutable
+        """
+        if not self._is_candidate(method, params): return
+        if not self._is_immutable(method, params, response, head_fetcher): return
+        cache_key = self.build_key(method, params)
+        with self._lock:
+            self._memory[cache_key] = response
+            self._metrics['store'] += 1
+        if self.disk_store is None: return
+        try:
+            self.disk_store.set(self.chain_id, cache_key, response)
+        except Exception as e:
+            logger.warn(f'set rpc response to disk cache fail: {e}')
+
+    def get_or_fetch(self, method: str, params: Any, fetcher: Callable[[], Dict], head_fetcher: Callable[[], int]) -> Dict:
+        if not self._is_candidate(method, params): return fetcher()
+
+        response = self.get(method, params)
+        if response is not None: return response
+
+        cache_key = self.build_key(method, params)
+        with self._lock:
+            self._metrics['miss'] += 1
+            inflight = self._inflight.get(cache_key)
+            if inflight is None:
+                inflight = self._inflight[cache_key] = Future()
+                is_leader = True
+            else:
+                self._metrics['coalesced'] += 1
+                is_leader = False
+
+        if not is_leader: return inflight.result()
+
+        try:
+            response = fetcher()
+            inflight.set_result(response)
+        except BaseException as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+
+        self.put(method, params, response, head_fetcher)
+        return response
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._metrics)
+
+class RpcResponseCacheHolder():
+    """
+    Response cache per chain, shared by facades of the same chain in process
+    """
+
+    def __init__(self) -> None:
+        self._caches: Dict[int, RpcResponseCache] = {}
+        self._disk_store: Optional[SqliteResponseStore] = None
+        self._lock = Lock()
+
+    def get_cache(self, chain_id: int) -> RpcResponseCache:
+        if chain_id in self._caches: return self._caches[chain_id]
+        with self._lock:
+            if chain_id not in self._caches:
+                finality_offset = blockchain_settings.RPC_CACHE_FINALITY_OFFSET.get(chain_id, etherscan_settings.SAFE_BLOCK_NUM_OFFSET)
+                self._caches[chain_id] = RpcResponseCache(chain_id, finality_offset,
+                                                          blockchain_settings.RPC_RESPONSE_CACHE_SIZE,
+                                                          blockchain_settings.RPC_CACHE_HEAD_TTL_SEC,
+                                                          self._get_disk_store())
+            return self._caches[chain_id]
+
+    def _get_disk_store(self) -> Optional[SqliteResponseStore]:
+        if not blockchain_settings.RPC_RESPONSE_CACHE_SQLITE_PATH: return None
+        if self._disk_store is None:
+            self._disk_store = SqliteResponseStore(blockchain_settings.RPC_RESPONSE_CACHE_SQLITE_PATH)
+        return self._disk_store
+
+    def get_metrics(self) -> Dict[int, Dict[str, int]]:
+        return {chain_id: c.get_metrics() for chain_id, c in list(self._caches.items())}
+
+rpcResponseCacheHolder = RpcResponseCacheHolder()
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from izumi_infra.blockchain.context import (asyncBlockchainHolder,
+                                            blockchainHolder,
+                                            blockchainMetaHolder,
+                                            contractHolder,
+                                            contractMetaHolder)
+from izumi_infra.blockchain.models import Blockchain, Contract
+
+
+@receiver(post_save, sender=Blockchain)
+@receiver(post_delete, sender=Blockchain)
+def invalidate_blockchain_facade(sender, instance: Blockchain, **kwargs):
+    """
+    facade of changed chain rebuilt on next get, contract facades on it too
+    """
+    blockchainHolder.invalidate(instance.chain_id)
+    blockchainMetaHolder.invalidate(instance.chain_id)
+    asyncBlockchainHolder.invalidate(instance.chain_id)
+    contractHolder.invalidate_chain(instance.chain_id)
+    contractMetaHolder.invalidate_chain(instance.chain_id)
+
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+def invalidate_contract_facade(sender, instance: Contract, **kwargs):
+    contractHolder.invalidate(instance.id)
+    contractMetaHolder.invalidate(instance.id)
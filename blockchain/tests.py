@@ -1,11 +1,53 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import json
-from django.test import TestCase
+import os
+import tempfile
+import time
+from threading import Event, Thread
+from typing import Dict, List
+from unittest import mock
+
+import eth_event
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from eth_abi import decode_abi, encode_abi
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from requests import HTTPError, Response
 from rest_framework.test import APIClient
 from rest_framework import status
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3.exceptions import ContractLogicError
 
-from izumi_infra.blockchain.context import blockchainHolder
-from izumi_infra.blockchain.models import Blockchain
+from izumi_infra.blockchain.block_window import (AdaptiveBlockWindow,
+                                                 blockWindowHolder,
+                                                 is_window_overflow_error)
+from izumi_infra.blockchain.constants import (BalanceSnapshotItemStatusEnum, BalanceSnapshotStatusEnum,
+                                              BaseContractABI)
+from izumi_infra.blockchain.context import (asyncBlockchainHolder,
+                                            blockchainHolder, contractHolder,
+                                            contractMetaHolder)
+from izumi_infra.blockchain.facade import balanceSnapshotFacade
+from izumi_infra.blockchain.facade.asyncBlockchainFacade import AsyncBlockchainFacade
+from izumi_infra.blockchain.facade.balanceSnapshotFacade import (create_balance_snapshot, get_balance_snapshot_balances,
+                                                                 run_balance_snapshot)
+from izumi_infra.blockchain.facade.contractFacade import ContractFacade
+from izumi_infra.blockchain.models import BalanceSnapshot, BalanceSnapshotItem, Blockchain, Contract
+from izumi_infra.blockchain.rate_limiter import (CacheTokenBucket,
+                                                 LocalTokenBucket,
+                                                 rateLimiterHolder)
+from izumi_infra.blockchain.rpc_metrics import (InMemoryRpcMetrics,
+                                                rpc_metrics_tag,
+                                                rpcMetricsHolder)
+from izumi_infra.blockchain.rpc_response_cache import (RpcResponseCache,
+                                                       SqliteResponseStore)
+from izumi_infra.blockchain.views import rpc_metrics
+from izumi_infra.utils.abi_decoder import abiDecoderRegistry
+from izumi_infra.utils.eth_utils import covert_decode_log_to_event
+from izumi_infra.utils.web3.multi_endpoint_provider import (MultiEndpointHTTPProvider,
+                                                            RpcEndpointPool)
 
 # Create your tests here.
 class BlockchainTests(TestCase):
@@ -47,3 +89,633 @@ class BlockchainApiTest(TestCase):
         result_data = result['data']
         self.assertGreater(len(result_data), 0)
         self.assertGreater(len(result_data[0]['tokens']), 0)
+
+@override_settings(IZUMI_INFRA_ETHERSCAN={'ENABLE_ADAPTIVE_SCAN_BLOCK': True, 'ETH_MAX_SCAN_BLOCK': 1000,
+                                          'ETH_ADAPTIVE_MAX_SCAN_BLOCK': 1000, 'ETH_ADAPTIVE_GROW_LOGS_THRESHOLD': 10})
+class AdaptiveBlockWindowTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        blockWindowHolder.clear()
+        blockchain_model = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.blockchain_facade = blockchainHolder.get_facade_by_model(blockchain_model)
+        self.window_key = AdaptiveBlockWindow.build_key(1, ['0x' + '11' * 20])
+        self.request_range_list = []
+
+    def _get_logs(self, from_block, to_block, contract_addr_list, topics):
+        self.request_range_list.append((from_block, to_block))
+        if to_block - from_block + 1 > 250:
+            raise ValueError({'code': -32005, 'message': 'query returned more than 10000 results'})
+        return []
+
+    def testOverflowError(self):
+        self.assertTrue(is_window_overflow_error(ValueError({'code': -32005, 'message': 'Log response size exceeded.'})))
+        self.assertTrue(is_window_overflow_error(ValueError({'code': -32000, 'message': 'exceed maximum block range: 5000'})))
+        self.assertFalse(is_window_overflow_error(ValueError({'code': -32005, 'message': 'daily request count exceeded, request rate limited'})))
+        self.assertFalse(is_window_overflow_error(ValueError({'code': 429, 'message': 'Too Many Requests'})))
+
+        response = Response()
+        response.status_code = 429
+        self.assertFalse(is_window_overflow_error(HTTPError('429 Client Error', response=response)))
+
+    def testShrinkAndGrow(self):
+        with mock.patch.object(self.blockchain_facade, '_get_logs', side_effect=self._get_logs):
+            self.blockchain_facade.get_all_event_logs(0, 999, ['0x' + '11' * 20], [])
+
+        success_range_list = [r for r in self.request_range_list if r[1] - r[0] + 1 <= 250]
+        self.assertEqual(success_range_list, [(0, 249), (250, 499), (500, 749), (750, 999)])
+        self.assertEqual(self.request_range_list[:3], [(0, 999), (0, 499), (0, 249)])
+        # grow after small response, shrink again when rejected
+        self.assertEqual(self.request_range_list[3], (250, 749))
+        # tail span of 250 blocks shorter than window of 500, not grow untested window
+        self.assertEqual(self.request_range_list[-1], (750, 999))
+        self.assertEqual(blockWindowHolder.get(self.window_key), 500)
+
+    def testTailSpan(self):
+        def get_logs(from_block, to_block, contract_addr_list, topics):
+            self.request_range_list.append((from_block, to_block))
+            if from_block >= 1000 and to_block - from_block + 1 > 50:
+                raise ValueError({'code': -32005, 'message': 'query returned more than 10000 results'})
+            return []
+
+        with mock.patch.object(self.blockchain_facade, '_get_logs', side_effect=get_logs):
+            self.blockchain_facade.get_all_event_logs(0, 1099, ['0x' + '11' * 20], [])
+
+        # rejected tail span of 100 retried by half of it once
+        self.assertEqual(self.request_range_list, [(0, 999), (1000, 1099), (1000, 1049), (1050, 1099)])
+        self.assertEqual(blockWindowHolder.get(self.window_key), 100)
+
+    def testRateLimitNotShrink(self):
+        rate_limit_error = ValueError({'code': 429, 'message': 'Too Many Requests'})
+        with mock.patch.object(self.blockchain_facade, '_get_logs', side_effect=rate_limit_error):
+            with self.assertRaises(ValueError):
+                self.blockchain_facade.get_all_event_logs(0, 999, ['0x' + '11' * 20], [])
+
+        self.assertEqual(blockWindowHolder.get(self.window_key), 1000)
+
+    def testWindowExpire(self):
+        blockWindowHolder.shrink(self.window_key, 1000)
+        self.assertEqual(blockWindowHolder.get(self.window_key), 500)
+
+        with override_settings(IZUMI_INFRA_ETHERSCAN={'ETH_MAX_SCAN_BLOCK': 1000, 'ETH_ADAPTIVE_WINDOW_TTL_SEC': 0}):
+            blockWindowHolder.shrink(self.window_key, 1000)
+            self.assertEqual(blockWindowHolder.get(self.window_key), 1000)
+
+@override_settings(IZUMI_INFRA_BLOCKCHAIN={'ASYNC_RPC_MAX_CONCURRENCY': 3},
+                   IZUMI_INFRA_ETHERSCAN={'ENABLE_ADAPTIVE_SCAN_BLOCK': True, 'ETH_MAX_SCAN_BLOCK': 1000,
+                                          'ETH_ADAPTIVE_MAX_SCAN_BLOCK': 1000, 'ETH_ADAPTIVE_GROW_LOGS_THRESHOLD': 1})
+class AsyncBlockchainFacadeTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        blockWindowHolder.clear()
+        blockchain_model = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.async_blockchain_facade = asyncBlockchainHolder.get_facade_by_model(blockchain_model)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _get_logs(self, from_block, to_block, contract_addr_list, topics):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if to_block - from_block + 1 > 250:
+            raise ValueError({'code': -32005, 'message': 'query returned more than 10000 results'})
+        return [{'blockNumber': b} for b in range(from_block, to_block + 1, 50)]
+
+    def testAdaptiveWindowBounded(self):
+        with mock.patch.object(self.async_blockchain_facade, '_get_logs', side_effect=self._get_logs):
+            event_logs = self.async_blockchain_facade.run(
+                self.async_blockchain_facade.get_all_event_logs(0, 4999, ['0x' + '11' * 20], []))
+
+        self.assertEqual([log['blockNumber'] for log in event_logs], list(range(0, 5000, 50)))
+        self.assertEqual(self.max_in_flight, 3)
+
+    @override_settings(IZUMI_INFRA_ETHERSCAN={'ENABLE_ADAPTIVE_SCAN_BLOCK': True, 'ETH_MAX_SCAN_BLOCK': 1000,
+                                              'ETH_ADAPTIVE_MAX_SCAN_BLOCK': 1000, 'ETH_ADAPTIVE_GROW_LOGS_THRESHOLD': 100})
+    def testTailSpanNotShrinkWindow(self):
+        async def get_logs(from_block, to_block, contract_addr_list, topics):
+            return []
+
+        with mock.patch.object(self.async_blockchain_facade, '_get_logs', side_effect=get_logs):
+            self.async_blockchain_facade.run(self.async_blockchain_facade.get_all_event_logs(0, 1049, ['0x' + '11' * 20], []))
+
+        # small response of tail span of 50 not overwrite learned window
+        window_key = AdaptiveBlockWindow.build_key(1, ['0x' + '11' * 20])
+        self.assertEqual(blockWindowHolder.get(window_key), 1000)
+
+    @override_settings(IZUMI_INFRA_BLOCKCHAIN={'RPC_METRICS_BACKEND_CLASSES': ['izumi_infra.blockchain.rpc_metrics.InMemoryRpcMetrics']})
+    def testRpcMetrics(self):
+        rpcMetricsHolder.clear()
+        self.addCleanup(rpcMetricsHolder.clear)
+        async_blockchain_facade = AsyncBlockchainFacade('ETH', 'EVM', 'https://rpc.example.com/v2/api-key', 1, 1)
+        raw_response_list = []
+
+        async def post(endpoint, request_data):
+            await asyncio.sleep(0.01)
+            raw_response = json.dumps({'jsonrpc': '2.0', 'id': json.loads(request_data)['id'], 'result': '0x10'}).encode()
+            raw_response_list.append(raw_response)
+            return raw_response
+
+        async def get_block_numbers():
+            return await asyncio.gather(*[async_blockchain_facade.get_latest_block_number() for _ in range(3)])
+
+        with mock.patch.object(async_blockchain_facade.provider, '_post', side_effect=post), rpc_metrics_tag('test'):
+            self.assertEqual(async_blockchain_facade.run(get_block_numbers()), [16] * 3)
+
+        series, _ = rpcMetricsHolder.get_backend(InMemoryRpcMetrics).snapshot()
+        # endpoint label without api key, response bytes of concurrent requests not mixed
+        self.assertEqual(list(series.keys()), [(1, 'rpc.example.com', 'eth_blockNumber', 'test')])
+        self.assertEqual(series[(1, 'rpc.example.com', 'eth_blockNumber', 'test')]['count'], 3)
+        self.assertEqual(series[(1, 'rpc.example.com', 'eth_blockNumber', 'test')]['response_bytes'], sum(len(r) for r in raw_response_list))
+
+    def testRunReuseLoop(self):
+        async def get_loop():
+            return asyncio.get_running_loop()
+
+        self.assertIs(self.async_blockchain_facade.run(get_loop()), self.async_blockchain_facade.run(get_loop()))
+
+class RateLimiterTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        rateLimiterHolder.clear()
+        self.addCleanup(rateLimiterHolder.clear)
+
+    @mock.patch('izumi_infra.blockchain.rate_limiter.time.monotonic')
+    def testLocalTokenBucket(self, monotonic):
+        monotonic.return_value = 100.0
+        token_bucket = LocalTokenBucket(1, rate=4, burst=2)
+
+        self.assertEqual([token_bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.25, 0.5])
+        # refill 3 tokens, 2 of them pay the reservation
+        monotonic.return_value = 100.75
+        self.assertEqual([token_bucket.reserve() for _ in range(2)], [0.0, 0.25])
+
+        metrics = token_bucket.get_metrics()
+        self.assertEqual((metrics['acquire_count'], metrics['token_count'], metrics['wait_count']), (6, 6, 3))
+        self.assertEqual((metrics['total_wait_sec'], metrics['max_wait_sec']), (1.0, 0.5))
+
+    @mock.patch('izumi_infra.blockchain.rate_limiter.time.time')
+    def testCacheTokenBucket(self, now):
+        now.return_value = 100.5
+        token_bucket = CacheTokenBucket(1, rate=2, burst=1)
+
+        self.assertEqual([token_bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertEqual(token_bucket.reserve(), 1.0)
+
+    @override_settings(IZUMI_INFRA_BLOCKCHAIN={'RPC_RATE_LIMIT': {1: {'rate': 10, 'burst': 1}}})
+    def testMetricsView(self):
+        self.assertIsNone(rateLimiterHolder.get_limiter(2))
+        token_bucket = rateLimiterHolder.get_limiter(1)
+        token_bucket.reserve()
+        token_bucket.reserve()
+
+        content = rpc_metrics(RequestFactory().get('/metrics/rpc')).content.decode()
+        self.assertIn('izumi_infra_rpc_rate_limit_acquire_total{chain_id="1"} 2', content)
+        self.assertIn('izumi_infra_rpc_rate_limit_wait_total{chain_id="1"} 1', content)
+        self.assertIn('# TYPE izumi_infra_rpc_rate_limit_max_wait_seconds gauge', content)
+        self.assertNotIn('chain_id="2"', content)
+
+class ContractContextTest(TestCase):
+
+    def setUp(self):
+        self.chain = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.contract = Contract.objects.create(id=1, name='usdc', type='ERC20', chain=self.chain,
+                                                contract_address='0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48')
+
+    def _get_contract(self):
+        return Contract.objects.select_related('chain').get(id=self.contract.id)
+
+    def testRebuildOnChainChangedByOtherProcess(self):
+        contract_facade = contractHolder.get_facade_by_model(self._get_contract())
+        self.assertIs(contractHolder.get_facade_by_model(self._get_contract()), contract_facade)
+
+        # update without post_save, like saved in other process
+        Blockchain.objects.filter(chain_id=self.chain.chain_id).update(rpc_url='http://127.0.0.1:2')
+        new_contract_facade = contractHolder.get_facade_by_model(self._get_contract())
+        self.assertIsNot(new_contract_facade, contract_facade)
+        self.assertEqual(new_contract_facade.blockchainFacade.rpc_url, 'http://127.0.0.1:2')
+
+    def testInvalidateByPostSave(self):
+        contract_facade = contractMetaHolder.get_facade_by_model(self._get_contract())
+        self.chain.save()
+        self.assertIsNot(contractMetaHolder.get_facade_by_model(self._get_contract()), contract_facade)
+
+        contract_facade = contractMetaHolder.get_facade_by_model(self._get_contract())
+        self.contract.save()
+        self.assertIsNot(contractMetaHolder.get_facade_by_model(self._get_contract()), contract_facade)
+
+class MultiEndpointProviderTest(TestCase):
+
+    def setUp(self):
+        self.request_uri_list = []
+        self.down_uri_set = set()
+
+    def _make_post_request(self, endpoint_uri, data, **kwargs):
+        self.request_uri_list.append(endpoint_uri)
+        if endpoint_uri in self.down_uri_set: raise ConnectionError(f'{endpoint_uri} down')
+        return json.dumps({'jsonrpc': '2.0', 'id': json.loads(data)['id'], 'result': '0x10'}).encode()
+
+    def _make_request(self, provider, method):
+        with mock.patch('izumi_infra.utils.web3.multi_endpoint_provider.make_post_request', side_effect=self._make_post_request):
+            return provider.make_request(method, [])
+
+    def testFailover(self):
+        provider = MultiEndpointHTTPProvider(['http://a', 'http://b'], retry_backoff_sec=0)
+        self.down_uri_set.add('http://a')
+
+        self.assertEqual(self._make_request(provider, 'eth_blockNumber')['result'], '0x10')
+        self.assertEqual(self.request_uri_list, ['http://a', 'http://b'])
+        self.assertEqual(provider.get_last_request_info()[0], 'http://b')
+
+    def testNotRetryNonIdempotent(self):
+        provider = MultiEndpointHTTPProvider(['http://a', 'http://b'], retry_backoff_sec=0)
+        self.down_uri_set.add('http://a')
+
+        with self.assertRaises(ConnectionError):
+            self._make_request(provider, 'eth_sendRawTransaction')
+        self.assertEqual(self.request_uri_list, ['http://a'])
+
+    def testRouteByErrorScore(self):
+        provider = MultiEndpointHTTPProvider(['http://a', 'http://b'], max_retry=0)
+        self.down_uri_set.add('http://a')
+        with self.assertRaises(ConnectionError): self._make_request(provider, 'eth_blockNumber')
+
+        # failed endpoint routed after healthy one
+        self.assertEqual(self._make_request(provider, 'eth_blockNumber')['result'], '0x10')
+        self.assertEqual(self.request_uri_list, ['http://a', 'http://b'])
+
+    def testAllCircuitOpenStillSent(self):
+        provider = MultiEndpointHTTPProvider(['http://a', 'http://b'], max_retry=1, retry_backoff_sec=0, circuit_failure_threshold=1)
+        self.down_uri_set.update(['http://a', 'http://b'])
+        with self.assertRaises(ConnectionError): self._make_request(provider, 'eth_blockNumber')
+        self.assertTrue(all(e.is_circuit_open(time.monotonic()) for e in provider.pool.endpoints))
+
+        self.down_uri_set.clear()
+        self.assertEqual(self._make_request(provider, 'eth_blockNumber')['result'], '0x10')
+        self.assertEqual(self.request_uri_list, ['http://a', 'http://b', 'http://a'])
+
+    @mock.patch('izumi_infra.utils.web3.multi_endpoint_provider.time.monotonic')
+    def testCircuitHalfOpen(self, monotonic):
+        monotonic.return_value = 100.0
+        endpoint_pool = RpcEndpointPool(['http://a', 'http://b'], error_penalty_sec=10, circuit_failure_threshold=2,
+                                        circuit_open_seconds=30, latency_window=10)
+        endpoint_a, endpoint_b = endpoint_pool.endpoints
+        endpoint_pool.record_success(endpoint_b, 5.0)
+        endpoint_pool.record_failure(endpoint_a)
+        endpoint_pool.record_failure(endpoint_a)
+        self.assertTrue(endpoint_a.is_circuit_open(monotonic()))
+        self.assertEqual(endpoint_pool.route(), [endpoint_b, endpoint_a])
+
+        # half open after cooldown, routed by score again
+        monotonic.return_value = 131.0
+        self.assertEqual(endpoint_pool.route(), [endpoint_a, endpoint_b])
+        # probe fail open again at once
+        endpoint_pool.record_failure(endpoint_a)
+        self.assertTrue(endpoint_a.is_circuit_open(monotonic()))
+
+        # probe success close circuit
+        monotonic.return_value = 200.0
+        endpoint_pool.record_success(endpoint_a, 0.1)
+        self.assertFalse(endpoint_a.is_circuit_open(monotonic()))
+        self.assertEqual(endpoint_a.consecutive_failures, 0)
+
+class RpcResponseCacheTest(TestCase):
+
+    def setUp(self):
+        self.response_cache = RpcResponseCache(1, finality_offset=6, max_size=100, head_ttl_sec=60)
+        self.head_fetch_count = 0
+        self.fetch_count = 0
+
+    def _fetch_head(self):
+        self.head_fetch_count += 1
+        return 100
+
+    def _get(self, method, params, result):
+        def fetch():
+            self.fetch_count += 1
+            return {'jsonrpc': '2.0', 'id': self.fetch_count, 'result': result}
+        return self.response_cache.get_or_fetch(method, params, fetch, self._fetch_head)
+
+    def testFinalBlockCached(self):
+        for _ in range(2): self._get('eth_getBlockByNumber', ['0x5e', False], {'number': '0x5e'})
+        self.assertEqual(self.fetch_count, 1)
+
+        # head - finality offset is 94
+        for _ in range(2): self._get('eth_getBlockByNumber', ['0x5f', False], {'number': '0x5f'})
+        self.assertEqual(self.fetch_count, 3)
+        # head refreshed at most once per head_ttl_sec
+        self.assertEqual(self.head_fetch_count, 1)
+
+    def testNotCacheable(self):
+        for _ in range(2): self._get('eth_getBlockByNumber', ['latest', False], {'number': '0x64'})
+        for _ in range(2): self._get('eth_getTransactionReceipt', ['0x' + '11' * 32], None)
+        for _ in range(2): self._get('eth_getBalance', ['0x' + '11' * 20, '0x10'], '0x1')
+        self.assertEqual(self.fetch_count, 6)
+        self.assertEqual(self.head_fetch_count, 0)
+
+    def testResultBlockCached(self):
+        for _ in range(2): self._get('eth_getTransactionReceipt', ['0x' + '11' * 32], {'blockNumber': '0x10'})
+        self.assertEqual(self.fetch_count, 1)
+        self.assertEqual(self.response_cache.get_metrics()['memory_hit'], 1)
+
+    def testObserveHead(self):
+        self.response_cache.observe_head(200)
+        for _ in range(2): self._get('eth_getBlockByNumber', ['0x5f', False], {'number': '0x5f'})
+        self.assertEqual((self.fetch_count, self.head_fetch_count), (1, 0))
+
+    def testCoalesceInflight(self):
+        fetch_started = Event()
+        fetch_release = Event()
+
+        def fetch():
+            self.fetch_count += 1
+            fetch_started.set()
+            fetch_release.wait(5)
+            return {'jsonrpc': '2.0', 'id': 1, 'result': {'number': '0x10'}}
+
+        response_list = []
+        def get():
+            response_list.append(self.response_cache.get_or_fetch('eth_getBlockByNumber', ['0x10', False], fetch, self._fetch_head))
+
+        thread_list = [Thread(target=get) for _ in range(3)]
+        thread_list[0].start()
+        fetch_started.wait(5)
+        for thread in thread_list[1:]: thread.start()
+        # wait followers blocked on leader
+        while self.response_cache.get_metrics()['coalesced'] < 2: time.sleep(0.01)
+        fetch_release.set()
+        for thread in thread_list: thread.join(5)
+
+        self.assertEqual(self.fetch_count, 1)
+        self.assertEqual(len(response_list), 3)
+
+    def testSqliteTier(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            disk_store = SqliteResponseStore(os.path.join(tmp_dir, 'rpc.db'))
+            self.response_cache = RpcResponseCache(1, finality_offset=6, max_size=100, head_ttl_sec=60, disk_store=disk_store)
+            self._get('eth_getBlockByNumber', ['0x10', False], {'number': '0x10'})
+
+            # new process memory tier empty
+            self.response_cache = RpcResponseCache(1, finality_offset=6, max_size=100, head_ttl_sec=60, disk_store=disk_store)
+            self._get('eth_getBlockByNumber', ['0x10', False], {'number': '0x10'})
+            self.assertEqual(self.fetch_count, 1)
+            self.assertEqual(self.response_cache.get_metrics()['disk_hit'], 1)
+
+class TransactionsByToSetTest(TestCase):
+
+    def setUp(self):
+        blockchain_model = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.blockchain_facade = blockchainHolder.get_facade_by_model(blockchain_model)
+        self.async_blockchain_facade = asyncBlockchainHolder.get_facade_by_model(blockchain_model)
+        self.contract_address = to_checksum_address('0x' + 'ab' * 20)
+        self.raw_tx_list = [
+            {'hash': '0x' + '01' * 32, 'to': self.contract_address},
+            {'hash': '0x' + '02' * 32, 'to': self.contract_address.lower()},
+            {'hash': '0x' + '03' * 32, 'to': None},
+            {'hash': '0x' + '04' * 32, 'to': '0x' + '11' * 20},
+        ]
+        # to of transaction matched in any case
+        self.to_set = {self.contract_address.lower()}
+
+    def _get_hash_list(self, transactions):
+        return [HexBytes(t['hash']).hex() for t in transactions]
+
+    def testSameOnEveryPath(self):
+        block = AttributeDict({'number': 1, 'transactions': [AttributeDict(t) for t in self.raw_tx_list]})
+        expected_hash_list = ['0x' + '01' * 32, '0x' + '02' * 32]
+
+        with mock.patch.object(self.blockchain_facade, 'iter_full_block_info', return_value=iter([block])):
+            self.assertEqual(self._get_hash_list(self.blockchain_facade.get_transactions_by_to_set(1, 2, self.to_set)), expected_hash_list)
+
+        with override_settings(IZUMI_INFRA_BLOCKCHAIN={'ENABLE_RPC_STREAMING_RESPONSE': True}), \
+                mock.patch.object(self.blockchain_facade, '_make_stream_request', side_effect=lambda *args: iter(self.raw_tx_list)):
+            self.assertEqual(self._get_hash_list(self.blockchain_facade.get_transactions_by_to_set(1, 2, self.to_set)), expected_hash_list)
+
+        async def get_full_block_infos(block_ids):
+            return [block]
+
+        with mock.patch.object(self.async_blockchain_facade, 'get_full_block_infos', side_effect=get_full_block_infos):
+            transactions = self.async_blockchain_facade.run(self.async_blockchain_facade.get_transactions_by_to_set(1, 2, self.to_set))
+        self.assertEqual(self._get_hash_list(transactions), expected_hash_list)
+
+@override_settings(IZUMI_INFRA_BLOCKCHAIN={'RPC_BATCH_SIZE': 2})
+class BatchRequestTest(TestCase):
+
+    def setUp(self):
+        blockchain_model = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.blockchain_facade = blockchainHolder.get_facade_by_model(blockchain_model)
+        self.tx_hash = '0x' + '22' * 32
+        self.batch_list = []
+
+    def _make_raw_request(self, request_data, is_idempotent):
+        request_list = json.loads(request_data)
+        self.batch_list.append(([r['method'] for r in request_list], is_idempotent))
+        response_list = []
+        for request in request_list:
+            method, params = request['method'], request['params']
+            if method == 'eth_getTransactionByHash': continue
+            if method == 'eth_getBlockByNumber' and params[0] == '0x2':
+                response_list.append({'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32000, 'message': 'header not found'}})
+            elif method == 'eth_getBlockByNumber':
+                response_list.append({'jsonrpc': '2.0', 'id': request['id'],
+                                      'result': {'number': params[0], 'timestamp': '0x64', 'hash': '0x' + '11' * 32}})
+            else:
+                response_list.append({'jsonrpc': '2.0', 'id': request['id'], 'result': '0x' + '00' * 31 + '01'})
+        # provider may reply batch out of order
+        return json.dumps(response_list[::-1]).encode()
+
+    def _batch_request(self, raise_on_error=False):
+        method_params_list = [('eth_getBlockByNumber', [b, False]) for b in (1, 2, 3)] + [
+            ('eth_call', [{'to': '0x' + '11' * 20, 'data': '0x'}, 'latest']),
+            ('eth_getTransactionByHash', [self.tx_hash]),
+        ]
+        with mock.patch.object(self.blockchain_facade.w3.provider, 'make_raw_request', side_effect=self._make_raw_request):
+            return self.blockchain_facade.batch_request(method_params_list, raise_on_error)
+
+    def testBatchRequest(self):
+        result_list = self._batch_request()
+
+        self.assertEqual(sorted(len(methods) for methods, _ in self.batch_list), [1, 2, 2])
+        self.assertTrue(all(is_idempotent for _, is_idempotent in self.batch_list))
+        # result by request order, formatted as web3 single request
+        self.assertEqual((result_list[0].number, result_list[0].timestamp), (1, 100))
+        self.assertEqual(result_list[0].hash, HexBytes('0x' + '11' * 32))
+        self.assertEqual(result_list[2].number, 3)
+        self.assertEqual(result_list[3], HexBytes('0x' + '00' * 31 + '01'))
+        # error item and missing id mapped to its exception only
+        self.assertIsInstance(result_list[1], ValueError)
+        self.assertIn('header not found', str(result_list[1]))
+        self.assertIsInstance(result_list[4], ValueError)
+        self.assertIn('missing batch response id', str(result_list[4]))
+
+    def testRaiseOnError(self):
+        with self.assertRaises(ValueError):
+            self._batch_request(raise_on_error=True)
+
+@override_settings(IZUMI_INFRA_BLOCKCHAIN={'MULTICALL_MAX_GAS': 250_000, 'MULTICALL_CALL_GAS': 100_000})
+class MulticallTest(TestCase):
+
+    def setUp(self):
+        blockchain_model = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.blockchain_facade = blockchainHolder.get_facade_by_model(blockchain_model)
+        self.multicall_address = self.blockchain_facade.get_multicall3_address()
+        self.call_list = [(to_checksum_address('0x' + '%02x' % (i + 1) * 20), HexBytes('0x%08x' % i)) for i in range(5)]
+        self.fail_aggregate_to = None
+        self.request_to_list = []
+
+    def _make_batch_request(self, method_params_list):
+        response_list = []
+        for request_id, (_, (transaction, _)) in enumerate(method_params_list):
+            to, data = to_checksum_address(transaction['to']), HexBytes(transaction['data'])
+            self.request_to_list.append(to)
+            if to != self.multicall_address:
+                response_list.append({'jsonrpc': '2.0', 'id': request_id, 'result': (HexBytes(to) + data).hex()})
+                continue
+
+            (aggregate_call_list,) = decode_abi(['(address,bool,bytes)[]'], data[4:])
+            if any(c[0] == self.fail_aggregate_to for c in aggregate_call_list):
+                response_list.append({'jsonrpc': '2.0', 'id': request_id, 'error': {'code': -32000, 'message': 'aggregate3 fail'}})
+                continue
+            # call of data 0x00000001 reverted
+            aggregate_result = [(c[2] != HexBytes('0x00000001'), HexBytes(c[0]) + c[2]) for c in aggregate_call_list]
+            response_list.append({'jsonrpc': '2.0', 'id': request_id, 'result': encode_abi(['(bool,bytes)[]'], [aggregate_result]).hex()})
+        return response_list
+
+    def testChunkByGas(self):
+        self.assertEqual(self.blockchain_facade._chunk_multicall(self.call_list), [[0, 1], [2, 3], [4]])
+        # call over max gas alone in one chunk
+        gas_list = [200_000, 10_000, 10_000, 300_000, 10_000]
+        self.assertEqual(self.blockchain_facade._chunk_multicall(self.call_list, gas_list), [[0, 1, 2], [3], [4]])
+
+    def testChunkByCalldata(self):
+        with override_settings(IZUMI_INFRA_BLOCKCHAIN={'MULTICALL_CALL_GAS': 1, 'MULTICALL_MAX_CALLDATA_BYTES': 3 * (7 * 32 + 4)}):
+            self.assertEqual(self.blockchain_facade._chunk_multicall(self.call_list), [[0, 1, 2], [3, 4]])
+
+    def testMulticallFallbackByChunk(self):
+        self.fail_aggregate_to = self.call_list[2][0]
+        with mock.patch.object(self.blockchain_facade, '_make_batch_request_concurrently', side_effect=self._make_batch_request):
+            result_list = self.blockchain_facade.multicall(self.call_list)
+
+        # one aggregate3 per chunk, failed chunk fallback to eth_call of each call
+        self.assertEqual(self.request_to_list, [self.multicall_address] * 3 + [self.call_list[2][0], self.call_list[3][0]])
+        self.assertEqual(len(result_list), 5)
+        self.assertIsInstance(result_list[1], ContractLogicError)
+        for i in (0, 2, 3, 4):
+            self.assertEqual(result_list[i], HexBytes(self.call_list[i][0]) + self.call_list[i][1])
+
+class AbiDecoderTest(TestCase):
+    """
+    compiled decoder output same as eth_event decode_log and web3 decode_function_input
+    """
+
+    def _event_log(self, abi_json_str: str, event_name: str, values: Dict, indexed_in_topics: bool = True):
+        event_abi = next(e for e in json.loads(abi_json_str) if e['type'] == 'event' and e['name'] == event_name)
+        topic_inputs = [i for i in event_abi['inputs'] if i['indexed'] and indexed_in_topics]
+        data_inputs = [i for i in event_abi['inputs'] if i not in topic_inputs]
+        return AttributeDict({
+            'address': '0x' + '11' * 20,
+            'topics': [HexBytes(ContractFacade.build_event_topic(abi_json_str, event_name))]
+                      + [HexBytes(encode_abi([i['type']], [values[i['name']]])) for i in topic_inputs],
+            'data': HexBytes(encode_abi([i['type'] for i in data_inputs], [values[i['name']] for i in data_inputs])).hex(),
+        })
+
+    def _assertEventParity(self, abi_json_str: str, log: Dict):
+        abi_hash = abiDecoderRegistry.register_abi(abi_json_str)
+        expected = covert_decode_log_to_event(eth_event.decode_log(log, eth_event.get_topic_map(json.loads(abi_json_str))))
+        self.assertEqual(abiDecoderRegistry.decode_event_log(abi_hash, log), expected)
+
+    def _assertFunctionParity(self, abi_json_str: str, fn_name: str, args: List):
+        contract = Web3().eth.contract(abi=json.loads(abi_json_str))
+        input_data = contract.encodeABI(fn_name=fn_name, args=args)
+        expected_fn, expected_params = contract.decode_function_input(input_data)
+
+        fn_decoder, params = abiDecoderRegistry.decode_function_input(abiDecoderRegistry.register_abi(abi_json_str), input_data)
+        self.assertEqual(fn_decoder.fn_name, expected_fn.fn_name)
+        self.assertEqual(params, expected_params)
+
+    def testEventParity(self):
+        erc20_abi = BaseContractABI.ERC20_ABI.value
+        transfer = {'from': '0x' + '22' * 20, 'to': '0x' + '33' * 20, 'value': 10**30}
+        self._assertEventParity(erc20_abi, self._event_log(erc20_abi, 'Transfer', transfer))
+        # indexed value in data when log without topics of them
+        self._assertEventParity(erc20_abi, self._event_log(erc20_abi, 'Transfer', transfer, indexed_in_topics=False))
+
+        pool_abi = BaseContractABI.UNISWAP_POOL_ABI.value
+        self._assertEventParity(pool_abi, self._event_log(pool_abi, 'Swap', {
+            'sender': '0x' + '22' * 20, 'recipient': '0x' + '33' * 20, 'amount0': -10**18, 'amount1': 5 * 10**6,
+            'sqrtPriceX96': 2**96, 'liquidity': 10**20, 'tick': -887272}))
+        self._assertEventParity(pool_abi, self._event_log(pool_abi, 'Mint', {
+            'sender': '0x' + '22' * 20, 'owner': '0x' + '33' * 20, 'tickLower': -600, 'tickUpper': 600,
+            'amount': 10**18, 'amount0': 1, 'amount1': 2}))
+
+        # all indexed, empty data
+        manager_abi = BaseContractABI.UNISWAP_NONFUNGIBLE_POSITION_MANAGER_ABI.value
+        self._assertEventParity(manager_abi, self._event_log(manager_abi, 'Transfer', {
+            'from': '0x' + '00' * 20, 'to': '0x' + '33' * 20, 'tokenId': 1}))
+
+    def testFunctionParity(self):
+        recipient = to_checksum_address('0x' + '33' * 20)
+        token0, token1 = to_checksum_address('0x' + '44' * 20), to_checksum_address('0x' + '55' * 20)
+
+        self._assertFunctionParity(BaseContractABI.ERC20_ABI.value, 'transfer', [recipient, 10**30])
+
+        manager_abi = BaseContractABI.UNISWAP_NONFUNGIBLE_POSITION_MANAGER_ABI.value
+        mint_params = (token0, token1, 3000, -600, 600, 10**18, 10**6, 0, 0, recipient, 2**32)
+        self._assertFunctionParity(manager_abi, 'mint', [mint_params])
+        mint_data = Web3().eth.contract(abi=json.loads(manager_abi)).encodeABI(fn_name='mint', args=[mint_params])
+        self._assertFunctionParity(manager_abi, 'multicall', [[HexBytes(mint_data), HexBytes('0x12210e8a')]])
+
+        path = HexBytes(token0) + (3000).to_bytes(3, 'big') + HexBytes(token1)
+        self._assertFunctionParity(BaseContractABI.UNISWAP_SWAP_ROUTER_ABI.value, 'exactInput', [(path, recipient, 2**32, 10**18, 0)])
+
+@override_settings(IZUMI_INFRA_BLOCKCHAIN={'BALANCE_SNAPSHOT_CHUNK_SIZE': 2, 'BALANCE_SNAPSHOT_MAX_WORKERS': 1})
+class BalanceSnapshotTest(TransactionTestCase):
+    # worker thread of snapshot query db by own connection, so data must be committed
+
+    def setUp(self):
+        Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.token = to_checksum_address('0x' + 'aa' * 20)
+        self.account_list = [to_checksum_address('0x' + '%02x' % (i + 1) * 20) for i in range(4)]
+        self.fetch_pair_list = []
+
+    def _get_erc20_raw_balances(self, chain_id, token_account_list, block_number):
+        self.assertEqual((chain_id, block_number), (1, 100))
+        self.fetch_pair_list.extend(token_account_list)
+        return [self.account_list.index(a) + 1 for _, a in token_account_list]
+
+    def _get_erc20_raw_balances_partial_fail(self, chain_id, token_account_list, block_number):
+        account_set = {a for _, a in token_account_list}
+        if self.account_list[0] in account_set:
+            raise HTTPError('rpc fail')
+        return [None if a == self.account_list[2] else self.account_list.index(a) + 1 for _, a in token_account_list]
+
+    def _get_item_status_list(self, snapshot):
+        return list(BalanceSnapshotItem.objects.filter(snapshot=snapshot).order_by('pk').values_list('status', flat=True))
+
+    def testResumeAfterFail(self):
+        snapshot = create_balance_snapshot('s1', 1, 100, [self.token], self.account_list)
+        with mock.patch.object(balanceSnapshotFacade, 'get_erc20_raw_balances', side_effect=self._get_erc20_raw_balances_partial_fail):
+            self.assertEqual(run_balance_snapshot(snapshot), {'success': 1, 'fail': 1})
+
+        # item of failed chunk stay INITIAL, None balance FAIL
+        self.assertEqual(self._get_item_status_list(snapshot), [BalanceSnapshotItemStatusEnum.INITIAL, BalanceSnapshotItemStatusEnum.INITIAL,
+                                                                BalanceSnapshotItemStatusEnum.FAIL, BalanceSnapshotItemStatusEnum.SUCCESS])
+        self.assertEqual(BalanceSnapshot.objects.get(id=snapshot.id).status, BalanceSnapshotStatusEnum.INITIAL)
+
+        # create again after crash reuse snapshot and items
+        snapshot = create_balance_snapshot('s1', 1, 100, [self.token], self.account_list)
+        self.assertEqual(BalanceSnapshotItem.objects.filter(snapshot=snapshot).count(), 4)
+        with mock.patch.object(balanceSnapshotFacade, 'get_erc20_raw_balances', side_effect=self._get_erc20_raw_balances):
+            self.assertEqual(run_balance_snapshot(snapshot), {'success': 3, 'fail': 0})
+
+        # rerun fetch unfinished item only
+        self.assertEqual(self.fetch_pair_list, [(self.token, a) for a in self.account_list[:3]])
+        self.assertEqual(BalanceSnapshot.objects.get(id=snapshot.id).status, BalanceSnapshotStatusEnum.FINISHED)
+        self.assertEqual(get_balance_snapshot_balances(snapshot, self.token), {a: i + 1 for i, a in enumerate(self.account_list)})
+
+    def testConflictSnapshot(self):
+        create_balance_snapshot('s1', 1, 100, [self.token], self.account_list)
+        with self.assertRaises(ValueError):
+            create_balance_snapshot('s1', 1, 101, [self.token], self.account_list)
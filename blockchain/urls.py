@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+from django.urls import path
+
+from izumi_infra.blockchain import views
+
+urlpatterns = [
+    path('metrics/rpc', views.rpc_metrics),
+]
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from decimal import Decimal
-from typing import Dict
+from typing import Dict, Set
 
 from izumi_infra.blockchain.types import TokenConfigType, TokenMeta
 
@@ -17,5 +17,11 @@ def sort_addr(addr0: str, addr1: str):
         return addr1, addr0
     return addr0, addr1
 
+def is_transaction_to(transaction: Dict, to_lower_set: Set[str]) -> bool:
+    """
+    to of transaction in lower case address set, contract creation transaction has no to
+    """
+    return bool(transaction.get('to')) and transaction['to'].lower() in to_lower_set
+
 def build_chain_id_and_token_addr_lookup_dict(tokenConfig: TokenConfigType) -> Dict[str, TokenMeta]:
     return { c: { t['address']: t for t in v.values() } for c, v in tokenConfig.items() }
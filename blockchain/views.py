@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from django.http import HttpResponse
+
+from izumi_infra.blockchain.rate_limiter import rateLimiterHolder
+from izumi_infra.blockchain.rpc_metrics import InMemoryRpcMetrics, rpcMetricsHolder
+from izumi_infra.blockchain.rpc_response_cache import rpcResponseCacheHolder
+
+# (metric name, type, RateLimitMetrics key, help)
+RATE_LIMIT_METRICS = (
+    ('acquire_total', 'counter', 'acquire_count', 'Rpc rate limit acquire count.'),
+    ('tokens_total', 'counter', 'token_count', 'Rpc rate limit token taken.'),
+    ('wait_total', 'counter', 'wait_count', 'Rpc rate limit acquire count which waited for token.'),
+    ('wait_seconds_total', 'counter', 'total_wait_sec', 'Time waited for rpc rate limit token.'),
+    ('max_wait_seconds', 'gauge', 'max_wait_sec', 'Max time of one rpc rate limit wait.'),
+)
+
+def rpc_metrics(request):
+    """
+    Prometheus text exposition of InMemoryRpcMetrics, rate limit acquire and wait, response cache of current process
+    """
+    lines = []
+    rate_limit_metrics = rateLimiterHolder.get_metrics()
+    if rate_limit_metrics:
+        for name, metric_type, key, help_text in RATE_LIMIT_METRICS:
+            lines.extend([
+                f'# HELP izumi_infra_rpc_rate_limit_{name} {help_text}',
+                f'# TYPE izumi_infra_rpc_rate_limit_{name} {metric_type}',
+            ])
+            lines.extend(f'izumi_infra_rpc_rate_limit_{name}{{chain_id="{chain_id}"}} {m[key]}'
+                         for chain_id, m in rate_limit_metrics.items())
+
+    cache_metrics = rpcResponseCacheHolder.get_metrics()
+    if cache_metrics:
+        lines.extend([
+            '# HELP izumi_infra_rpc_response_cache_total Rpc response cache lookup and store count by result.',
+            '# TYPE izumi_infra_rpc_response_cache_total counter',
+        ])
+        lines.extend(f'izumi_infra_rpc_response_cache_total{{chain_id="{chain_id}",result="{result}"}} {count}'
+                     for chain_id, m in cache_metrics.items() for result, count in m.items())
+
+    backend = rpcMetricsHolder.get_backend(InMemoryRpcMetrics)
+    content = backend.render_prometheus() if backend is not None else ''
+    if lines: content += '\n'.join(lines) + '\n'
+    return HttpResponse(content, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,6 +1,7 @@
 from django.apps import AppConfig
 
 from izumi_infra.etherscan.threads.AsyncEthScanThread import AsyncEthScanThread
+from izumi_infra.etherscan.threads.HeadScanTriggerThread import HeadScanTriggerThread
 
 class EtherscanConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
@@ -9,5 +10,6 @@ class EtherscanConfig(AppConfig):
     def ready(self) -> None:
         # daemon
         AsyncEthScanThread().start()
+        HeadScanTriggerThread().start()
 
         return super().ready()
@@ -11,6 +11,14 @@ DEFAULTS = {
     'ETHERSCAN_AUDIT_AUTO_FIX_MISSING_TASK': os.environ.get("IZUMI_INFRA_ETHERSCAN.ETHERSCAN_AUDIT_AUTO_FIX_MISSING_TASK", "True") == 'True',
     'ETHERSCAN_AUDIT_TASK_MERGE_MINUTES': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ETHERSCAN_AUDIT_TASK_MERGE_MINUTES", 60)),
     'ETH_MAX_SCAN_BLOCK': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ETH_MAX_SCAN_BLOCK", 1000)),
+    # eth_getLogs window start from ETH_MAX_SCAN_BLOCK, adapt in [MIN, MAX] by provider response
+    'ENABLE_ADAPTIVE_SCAN_BLOCK': os.environ.get("IZUMI_INFRA_ETHERSCAN.ENABLE_ADAPTIVE_SCAN_BLOCK", "False") == 'True',
+    'ETH_ADAPTIVE_MIN_SCAN_BLOCK': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ETH_ADAPTIVE_MIN_SCAN_BLOCK", 1)),
+    'ETH_ADAPTIVE_MAX_SCAN_BLOCK': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ETH_ADAPTIVE_MAX_SCAN_BLOCK", 10000)),
+    # grow window when logs count of one response less than it
+    'ETH_ADAPTIVE_GROW_LOGS_THRESHOLD': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ETH_ADAPTIVE_GROW_LOGS_THRESHOLD", 2000)),
+    # learned window expire after it and start from ETH_MAX_SCAN_BLOCK again
+    'ETH_ADAPTIVE_WINDOW_TTL_SEC': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ETH_ADAPTIVE_WINDOW_TTL_SEC", 60*60)),
     'SAFE_BLOCK_NUM_OFFSET': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.SAFE_BLOCK_NUM_OFFSET", 6)),
     'TASK_BATCH_SCAN_BLOCK': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.TASK_BATCH_SCAN_BLOCK", 100)),
     'EVENT_SCAN_MAX_WORKERS': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.EVENT_SCAN_MAX_WORKERS", 4)),
@@ -22,6 +30,39 @@ DEFAULTS = {
     'EVENT_SCAN_FALLBACK_FUNCTION_LIST': None,
     'ENABLE_ASYNC_EVENT_SCANT': os.environ.get("IZUMI_INFRA_ETHERSCAN.ENABLE_ASYNC_EVENT_SCANT", "True") == 'True',
     'ASYNC_EVENT_SCANT_CONN_TIMEOUT_SEC': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ASYNC_EVENT_SCANT_CONN_TIMEOUT_SEC", 5*60)),
+    # realtime event configs of one ws_rpc_url share websocket, max subscription per connection, 0 for one connection
+    'ASYNC_EVENT_SCANT_MAX_SUBSCRIPTION_PER_CONN': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ASYNC_EVENT_SCANT_MAX_SUBSCRIPTION_PER_CONN", 0)),
+    # realtime event of one config delivered by one task when batch size reached or oldest waited max latency, 1 for one task per event
+    'ASYNC_EVENT_SCANT_BATCH_SIZE': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ASYNC_EVENT_SCANT_BATCH_SIZE", 100)),
+    'ASYNC_EVENT_SCANT_BATCH_MAX_LATENCY_MS': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ASYNC_EVENT_SCANT_BATCH_MAX_LATENCY_MS", 500)),
+    # eth_getLogs from last seen block to head after realtime reconnect, gap over max blocks left to audit, 0 for disabled
+    'ASYNC_EVENT_SCANT_BACKFILL_MAX_BLOCKS': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ASYNC_EVENT_SCANT_BACKFILL_MAX_BLOCKS", 10_000)),
+    'ASYNC_EVENT_SCANT_BACKFILL_BLOCK_WINDOW': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ASYNC_EVENT_SCANT_BACKFILL_BLOCK_WINDOW", 2000)),
+    # scan chain once head - stable_block_offset passed last scan, by eth_subscribe newHeads of ws_rpc_url or head poll,
+    # beat contract_event_scan_task and contract_trans_scan_task only delay chain scan task as fallback when enabled
+    'ENABLE_HEAD_SCAN_TRIGGER': os.environ.get("IZUMI_INFRA_ETHERSCAN.ENABLE_HEAD_SCAN_TRIGGER", "False") == 'True',
+    # min interval of scan trigger of one chain, heads in between merged into one trigger
+    'HEAD_SCAN_DEBOUNCE_MS': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.HEAD_SCAN_DEBOUNCE_MS", 1000)),
+    # eth_blockNumber interval of chain without ws_rpc_url or newHeads support
+    'HEAD_SCAN_POLL_INTERVAL_MS': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.HEAD_SCAN_POLL_INTERVAL_MS", 1000)),
+    'HEAD_SCAN_CONN_TIMEOUT_SEC': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.HEAD_SCAN_CONN_TIMEOUT_SEC", 60)),
+    # write scanned entity by bulk_create in one transaction with task status
+    'ENABLE_EVENT_BULK_INSERT': os.environ.get("IZUMI_INFRA_ETHERSCAN.ENABLE_EVENT_BULK_INSERT", "False") == 'True',
+    'ENABLE_TRANS_BULK_INSERT': os.environ.get("IZUMI_INFRA_ETHERSCAN.ENABLE_TRANS_BULK_INSERT", "False") == 'True',
+    'BULK_INSERT_CHUNK_SIZE': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.BULK_INSERT_CHUNK_SIZE", 500)),
+    # prefetch event logs of next N tasks for one config, 0 or 1 for sequential
+    'EVENT_SCAN_PREFETCH_TASK_NUM': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.EVENT_SCAN_PREFETCH_TASK_NUM", 0)),
+    # max concurrent prefetch rpc of one chain, {chain_id: num} override default
+    'EVENT_SCAN_CHAIN_CONCURRENCY': {},
+    'EVENT_SCAN_DEFAULT_CHAIN_CONCURRENCY': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.EVENT_SCAN_DEFAULT_CHAIN_CONCURRENCY", 4)),
+    # one eth_getLogs per block window for all event configs of a chain
+    'ENABLE_CHAIN_EVENT_SCAN': os.environ.get("IZUMI_INFRA_ETHERSCAN.ENABLE_CHAIN_EVENT_SCAN", "False") == 'True',
+    # fill block_time of scanned entity by block header cache
+    'ENABLE_BLOCK_TIME_ENRICH': os.environ.get("IZUMI_INFRA_ETHERSCAN.ENABLE_BLOCK_TIME_ENRICH", "False") == 'True',
+    # fetch by asyncio facade, event logs of ASYNC_EVENT_SCAN_TASK_BATCH tasks and full blocks of one task concurrently
+    'ENABLE_ASYNC_RPC_SCAN': os.environ.get("IZUMI_INFRA_ETHERSCAN.ENABLE_ASYNC_RPC_SCAN", "False") == 'True',
+    'ASYNC_EVENT_SCAN_TASK_BATCH': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.ASYNC_EVENT_SCAN_TASK_BATCH", 100)),
+    'EVENT_SCAN_PREFETCH_CACHE_SIZE': int(os.environ.get("IZUMI_INFRA_ETHERSCAN.EVENT_SCAN_PREFETCH_CACHE_SIZE", 256)),
 }
 
 IMPORT_STRINGS = {
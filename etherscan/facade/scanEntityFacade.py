@@ -1,15 +1,22 @@
 # -*- coding: utf-8 -*-
+import logging
 from datetime import datetime, timedelta
 from time import sleep
+from typing import Dict, List, Tuple, Type
 from izumi_infra.etherscan.constants import ProcessingStatusEnum
 
-from django.db.models import F
+from django.db import transaction
+from django.db.models import F, Model
+from django.db.utils import IntegrityError
 from izumi_infra.etherscan.models import ContractEvent, ContractTransaction
 from izumi_infra.etherscan.conf import etherscan_settings
 from izumi_infra.etherscan.utils import mark_as_sync_entity
 
+from izumi_infra.utils.collection_utils import chunks
 from izumi_infra.utils.db_utils import order_chunked_iterator
 
+logger = logging.getLogger(__name__)
+
 def scan_and_touch_entity():
     """
     retry task for post_save signal
@@ -41,3 +48,80 @@ def scan_and_touch_entity():
             entity.touch_count_remain = F('touch_count_remain') - 1
             mark_as_sync_entity(entity)
             entity.save()
+
+def bulk_create_entity_records(model_class: Type[Model], record_list: List[Dict], key_fields: Tuple[str, str],
+                               order_fields: Tuple[str, str], desc: str) -> Tuple[List[Model], int]:
+    """
+    Chunked bulk_create of scanned entity in caller transaction, record of exist unique key_fields skipped,
+    return (new created entities order by order_fields, failed count). post_save left to caller on commit.
+    """
+    created_entity_list = []
+    failed_count = 0
+    for record_chunk in chunks(record_list, etherscan_settings.BULK_INSERT_CHUNK_SIZE):
+        try:
+            with transaction.atomic():
+                created_entity_list.extend(_bulk_create_entity_chunk(model_class, record_chunk, key_fields, order_fields))
+        except Exception as e:
+            logger.error(f'bulk insert {model_class.__name__} chunk fail, fallback row by row, {desc}')
+            logger.exception(e)
+            fallback_entity_list, fallback_failed_count = _create_entity_row_by_row(model_class, record_chunk, key_fields)
+            created_entity_list.extend(fallback_entity_list)
+            failed_count = failed_count + fallback_failed_count
+    return created_entity_list, failed_count
+
+def _get_entity_key(record: Dict, key_fields: Tuple[str, str]) -> Tuple:
+    return tuple(record[f] for f in key_fields)
+
+def _log_duplicate_entity(model_class: Type[Model], record: Dict, key_fields: Tuple[str, str]) -> None:
+    key_desc = ', '.join(f'{f}: {record[f]}' for f in key_fields)
+    logger.warn(f'ignore duplicate {model_class.__name__}, block: {record["block_number"]}, {key_desc}')
+
+def _bulk_create_entity_chunk(model_class: Type[Model], record_chunk: List[Dict], key_fields: Tuple[str, str],
+                              order_fields: Tuple[str, str]) -> List[Model]:
+    """
+    return new created entities, exist key_fields are skipped.
+    Insert without ignore_conflicts, row of same key inserted by other writer meanwhile fail the chunk
+    instead of reported as created by this call.
+    """
+    first_key_field = key_fields[0]
+    exist_key_set = set(model_class.objects.filter(
+        **{f'{first_key_field}__in': set(r[first_key_field] for r in record_chunk)}
+    ).values_list(*key_fields))
+
+    new_record_dict = {}
+    for r in record_chunk:
+        entity_key = _get_entity_key(r, key_fields)
+        if entity_key in exist_key_set:
+            _log_duplicate_entity(model_class, r, key_fields)
+            continue
+        new_record_dict[entity_key] = r
+
+    if not new_record_dict: return []
+
+    model_class.objects.bulk_create([model_class(**r) for r in new_record_dict.values()])
+
+    # pk not set by bulk_create on every backend, reload for signal receivers
+    created_entity_list = model_class.objects.select_related('contract').filter(
+        **{f'{first_key_field}__in': set(k[0] for k in new_record_dict.keys())}
+    ).order_by(*order_fields)
+    return [e for e in created_entity_list if tuple(getattr(e, f) for f in key_fields) in new_record_dict]
+
+def _create_entity_row_by_row(model_class: Type[Model], record_chunk: List[Dict], key_fields: Tuple[str, str]) -> Tuple[List[Model], int]:
+    """
+    return (new created entities, failed count), insert without post_save which left to caller on commit as bulk path
+    """
+    created_entity_list = []
+    failed_count = 0
+    for record in record_chunk:
+        try:
+            with transaction.atomic():
+                model_class.objects.bulk_create([model_class(**record)])
+                created_entity_list.append(model_class.objects.select_related('contract').get(
+                    **{f: record[f] for f in key_fields}))
+        except IntegrityError:
+            _log_duplicate_entity(model_class, record, key_fields)
+        except Exception as e:
+            failed_count = failed_count + 1
+            logger.exception(e)
+
+    return created_entity_list, failed_count
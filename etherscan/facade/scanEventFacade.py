@@ -1,53 +1,196 @@
 # -*- coding: utf-8 -*-
+import contextvars
 import json
 import logging
 import traceback
+from collections import deque
+from datetime import datetime
 from concurrent.futures import wait
-from typing import List
+from threading import Lock
+from typing import Dict, List, Tuple
 
+from cachetools import LRUCache
+from django.db import transaction
 from django.db.utils import IntegrityError
 
-from izumi_infra.blockchain.context import contractHolder
+from izumi_infra.blockchain.constants import ZERO_ADDRESS
+from izumi_infra.blockchain.context import asyncBlockchainHolder, contractHolder
+from izumi_infra.blockchain.rpc_metrics import rpc_metrics_tag
 from izumi_infra.etherscan.conf import etherscan_settings
 from izumi_infra.etherscan.constants import (FILTER_SPLIT_CHAR,
                                              ScanConfigStatusEnum,
                                              ScanTaskStatusEnum, ScanTypeEnum)
+from izumi_infra.etherscan.facade.scanEntityFacade import bulk_create_entity_records
 from izumi_infra.etherscan.models import (ContractEvent, ContractEventScanTask,
                                           EtherScanConfig)
 from izumi_infra.etherscan.scan_utils import (dict_to_EventData,
+                                              get_chain_scan_semaphore,
                                               get_filter_set_from_str,
+                                              get_sorted_chain_config,
                                               get_sorted_chain_group_config)
-from izumi_infra.etherscan.types import EventExtra, EventExtraData
-from izumi_infra.etherscan.utils import execute_filter_func_chain
+from izumi_infra.etherscan.types import EventData, EventExtra, EventExtraData
+from izumi_infra.etherscan.utils import (execute_filter_func_chain,
+                                         send_entity_post_save)
 from izumi_infra.utils.collection_utils import chunks
 from izumi_infra.utils.db_utils import DjangoDbConnSafeThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# unique key and insert order of ContractEvent for bulk insert
+EVENT_KEY_FIELDS = ('transaction_hash', 'log_index')
+EVENT_ORDER_FIELDS = ('block_number', 'log_index')
 
-def scan_all_contract_event() -> None:
+
+def scan_all_contract_event(chain_id: int = None) -> None:
     """
-    Entry for the event info sync from blockchain.
+    Entry for the event info sync from blockchain, configs of chain_id only if given.
     """
 
     event_scan_config_list = EtherScanConfig.objects.select_related("contract__chain").filter(
         scan_type=ScanTypeEnum.Event,
         status=ScanConfigStatusEnum.ENABLE
     ).all()
-    event_scan_config_group = get_sorted_chain_group_config(event_scan_config_list)
+    if chain_id is not None: event_scan_config_list = event_scan_config_list.filter(contract__chain_id=chain_id)
+    if etherscan_settings.ENABLE_CHAIN_EVENT_SCAN:
+        event_scan_config_group = get_sorted_chain_config(event_scan_config_list)
+        scan_group_func = scan_chain_contract_event
+    else:
+        event_scan_config_group = get_sorted_chain_group_config(event_scan_config_list)
+        scan_group_func = scan_contract_event_group
 
     max_workers = min(etherscan_settings.EVENT_SCAN_MAX_WORKERS, len(event_scan_config_group.keys()))
     with DjangoDbConnSafeThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='InfraEventScan') as e:
         result = []
         for _, config_group_list in event_scan_config_group.items():
-            r = e.submit(scan_contract_event_group, config_group_list)
+            r = e.submit(scan_group_func, config_group_list)
             result.append(r)
 
         wait(result)
 
 def scan_contract_event_group(event_scan_config_group: List[EtherScanConfig]):
     for scan_config in event_scan_config_group:
-        scan_contract_event_by_config(scan_config)
+        with rpc_metrics_tag(f'event_scan:{scan_config.id}'):
+            scan_contract_event_by_config(scan_config)
+
+class ChainEventScanRoute():
+    """
+    Pending tasks of one config in chain scan, collect routed logs by task and commit by block order
+    """
+
+    def __init__(self, event_scan_config: EtherScanConfig, unfinished_task_list: List[ContractEventScanTask]) -> None:
+        self.scan_config = event_scan_config
+        self.contract_facade = contractHolder.get_facade_by_model(event_scan_config.contract)
+        self.task_list = deque(unfinished_task_list)
+        self.task_logs = {t.id: [] for t in unfinished_task_list}
+        self.is_stopped = False
+
+        to_address_set = get_filter_set_from_str(event_scan_config.to_address_filter_list)
+        self.address_set = set(a.lower() for a in (to_address_set or [event_scan_config.contract.contract_address]))
+
+        topic_filter_set = get_filter_set_from_str(event_scan_config.topic_filter_list)
+        topic_mapping = self.contract_facade.topic_name_to_topic_mapping
+        if topic_filter_set:
+            self.topic_set = set(topic_mapping[t] for t in topic_filter_set if t in topic_mapping)
+        else:
+            self.topic_set = set(topic_mapping.values())
+
+    @staticmethod
+    def is_support(event_scan_config: EtherScanConfig) -> bool:
+        """
+        zero address config without to address filter scan all address, not able to share
+        """
+        return bool(event_scan_config.to_address_filter_list.strip()) \
+            or event_scan_config.contract.contract_address.lower() != ZERO_ADDRESS
+
+    def is_pending_in(self, block_range: range) -> bool:
+        if self.is_stopped: return False
+        return any(t.start_block_id < block_range.stop and t.end_block_id > block_range.start for t in self.task_list)
+
+    def route(self, event_log: EventData) -> None:
+        if event_log['address'].lower() not in self.address_set: return
+        if event_log['topics'][0].hex() not in self.topic_set: return
+        block_number = event_log['blockNumber']
+        for task in self.task_list:
+            if task.start_block_id <= block_number < task.end_block_id:
+                self.task_logs[task.id].append(event_log)
+                return
+
+    def commit_until(self, block_id: int) -> None:
+        """
+        commit tasks which block range [start, end) all fetched before block_id
+        """
+        while not self.is_stopped and self.task_list and self.task_list[0].end_block_id <= block_id:
+            task = self.task_list.popleft()
+            try:
+                event_extra = build_event_extra_by_task(task, self.task_logs.pop(task.id))
+                is_all_success = commit_event_scan_task(task, event_extra)
+            except Exception as e:
+                logger.error(f"chain event scan commit error, task: {task}")
+                logger.exception(e)
+                is_all_success = False
+
+            if not is_all_success:
+                logger.info(f'stop chain event scan for config: {self.scan_config} at task: {task}')
+                self.is_stopped = True
+
+def scan_chain_contract_event(event_scan_config_list: List[EtherScanConfig]):
+    """
+    Scan event configs of one chain, one eth_getLogs per block window with union of address and topic,
+    then route logs to configs and advance their tasks.
+    """
+    route_list: List[ChainEventScanRoute] = []
+    for scan_config in event_scan_config_list:
+        if not ChainEventScanRoute.is_support(scan_config):
+            with rpc_metrics_tag(f'event_scan:{scan_config.id}'):
+                scan_contract_event_by_config(scan_config)
+            continue
+
+        try:
+            add_event_scan_task(scan_config)
+        except Exception as e:
+            logger.error(f"scan_chain_contract_event exception for config: {scan_config}")
+            logger.exception(e)
+
+        unfinished_task_list = list(ContractEventScanTask.objects.select_related('scan_config', 'contract__chain').filter(
+            contract=scan_config.contract,
+            status=ScanTaskStatusEnum.INITIAL
+        ).order_by('start_block_id'))
+        if not unfinished_task_list: continue
+
+        try:
+            route_list.append(ChainEventScanRoute(scan_config, unfinished_task_list))
+        except Exception as e:
+            logger.error(f"build chain event scan route error for config: {scan_config}")
+            logger.exception(e)
+
+    if not route_list: return
+
+    blockchain_facade = route_list[0].contract_facade.blockchainFacade
+    start_block_id = min(r.task_list[0].start_block_id for r in route_list)
+    end_block_id = max(r.task_list[-1].end_block_id for r in route_list)
+
+    for block_range in chunks(range(start_block_id, end_block_id), etherscan_settings.TASK_BATCH_SCAN_BLOCK):
+        active_route_list = [r for r in route_list if r.is_pending_in(block_range)]
+        if not active_route_list: continue
+
+        address_set = set().union(*[r.address_set for r in active_route_list])
+        topic_set = set().union(*[r.topic_set for r in active_route_list])
+        try:
+            with rpc_metrics_tag(f'chain_event_scan:{blockchain_facade.chain_id}'):
+                event_logs = blockchain_facade.get_all_event_logs(block_range.start, block_range.stop - 1,
+                                                                  list(address_set), list(topic_set))
+        except Exception as e:
+            logger.error(f"chain event scan get logs error, block range: {block_range}")
+            logger.exception(e)
+            logger.critical(f'event scan exception: {traceback.format_exc(limit=1)}')
+            break
+
+        for event_log in event_logs:
+            for route in active_route_list:
+                route.route(event_log)
+
+        for route in active_route_list:
+            route.commit_until(block_range.stop)
 
 def scan_contract_event_by_config(event_scan_config: EtherScanConfig):
     try:
@@ -61,6 +204,16 @@ def scan_contract_event_by_config(event_scan_config: EtherScanConfig):
         status=ScanTaskStatusEnum.INITIAL
     )
 
+    if etherscan_settings.ENABLE_ASYNC_RPC_SCAN:
+        unfinished_tasks = unfinished_tasks.select_related('scan_config', 'contract__chain').order_by('start_block_id')
+        execute_unfinished_event_scan_task_async(event_scan_config, list(unfinished_tasks))
+        return
+
+    if etherscan_settings.EVENT_SCAN_PREFETCH_TASK_NUM > 1:
+        unfinished_tasks = unfinished_tasks.select_related('scan_config', 'contract__chain').order_by('start_block_id')
+        execute_unfinished_event_scan_task_pipeline(event_scan_config, list(unfinished_tasks))
+        return
+
     for task in unfinished_tasks:
         try:
             execute_unfinished_event_scan_task(task)
@@ -102,38 +255,176 @@ def execute_unfinished_event_scan_task(unfinished_task: ContractEventScanTask) -
     if unfinished_task.status != ScanTaskStatusEnum.INITIAL: return
 
     event_extra = scan_event_by_task(unfinished_task)
+    commit_event_scan_task(unfinished_task, event_extra)
+
+def commit_event_scan_task(unfinished_task: ContractEventScanTask, event_extra: List[EventExtra]) -> bool:
+    """
+    Insert task events and mark task FINISHED if all success
+    """
+    if etherscan_settings.ENABLE_EVENT_BULK_INSERT:
+        # task status updated in the same transaction
+        return bulk_insert_contract_event(unfinished_task, event_extra)
+
     is_all_success = insert_contract_event(unfinished_task.scan_config, event_extra)
 
     if is_all_success:
         unfinished_task.status = ScanTaskStatusEnum.FINISHED
         unfinished_task.save()
 
-# TODO group chain scan
+    return is_all_success
+
+# event logs fetched but not committed by pipeline, key: (task id, from block, to block, address set, topic set)
+_prefetched_event_logs_cache = LRUCache(maxsize=etherscan_settings.EVENT_SCAN_PREFETCH_CACHE_SIZE)
+_prefetched_event_logs_lock = Lock()
+
+def _prefetch_cache_key(unfinished_task: ContractEventScanTask):
+    """
+    keyed by eth_getLogs query of task, logs fetched before address or topic filter of config changed not reused
+    """
+    from_block, to_block, contract_addr_list, topics = build_event_logs_query_by_task(unfinished_task)
+    return (unfinished_task.id, from_block, to_block, frozenset(a.lower() for a in contract_addr_list), frozenset(topics))
+
+def _is_continue_after_task_error(unfinished_task: ContractEventScanTask, e: Exception) -> bool:
+    """
+    EVENT_SCAN_FALLBACK_FUNCTION_LIST decide continue next task or abort, same as sequential scan
+    """
+    is_continue = execute_filter_func_chain(e, etherscan_settings.EVENT_SCAN_FALLBACK_FUNCTION_LIST)
+    if not is_continue:
+        logger.info(f'trigger fallback force abort task: {unfinished_task}')
+    return is_continue
+
+def execute_unfinished_event_scan_task_pipeline(event_scan_config: EtherScanConfig,
+                                                unfinished_task_list: List[ContractEventScanTask]) -> None:
+    """
+    Prefetch event logs of next N tasks concurrently, decode and commit tasks by block order.
+    Task error handled by EVENT_SCAN_FALLBACK_FUNCTION_LIST as sequential scan, logs fetched for tasks not committed kept for next run.
+    """
+    chain_semaphore = get_chain_scan_semaphore(event_scan_config.contract.chain.chain_id)
+
+    def _fetch(unfinished_task: ContractEventScanTask) -> List[EventData]:
+        cache_key = _prefetch_cache_key(unfinished_task)
+        with _prefetched_event_logs_lock:
+            event_logs = _prefetched_event_logs_cache.pop(cache_key, None)
+        if event_logs is not None: return event_logs
+
+        with chain_semaphore:
+            return fetch_event_logs_by_task(unfinished_task)
+
+    prefetch_num = etherscan_settings.EVENT_SCAN_PREFETCH_TASK_NUM
+    task_iter = iter(unfinished_task_list)
+    pending = deque()
+    with DjangoDbConnSafeThreadPoolExecutor(max_workers=prefetch_num, thread_name_prefix='InfraEventPrefetch') as e:
+        for task in task_iter:
+            pending.append((task, e.submit(contextvars.copy_context().run, _fetch, task)))
+            if len(pending) >= prefetch_num: break
+
+        while pending:
+            task, future = pending.popleft()
+            next_task = next(task_iter, None)
+            if next_task is not None:
+                pending.append((next_task, e.submit(contextvars.copy_context().run, _fetch, next_task)))
+
+            try:
+                event_extra = build_event_extra_by_task(task, future.result())
+                commit_event_scan_task(task, event_extra)
+            except Exception as ex:
+                logger.error(f"execute_unfinished_event_scan_task_pipeline error, task: {task}")
+                logger.exception(ex)
+                logger.critical(f'event scan exception: {traceback.format_exc(limit=1)}')
+
+                if not _is_continue_after_task_error(task, ex): break
+
+        for _, future in pending: future.cancel()
+
+    # keep fetched logs of not committed task for next run
+    for task, future in pending:
+        if future.cancelled() or future.exception() is not None: continue
+        cache_key = _prefetch_cache_key(task)
+        with _prefetched_event_logs_lock:
+            _prefetched_event_logs_cache[cache_key] = future.result()
+
+def execute_unfinished_event_scan_task_async(event_scan_config: EtherScanConfig,
+                                             unfinished_task_list: List[ContractEventScanTask]) -> None:
+    """
+    Fetch event logs of ASYNC_EVENT_SCAN_TASK_BATCH tasks concurrently in one event loop, decode and commit tasks by block order.
+    Task error handled by EVENT_SCAN_FALLBACK_FUNCTION_LIST as sequential scan, logs fetched for tasks not committed kept for next run.
+    """
+    async_blockchain_facade = asyncBlockchainHolder.get_facade_by_model(event_scan_config.contract.chain)
+
+    for task_batch in chunks(unfinished_task_list, etherscan_settings.ASYNC_EVENT_SCAN_TASK_BATCH):
+        cache_key_list = [_prefetch_cache_key(t) for t in task_batch]
+        with _prefetched_event_logs_lock:
+            event_logs_list = [_prefetched_event_logs_cache.pop(k, None) for k in cache_key_list]
+        missing_index_list = [i for i, event_logs in enumerate(event_logs_list) if event_logs is None]
+        fetched_list = async_blockchain_facade.run(async_blockchain_facade.gather_event_logs(
+            [build_event_logs_query_by_task(task_batch[i]) for i in missing_index_list]))
+        for i, fetched in zip(missing_index_list, fetched_list):
+            event_logs_list[i] = fetched
+
+        for index, (task, event_logs) in enumerate(zip(task_batch, event_logs_list)):
+            try:
+                if isinstance(event_logs, Exception): raise event_logs
+                event_extra = build_event_extra_by_task(task, event_logs)
+                commit_event_scan_task(task, event_extra)
+            except Exception as ex:
+                logger.error(f"execute_unfinished_event_scan_task_async error, task: {task}")
+                logger.exception(ex)
+                logger.critical(f'event scan exception: {traceback.format_exc(limit=1)}')
+
+                if _is_continue_after_task_error(task, ex): continue
+
+                # keep fetched logs of not committed task for next run
+                with _prefetched_event_logs_lock:
+                    for later_key, later_event_logs in zip(cache_key_list[index + 1:], event_logs_list[index + 1:]):
+                        if isinstance(later_event_logs, Exception): continue
+                        _prefetched_event_logs_cache[later_key] = later_event_logs
+                return
+
 def scan_event_by_task(unfinished_task: ContractEventScanTask) -> List[EventExtra]:
+    event_logs = fetch_event_logs_by_task(unfinished_task)
+    return build_event_extra_by_task(unfinished_task, event_logs)
+
+def fetch_event_logs_by_task(unfinished_task: ContractEventScanTask) -> List[EventData]:
+    contract_facade = contractHolder.get_facade_by_model(unfinished_task.contract)
+    return contract_facade.blockchainFacade.get_all_event_logs(*build_event_logs_query_by_task(unfinished_task))
+
+def build_event_logs_query_by_task(unfinished_task: ContractEventScanTask):
+    """
+    return (from_block, to_block, contract_addr_list, topics) of task
+    """
     contract_facade = contractHolder.get_facade_by_model(unfinished_task.contract)
-    from_address_filter_list = unfinished_task.scan_config.from_address_filter_list
     to_address_filter_list = unfinished_task.scan_config.to_address_filter_list
     topic_filter_list = unfinished_task.scan_config.topic_filter_list
     topic_filter_set = get_filter_set_from_str(topic_filter_list)
     to_address_set = get_filter_set_from_str(to_address_filter_list)
 
-    event_logs = contract_facade.get_event_logs_by_name(unfinished_task.start_block_id,
+    return contract_facade.build_event_logs_query(unfinished_task.start_block_id,
                                     unfinished_task.end_block_id - 1, topic_filter_set, to_address_set)
-    # TODO timestamp ?
-    # block_numbers = set([e['blockNumber'] for e in event_logs])
-    # get block by block_numbers
 
-    event_extra = [ EventExtra(event=e, extra=EventExtraData(data=contract_facade.decode_event_log(e))) for e in event_logs ]
+def build_event_extra_by_task(unfinished_task: ContractEventScanTask, event_logs: List[EventData]) -> List[EventExtra]:
+    contract_facade = contractHolder.get_facade_by_model(unfinished_task.contract)
+    from_address_filter_list = unfinished_task.scan_config.from_address_filter_list
+
+    event_data_list = contract_facade.decode_event_logs(event_logs)
+    event_extra = [ EventExtra(event=e, extra=EventExtraData(data=d)) for e, d in zip(event_logs, event_data_list) ]
 
     # fromAddress if filter
     if from_address_filter_list:
         from_address_set = get_filter_set_from_str(from_address_filter_list)
+        tx_from_dict = contract_facade.blockchainFacade.get_transaction_from_by_tx_hashes(
+            [ex['event']['transactionHash'] for ex in event_extra])
         for ex in event_extra:
-            from_address = contract_facade.get_transaction_by_tx_hash(ex['event']['transactionHash'])['from']
-            ex['extra']['fromAddress'] = from_address
+            ex['extra']['fromAddress'] = tx_from_dict[ex['event']['transactionHash'].hex()]
 
         event_extra = list(filter(lambda ex: ex['extra']['fromAddress'] in from_address_set, event_extra))
 
+    if etherscan_settings.ENABLE_BLOCK_TIME_ENRICH and event_extra:
+        # task block range is stable, persist in header cache
+        block_timestamps = contract_facade.blockchainFacade.get_block_timestamps(
+            [ex['event']['blockNumber'] for ex in event_extra], unfinished_task.end_block_id)
+        for ex in event_extra:
+            ex['extra']['timestamp'] = block_timestamps[ex['event']['blockNumber']]
+
     return event_extra
 
 def insert_contract_event_from_dict(scanConfigId: int, eventDataResult: str) -> bool:
@@ -148,32 +439,35 @@ def insert_contract_event_from_dict(scanConfigId: int, eventDataResult: str) ->
         logger.error(f"insert_contract_event_from_dict error, scanConfigId: {scanConfigId}, {eventDataResult}")
         logger.exception(e)
 
+def build_contract_event_record(scan_config: EtherScanConfig, contract_facade, event: EventExtra) -> Dict:
+    event_log = event['event']
+    extra = event['extra']
+    return {
+        'contract': scan_config.contract,
+        'topic': contract_facade.topic_to_topic_name_mapping.get(event_log['topics'][0].hex()),
+        'block_hash': event_log['blockHash'].hex(),
+        'block_number': event_log['blockNumber'],
+        'from_address': extra.get('fromAddress', ''),
+        'address': event_log['address'],
+        'transaction_hash': event_log['transactionHash'].hex(),
+        'log_index': event_log['logIndex'],
+        'data': json.dumps(extra['data']),
+        'touch_count_remain': scan_config.max_deliver_retry,
+        'block_time': datetime.fromtimestamp(extra['timestamp']) if extra.get('timestamp') else None
+    }
+
 def insert_contract_event(scan_config: EtherScanConfig, event_extra: List[EventExtra]) -> bool:
     """
     Insert event logs scanned in blockchain event which topic is OrderCreated
     """
     failed_count = 0
     contract_facade = contractHolder.get_facade_by_model(scan_config.contract)
-    max_deliver_retry = scan_config.max_deliver_retry
 
     filter_list = etherscan_settings.EVENT_FILTER_FUNCTION_LIST
 
     for event in event_extra:
         try:
-            event_log = event['event']
-            extra = event['extra']
-            event_record = {
-                'contract': scan_config.contract,
-                'topic': contract_facade.topic_to_topic_name_mapping.get(event_log['topics'][0].hex()),
-                'block_hash': event_log['blockHash'].hex(),
-                'block_number': event_log['blockNumber'],
-                'from_address': extra.get('fromAddress', ''),
-                'address': event_log['address'],
-                'transaction_hash': event_log['transactionHash'].hex(),
-                'log_index': event_log['logIndex'],
-                'data': json.dumps(extra['data']),
-                'touch_count_remain': max_deliver_retry
-            }
+            event_record = build_contract_event_record(scan_config, contract_facade, event)
 
             is_continue = execute_filter_func_chain(event_record, filter_list)
             if not is_continue:
@@ -189,3 +483,78 @@ def insert_contract_event(scan_config: EtherScanConfig, event_extra: List[EventE
             logger.exception(e)
 
     return (failed_count == 0)
+
+def bulk_insert_contract_event(unfinished_task: ContractEventScanTask, event_extra: List[EventExtra]) -> bool:
+    """
+    Insert task events by chunked bulk_create, commit with task FINISHED status in one transaction.
+    post_save is dispatched after commit for new created events only.
+    """
+    event_record_list, failed_count = _build_contract_event_records(unfinished_task.scan_config, event_extra)
+
+    with transaction.atomic():
+        created_event_list, bulk_failed_count = bulk_create_entity_records(
+            ContractEvent, event_record_list, EVENT_KEY_FIELDS, EVENT_ORDER_FIELDS, f'task: {unfinished_task}')
+        failed_count = failed_count + bulk_failed_count
+
+        if failed_count == 0:
+            unfinished_task.status = ScanTaskStatusEnum.FINISHED
+            unfinished_task.save()
+
+        transaction.on_commit(lambda: send_entity_post_save(ContractEvent, created_event_list))
+
+    return (failed_count == 0)
+
+def insert_contract_events_from_dict_list(scanConfigId: int, eventDataResultList: List[str]) -> bool:
+    """
+    Batch version of insert_contract_event_from_dict, config resolved once, events decoded and bulk inserted in one transaction
+    """
+    try:
+        scan_config = EtherScanConfig.objects.select_related('contract').get(id=scanConfigId)
+        contract_facade = contractHolder.get_facade_by_model(scan_config.contract)
+    except Exception as e:
+        logger.error(f"insert_contract_events_from_dict_list error, scanConfigId: {scanConfigId}, size: {len(eventDataResultList)}")
+        logger.exception(e)
+        return False
+
+    event_extra = []
+    failed_count = 0
+    for eventDataResult in eventDataResultList:
+        try:
+            eventData = dict_to_EventData(json.loads(eventDataResult)['params']['result'])
+            event_extra.append(EventExtra(event=eventData, extra=EventExtraData(data=contract_facade.decode_event_log(eventData))))
+        except Exception as e:
+            failed_count = failed_count + 1
+            logger.error(f"insert_contract_events_from_dict_list decode error, scanConfigId: {scanConfigId}, {eventDataResult}")
+            logger.exception(e)
+
+    event_record_list, build_failed_count = _build_contract_event_records(scan_config, event_extra)
+    with transaction.atomic():
+        created_event_list, bulk_failed_count = bulk_create_entity_records(
+            ContractEvent, event_record_list, EVENT_KEY_FIELDS, EVENT_ORDER_FIELDS, f'scan config: {scanConfigId}')
+        transaction.on_commit(lambda: send_entity_post_save(ContractEvent, created_event_list))
+
+    return (failed_count + build_failed_count + bulk_failed_count == 0)
+
+def _build_contract_event_records(scan_config: EtherScanConfig, event_extra: List[EventExtra]) -> Tuple[List[Dict], int]:
+    """
+    return (record passed EVENT_FILTER_FUNCTION_LIST, failed count)
+    """
+    contract_facade = contractHolder.get_facade_by_model(scan_config.contract)
+    filter_list = etherscan_settings.EVENT_FILTER_FUNCTION_LIST
+
+    event_record_list = []
+    failed_count = 0
+    for event in event_extra:
+        try:
+            event_record = build_contract_event_record(scan_config, contract_facade, event)
+        except Exception as e:
+            failed_count = failed_count + 1
+            logger.exception(e)
+            continue
+
+        is_continue = execute_filter_func_chain(event_record, filter_list)
+        if not is_continue:
+            logger.info(f'event is not pass filter, event: {event_record}')
+            continue
+        event_record_list.append(event_record)
+    return event_record_list, failed_count
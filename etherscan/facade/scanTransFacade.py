@@ -1,34 +1,44 @@
 # -*- coding: utf-8 -*-
 import logging
 from concurrent.futures import wait
-from typing import List
+from datetime import datetime
+from typing import Dict, List
 
+from django.db import transaction
 from django.db.utils import IntegrityError
 
-from izumi_infra.blockchain.context import contractHolder
+from izumi_infra.blockchain.context import asyncBlockchainHolder, contractHolder
+from izumi_infra.blockchain.rpc_metrics import rpc_metrics_tag
 from izumi_infra.etherscan.conf import etherscan_settings
 from izumi_infra.etherscan.constants import (FILTER_SPLIT_CHAR,
                                              ScanConfigStatusEnum,
                                              ScanTaskStatusEnum, ScanTypeEnum)
+from izumi_infra.etherscan.facade.scanEntityFacade import bulk_create_entity_records
 from izumi_infra.etherscan.models import (ContractTransaction,
                                           ContractTransactionScanTask,
                                           EtherScanConfig)
 from izumi_infra.etherscan.scan_utils import get_sorted_chain_group_config
 from izumi_infra.etherscan.types import TransExtra, TransExtraData
+from izumi_infra.etherscan.utils import send_entity_post_save
 from izumi_infra.utils.collection_utils import chunks
 from izumi_infra.utils.db_utils import DjangoDbConnSafeThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
-def scan_all_contract_transactions() -> None:
+# unique key and insert order of ContractTransaction for bulk insert
+TRANS_KEY_FIELDS = ('transaction_hash', 'function_name')
+TRANS_ORDER_FIELDS = ('block_number', 'transaction_index')
+
+def scan_all_contract_transactions(chain_id: int = None) -> None:
     """
-    Entry for the trans info sync from blockchain.
+    Entry for the trans info sync from blockchain, configs of chain_id only if given.
     """
 
     trans_scan_config_list = EtherScanConfig.objects.select_related("contract__chain").filter(
         scan_type=ScanTypeEnum.Transaction,
         status=ScanConfigStatusEnum.ENABLE
     ).all()
+    if chain_id is not None: trans_scan_config_list = trans_scan_config_list.filter(contract__chain_id=chain_id)
     trans_scan_config_group = get_sorted_chain_group_config(trans_scan_config_list)
 
     max_workers = min(etherscan_settings.TRANS_SCAN_MAX_WORKERS, len(trans_scan_config_group.keys()))
@@ -42,7 +52,8 @@ def scan_all_contract_transactions() -> None:
 
 def scan_contract_transactions_group(transactions_scan_config_group: List[EtherScanConfig]):
     for scan_config in transactions_scan_config_group:
-        scan_contract_transactions_by_config(scan_config)
+        with rpc_metrics_tag(f'trans_scan:{scan_config.id}'):
+            scan_contract_transactions_by_config(scan_config)
 
 def scan_contract_transactions_by_config(trans_scan_config: ContractTransactionScanTask):
     try:
@@ -86,6 +97,11 @@ def execute_unfinished_trans_scan_task(unfinished_task :ContractTransactionScanT
     if unfinished_task.status != ScanTaskStatusEnum.INITIAL: return
 
     trans_extra = scan_trans_by_task(unfinished_task)
+    if etherscan_settings.ENABLE_TRANS_BULK_INSERT:
+        # task status updated in the same transaction
+        bulk_insert_contract_transactions(unfinished_task, trans_extra)
+        return
+
     is_all_success = insert_contract_transactions(unfinished_task, trans_extra)
 
     if is_all_success:
@@ -99,7 +115,16 @@ def scan_trans_by_task(unfinished_task: ContractTransactionScanTask) -> List[Tra
     to_address_filter_list = unfinished_task.scan_config.to_address_filter_list
     function_filter_list = unfinished_task.scan_config.function_filter_list
 
-    if to_address_filter_list:
+    if etherscan_settings.ENABLE_ASYNC_RPC_SCAN:
+        # full blocks of task fetched concurrently in one event loop
+        if to_address_filter_list:
+            to_address_set = set([a.strip() for a in to_address_filter_list.split(FILTER_SPLIT_CHAR) if a.strip()])
+        else:
+            to_address_set = {contract_facade.contract_address}
+        async_blockchain_facade = asyncBlockchainHolder.get_facade_by_model(unfinished_task.contract.chain)
+        trans = async_blockchain_facade.run(async_blockchain_facade.get_transactions_by_to_set(
+            unfinished_task.start_block_id, unfinished_task.end_block_id, to_address_set))
+    elif to_address_filter_list:
         to_address_set = set([a.strip() for a in to_address_filter_list.split(FILTER_SPLIT_CHAR) if a.strip()])
         trans = contract_facade.blockchainFacade.get_transactions_by_to_set(unfinished_task.start_block_id,
                                                                             unfinished_task.end_block_id,
@@ -112,38 +137,47 @@ def scan_trans_by_task(unfinished_task: ContractTransactionScanTask) -> List[Tra
         from_address_set = set(map(lambda a: a.strip(), from_address_filter_list.split(FILTER_SPLIT_CHAR)))
         trans = list(filter(lambda t: t['from'] in from_address_set, trans))
 
-    trans_extra: List[TransExtra] = []
-    for t in trans:
-        func_obj, _ = contract_facade.decode_trans_input(t['input'])
-        trans_extra.append(TransExtra(trans=t, extra=TransExtraData(fn_name=func_obj.fn_name)))
+    fn_input_list = contract_facade.decode_trans_inputs([t['input'] for t in trans])
+    trans_extra: List[TransExtra] = [TransExtra(trans=t, extra=TransExtraData(fn_name=func_obj.fn_name))
+                                     for t, (func_obj, _) in zip(trans, fn_input_list)]
 
     if function_filter_list:
         function_filter_set = set(map(lambda f: f.strip(), function_filter_list.split(FILTER_SPLIT_CHAR)))
         trans_extra = list(filter(lambda t: t['extra']['fn_name'] in function_filter_set, trans_extra))
 
+    if etherscan_settings.ENABLE_BLOCK_TIME_ENRICH and trans_extra:
+        # full blocks just fetched are in header cache, task block range is stable
+        block_timestamps = contract_facade.blockchainFacade.get_block_timestamps(
+            [t['trans']['blockNumber'] for t in trans_extra], unfinished_task.end_block_id)
+        for t in trans_extra:
+            t['extra']['timestamp'] = block_timestamps[t['trans']['blockNumber']]
+
     return trans_extra
 
+def build_contract_transaction_record(unfinished_task: ContractTransactionScanTask, trans_extra: TransExtra) -> Dict:
+    trans = trans_extra['trans']
+    return {
+        'contract': unfinished_task.contract,
+        'function_name': trans_extra['extra']['fn_name'],
+        'block_hash': trans['blockHash'].hex(),
+        'block_number': trans['blockNumber'],
+        'from_address': trans['from'],
+        'to_address': trans['to'],
+        'transaction_hash': trans['hash'].hex(),
+        'transaction_index': trans['transactionIndex'],
+        'value': trans['value'],
+        'input_data': trans['input'],
+        'touch_count_remain': unfinished_task.scan_config.max_deliver_retry,
+        'block_time': datetime.fromtimestamp(trans_extra['extra']['timestamp']) if trans_extra['extra'].get('timestamp') else None
+    }
+
 def insert_contract_transactions(unfinished_task :ContractTransactionScanTask, transactions: List[TransExtra]) -> bool:
-    max_deliver_retry = unfinished_task.scan_config.max_deliver_retry
     failed_count = 0
 
     for trans_extra in transactions:
         try:
             trans = trans_extra['trans']
-            function_name = trans_extra['extra']['fn_name']
-            trans_record = {
-                'contract': unfinished_task.contract,
-                'function_name': function_name,
-                'block_hash': trans['blockHash'].hex(),
-                'block_number': trans['blockNumber'],
-                'from_address': trans['from'],
-                'to_address': trans['to'],
-                'transaction_hash': trans['hash'].hex(),
-                'transaction_index': trans['transactionIndex'],
-                'value': trans['value'],
-                'input_data': trans['input'],
-                'touch_count_remain': max_deliver_retry
-            }
+            trans_record = build_contract_transaction_record(unfinished_task, trans_extra)
             ContractTransaction.objects.create(**trans_record)
         except IntegrityError:
             logger.warn(f'ignore duplicate block: {trans["blockNumber"]}, '\
@@ -153,3 +187,30 @@ def insert_contract_transactions(unfinished_task :ContractTransactionScanTask, t
             logger.exception(e)
 
     return failed_count == 0
+
+def bulk_insert_contract_transactions(unfinished_task :ContractTransactionScanTask, transactions: List[TransExtra]) -> bool:
+    """
+    Insert task transactions by chunked bulk_create, commit with task FINISHED status in one transaction.
+    post_save is dispatched after commit for new created transactions only.
+    """
+    trans_record_list = []
+    failed_count = 0
+    for trans_extra in transactions:
+        try:
+            trans_record_list.append(build_contract_transaction_record(unfinished_task, trans_extra))
+        except Exception as e:
+            failed_count = failed_count + 1
+            logger.exception(e)
+
+    with transaction.atomic():
+        created_trans_list, bulk_failed_count = bulk_create_entity_records(
+            ContractTransaction, trans_record_list, TRANS_KEY_FIELDS, TRANS_ORDER_FIELDS, f'task: {unfinished_task}')
+        failed_count = failed_count + bulk_failed_count
+
+        if failed_count == 0:
+            unfinished_task.status = ScanTaskStatusEnum.FINISHED
+            unfinished_task.save()
+
+        transaction.on_commit(lambda: send_entity_post_save(ContractTransaction, created_trans_list))
+
+    return failed_count == 0
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import json
+from typing import List
+
+from eth_utils import to_checksum_address
+
+from izumi_infra.blockchain.constants import ZERO_ADDRESS, ERC20TopicEnum
+from izumi_infra.etherscan.models import ContractEvent
+from izumi_infra.utils.db_utils import order_chunked_iterator
+
+def get_erc20_holders_by_transfer_event(chain_id: int, token_addr: str, to_block: int) -> List[str]:
+    """
+    from and to address of scanned Transfer ContractEvent of token not after to_block, account ever held token,
+    as holder list of balance snapshot
+    """
+    event_query = ContractEvent.objects.filter(contract__chain_id=chain_id, contract__contract_address=to_checksum_address(token_addr),
+                                               topic=ERC20TopicEnum.Transfer, block_number__lte=to_block).only('id', 'data')
+    holder_set = set()
+    for event_list in order_chunked_iterator(event_query, chunk_size=5000):
+        for event in event_list:
+            event_data = json.loads(event.data)
+            holder_set.add(to_checksum_address(event_data['from']))
+            holder_set.add(to_checksum_address(event_data['to']))
+    holder_set.discard(ZERO_ADDRESS)
+    return sorted(holder_set)
@@ -143,7 +143,7 @@ class ContractTransaction(models.Model):
     sub_status = models.SmallIntegerField("ProcessSubStatus", default=INIT_SUB_STATUS)
     touch_count_remain = models.IntegerField("TouchCountRemain", default=0)
     create_time = models.DateTimeField("CreateTime", auto_now_add=True)
-    # block_time = models.DateTimeField("BlockTime")
+    block_time = models.DateTimeField("BlockTime", null=True, blank=True)
 
     def update_status(self, status_enum: ProcessingStatusEnum):
         # avoid trigger signal
@@ -200,7 +200,7 @@ class ContractEvent(models.Model):
     sub_status = models.IntegerField("ProcessSubStatus", default=INIT_SUB_STATUS)
     touch_count_remain = models.IntegerField("TouchCountRemain", default=0)
     create_time = models.DateTimeField("CreateTime", auto_now_add=True)
-    # block_time = models.DateTimeField("BlockTime")
+    block_time = models.DateTimeField("BlockTime", null=True, blank=True)
 
     def update_status(self, status_enum: ProcessingStatusEnum):
         # avoid trigger signal
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
+from threading import BoundedSemaphore, Lock
 from typing import Dict, Set, List, Any
 
+from izumi_infra.etherscan.conf import etherscan_settings
 from izumi_infra.etherscan.constants import FILTER_SPLIT_CHAR, SCAN_CONFIG_NO_GROUP
 from izumi_infra.etherscan.types import EventData
 
@@ -45,3 +47,31 @@ def get_sorted_chain_group_config(event_scan_config_list: List[Any]) -> Dict[int
         sorted(config_group_list, key=lambda x: x.id)
 
     return event_scan_config_list_group
+
+def get_sorted_chain_config(scan_config_list: List[Any]) -> Dict[int, List[Any]]:
+    """
+    group by chain and sort by config id, scan_group is ignored
+    """
+    scan_config_list_group = {}
+    for scan_config in scan_config_list:
+        chain_id = scan_config.contract.chain.chain_id
+        scan_config_list_group.setdefault(chain_id, []).append(scan_config)
+
+    for config_group_list in scan_config_list_group.values():
+        config_group_list.sort(key=lambda x: x.id)
+
+    return scan_config_list_group
+
+_chain_semaphore_dict: Dict[int, BoundedSemaphore] = {}
+_chain_semaphore_lock = Lock()
+
+def get_chain_scan_semaphore(chain_id: int) -> BoundedSemaphore:
+    """
+    process shared semaphore limit concurrent scan rpc of one chain
+    """
+    with _chain_semaphore_lock:
+        if chain_id not in _chain_semaphore_dict:
+            concurrency = etherscan_settings.EVENT_SCAN_CHAIN_CONCURRENCY.get(
+                chain_id, etherscan_settings.EVENT_SCAN_DEFAULT_CHAIN_CONCURRENCY)
+            _chain_semaphore_dict[chain_id] = BoundedSemaphore(max(1, concurrency))
+        return _chain_semaphore_dict[chain_id]
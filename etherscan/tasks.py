@@ -1,17 +1,22 @@
 # -*- coding: utf-8 -*-
 import logging
 from datetime import datetime, timedelta
+from typing import List
 
 from celery.app import shared_task
-from celery_once import QueueOnce
+from celery_once import AlreadyQueued, QueueOnce
 
+from izumi_infra.etherscan.conf import etherscan_settings
+from izumi_infra.etherscan.constants import ScanConfigStatusEnum, ScanTypeEnum
 from izumi_infra.etherscan.facade.auditEventFacade import audit_event_entry
 from izumi_infra.etherscan.facade.auditTransFacade import audit_trans_entry
 from izumi_infra.etherscan.facade.scanEntityFacade import scan_and_touch_entity
 from izumi_infra.etherscan.facade.scanEventFacade import (
-    insert_contract_event_from_dict, scan_all_contract_event)
+    insert_contract_event_from_dict, insert_contract_events_from_dict_list,
+    scan_all_contract_event)
 from izumi_infra.etherscan.facade.scanTransFacade import \
     scan_all_contract_transactions
+from izumi_infra.etherscan.models import EtherScanConfig
 from izumi_infra.utils.date_utils import PYTHON_DATE_FORMAT, dayRange
 from izumi_infra.utils.task_utils import IzumiQueueOnce
 
@@ -19,16 +24,49 @@ logger = logging.getLogger(__name__)
 
 @shared_task(base=IzumiQueueOnce, once={'log_critical': False}, name='etherscan_contract_trans_scan_task')
 def contract_trans_scan_task():
+    if etherscan_settings.ENABLE_HEAD_SCAN_TRIGGER:
+        # fallback of HeadScanTriggerThread by same chain task, queue once with head trigger and cover config added after thread start
+        logger.info("start etherscan contract trans scan chain task of head scan trigger mode")
+        _delay_chain_scan_task(contract_trans_scan_chain_task, ScanTypeEnum.Transaction)
+        return
     logger.info("start etherscan contract trans scan task")
     scan_all_contract_transactions()
 
 
 @shared_task(base=IzumiQueueOnce, once={'log_critical': False}, name='etherscan_contract_event_scan_task')
 def contract_event_scan_task():
+    if etherscan_settings.ENABLE_HEAD_SCAN_TRIGGER:
+        # fallback of HeadScanTriggerThread by same chain task, queue once with head trigger and cover config added after thread start
+        logger.info("start etherscan contract event scan chain task of head scan trigger mode")
+        _delay_chain_scan_task(contract_event_scan_chain_task, ScanTypeEnum.Event)
+        return
     logger.info("start etherscan contract event scan task")
     scan_all_contract_event()
 
 
+@shared_task(base=IzumiQueueOnce, once={'log_critical': False}, name='etherscan_contract_trans_scan_chain_task')
+def contract_trans_scan_chain_task(chainId: int):
+    logger.info(f"start etherscan contract trans scan chain task, chainId: {chainId}")
+    scan_all_contract_transactions(chainId)
+
+
+@shared_task(base=IzumiQueueOnce, once={'log_critical': False}, name='etherscan_contract_event_scan_chain_task')
+def contract_event_scan_chain_task(chainId: int):
+    logger.info(f"start etherscan contract event scan chain task, chainId: {chainId}")
+    scan_all_contract_event(chainId)
+
+
+def _delay_chain_scan_task(chain_scan_task, scan_type: ScanTypeEnum) -> None:
+    chain_id_list = EtherScanConfig.objects.filter(status=ScanConfigStatusEnum.ENABLE, scan_type=scan_type) \
+        .values_list('contract__chain_id', flat=True).distinct()
+    for chain_id in chain_id_list:
+        try:
+            chain_scan_task.delay(chain_id)
+        except AlreadyQueued:
+            # scanning by head trigger
+            continue
+
+
 @shared_task(base=IzumiQueueOnce, name='etherscan_touch_unprocessed_entity_task')
 def etherscan_touch_unprocessed_entity_task():
     logger.info("start etherscan touch unprocessed entity task task")
@@ -76,3 +114,8 @@ def etherscan_audit_trans_scan_task(*args, **kwargs):
 def etherscan_async_event_save(scanConfigId: int, eventDataResult: str):
     logger.info(f"etherscan_async_event_save, scanConfigId: {scanConfigId}")
     insert_contract_event_from_dict(scanConfigId, eventDataResult)
+
+@shared_task()
+def etherscan_async_event_batch_save(scanConfigId: int, eventDataResultList: List[str]):
+    logger.info(f"etherscan_async_event_batch_save, scanConfigId: {scanConfigId}, size: {len(eventDataResultList)}")
+    insert_contract_events_from_dict_list(scanConfigId, eventDataResultList)
@@ -1,3 +1,532 @@
-from django.test import TestCase
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+from typing import List
+from unittest import mock
+
+from celery_once import AlreadyQueued
+from django.db import DatabaseError
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+from izumi_infra.blockchain.constants import ZERO_ADDRESS
+from izumi_infra.blockchain.models import Blockchain, Contract
+from izumi_infra.etherscan import tasks
+from izumi_infra.etherscan.constants import ScanTaskStatusEnum, ScanTypeEnum
+from izumi_infra.etherscan.facade import (scanEntityFacade, scanEventFacade,
+                                          scanTransFacade)
+from izumi_infra.etherscan.facade.transferHolderFacade import get_erc20_holders_by_transfer_event
+from izumi_infra.etherscan.models import (ContractEvent, ContractEventScanTask,
+                                          ContractTransaction,
+                                          ContractTransactionScanTask,
+                                          EtherScanConfig)
+from izumi_infra.etherscan.threads import AsyncEthScanThread
+from izumi_infra.etherscan.threads.AsyncEthScanThread import (EventBatchBuffer,
+                                                             MultiplexLogSubscriber)
+from izumi_infra.etherscan.types import (EventExtra, EventExtraData,
+                                         TransExtra, TransExtraData)
+
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+APPROVAL_TOPIC = '0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925'
+
+def abort_scan_fallback(e: Exception) -> bool:
+    return False
 
 # Create your tests here.
+class BulkInsertContractEventTest(TestCase):
+
+    def setUp(self):
+        chain = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.contract = Contract.objects.create(id=1, name='usdc', type='ERC20', chain=chain,
+                                                contract_address='0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48')
+        self.scan_config = EtherScanConfig.objects.create(contract=self.contract, scan_type=ScanTypeEnum.Event)
+        self.task = ContractEventScanTask.objects.create(scan_config=self.scan_config, contract=self.contract,
+                                                         start_block_id=100, end_block_id=200)
+
+        self.created_list = []
+        post_save.connect(self._on_event_save, sender=ContractEvent)
+        self.addCleanup(post_save.disconnect, self._on_event_save, sender=ContractEvent)
+
+    def _on_event_save(self, instance, created, **kwargs):
+        if created: self.created_list.append(instance)
+
+    def _event_record(self, block_number: int, log_index: int):
+        return {
+            'contract': self.contract,
+            'topic': 'Transfer',
+            'block_hash': '0x' + '%064x' % block_number,
+            'block_number': block_number,
+            'address': self.contract.contract_address,
+            'transaction_hash': '0x' + '%064x' % (block_number * 1000),
+            'log_index': log_index,
+            'data': '{}',
+        }
+
+    def _event_extra(self, block_number: int, log_index: int):
+        event_log = {
+            'address': self.contract.contract_address,
+            'topics': [HexBytes(TRANSFER_TOPIC)],
+            'data': '0x',
+            'blockNumber': block_number,
+            'blockHash': HexBytes('%064x' % block_number),
+            'transactionHash': HexBytes('%064x' % (block_number * 1000)),
+            'transactionIndex': 0,
+            'logIndex': log_index,
+        }
+        return EventExtra(event=event_log, extra=EventExtraData(data={'value': block_number}))
+
+    def _bulk_create(self, record_list):
+        return scanEntityFacade.bulk_create_entity_records(ContractEvent, record_list, scanEventFacade.EVENT_KEY_FIELDS,
+                                                           scanEventFacade.EVENT_ORDER_FIELDS, 'test')
+
+    def testBulkCreateSkipExist(self):
+        ContractEvent.objects.create(**self._event_record(101, 0))
+        record_list = [self._event_record(101, 0), self._event_record(101, 1), self._event_record(102, 0), self._event_record(102, 0)]
+
+        created_event_list, failed_count = self._bulk_create(record_list)
+
+        self.assertEqual(failed_count, 0)
+        self.assertEqual([(e.block_number, e.log_index) for e in created_event_list], [(101, 1), (102, 0)])
+        self.assertTrue(all(e.pk is not None for e in created_event_list))
+        self.assertEqual(ContractEvent.objects.count(), 3)
+
+    def testBulkCreateFallbackRowByRow(self):
+        ContractEvent.objects.create(**self._event_record(101, 0))
+        self.created_list.clear()
+        record_list = [self._event_record(101, 0), self._event_record(101, 1), self._event_record(102, 0)]
+
+        with mock.patch.object(scanEntityFacade, '_bulk_create_entity_chunk', side_effect=DatabaseError('chunk fail')):
+            created_event_list, failed_count = self._bulk_create(record_list)
+
+        self.assertEqual(failed_count, 0)
+        self.assertEqual([(e.block_number, e.log_index) for e in created_event_list], [(101, 1), (102, 0)])
+        # post_save left to caller on commit
+        self.assertEqual(self.created_list, [])
+
+    def testBulkInsertPostSaveOnCommit(self):
+        event_extra = [self._event_extra(101, 0), self._event_extra(102, 0)]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertTrue(scanEventFacade.bulk_insert_contract_event(self.task, event_extra))
+            self.assertEqual(self.created_list, [])
+        for callback in callbacks: callback()
+
+        self.assertEqual(sorted(e.block_number for e in self.created_list), [101, 102])
+        self.assertEqual(json.loads(ContractEvent.objects.get(block_number=102).data), {'value': 102})
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, ScanTaskStatusEnum.FINISHED)
+
+        # rescan of same task insert nothing
+        self.created_list.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(scanEventFacade.bulk_insert_contract_event(self.task, event_extra))
+        self.assertEqual(self.created_list, [])
+        self.assertEqual(ContractEvent.objects.count(), 2)
+
+class BulkInsertContractTransactionTest(TestCase):
+
+    def setUp(self):
+        chain = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        contract = Contract.objects.create(id=1, name='usdc', type='ERC20', chain=chain,
+                                           contract_address='0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48')
+        scan_config = EtherScanConfig.objects.create(contract=contract, scan_type=ScanTypeEnum.Transaction)
+        self.task = ContractTransactionScanTask.objects.create(scan_config=scan_config, contract=contract,
+                                                               start_block_id=100, end_block_id=200)
+
+        self.created_list = []
+        post_save.connect(self._on_trans_save, sender=ContractTransaction)
+        self.addCleanup(post_save.disconnect, self._on_trans_save, sender=ContractTransaction)
+
+    def _on_trans_save(self, instance, created, **kwargs):
+        if created: self.created_list.append(instance)
+
+    def _trans_extra(self, block_number: int, fn_name: str):
+        trans = {
+            'blockHash': HexBytes('%064x' % block_number),
+            'blockNumber': block_number,
+            'from': '0x' + '11' * 20,
+            'to': self.task.contract.contract_address,
+            'hash': HexBytes('%064x' % (block_number * 1000)),
+            'transactionIndex': 0,
+            'value': 0,
+            'input': '0x',
+        }
+        return TransExtra(trans=trans, extra=TransExtraData(fn_name=fn_name))
+
+    def testBulkInsertSkipExist(self):
+        trans_extra = [self._trans_extra(101, 'transfer'), self._trans_extra(102, 'transfer')]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(scanTransFacade.bulk_insert_contract_transactions(self.task, trans_extra[:1]))
+
+        self.created_list.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(scanTransFacade.bulk_insert_contract_transactions(self.task, trans_extra))
+
+        self.assertEqual([t.block_number for t in self.created_list], [102])
+        self.assertEqual(ContractTransaction.objects.count(), 2)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, ScanTaskStatusEnum.FINISHED)
+
+class EventScanPipelineTest(TestCase):
+
+    def setUp(self):
+        chain = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        contract = Contract.objects.create(id=1, name='usdc', type='ERC20', chain=chain,
+                                           contract_address='0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48')
+        self.scan_config = EtherScanConfig.objects.create(contract=contract, scan_type=ScanTypeEnum.Event)
+        for start_block_id in range(100, 400, 100):
+            ContractEventScanTask.objects.create(scan_config=self.scan_config, contract=contract,
+                                                 start_block_id=start_block_id, end_block_id=start_block_id + 100)
+        scanEventFacade._prefetched_event_logs_cache.clear()
+
+    def _get_task_list(self):
+        return list(ContractEventScanTask.objects.select_related('scan_config', 'contract__chain').order_by('start_block_id'))
+
+    def _run_pipeline(self):
+        def fetch(task):
+            if task.start_block_id == 100: raise ValueError('get logs fail')
+            return []
+
+        with mock.patch.object(scanEventFacade, 'fetch_event_logs_by_task', side_effect=fetch):
+            scanEventFacade.execute_unfinished_event_scan_task_pipeline(self.scan_config, self._get_task_list())
+        return [t.status for t in self._get_task_list()]
+
+    @override_settings(IZUMI_INFRA_ETHERSCAN={'EVENT_SCAN_PREFETCH_TASK_NUM': 2})
+    def testTaskErrorContinueByDefault(self):
+        self.assertEqual(self._run_pipeline(), [ScanTaskStatusEnum.INITIAL, ScanTaskStatusEnum.FINISHED, ScanTaskStatusEnum.FINISHED])
+
+    @override_settings(IZUMI_INFRA_ETHERSCAN={'EVENT_SCAN_PREFETCH_TASK_NUM': 2,
+                                              'EVENT_SCAN_FALLBACK_FUNCTION_LIST': ['izumi_infra.etherscan.tests.abort_scan_fallback']})
+    def testTaskErrorAbortByFallback(self):
+        self.assertEqual(self._run_pipeline(), [ScanTaskStatusEnum.INITIAL] * 3)
+
+        # prefetched logs of next task kept for next run
+        next_task = self._get_task_list()[1]
+        self.assertIn(scanEventFacade._prefetch_cache_key(next_task), scanEventFacade._prefetched_event_logs_cache)
+
+    def testPrefetchCacheKeyByFilter(self):
+        task = self._get_task_list()[0]
+        cache_key = scanEventFacade._prefetch_cache_key(task)
+
+        task.scan_config.topic_filter_list = 'Transfer'
+        self.assertNotEqual(scanEventFacade._prefetch_cache_key(task), cache_key)
+
+class ChainEventScanTest(TestCase):
+
+    def setUp(self):
+        chain = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.usdc = Contract.objects.create(id=1, name='usdc', type='ERC20', chain=chain,
+                                            contract_address='0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48')
+        self.usdt = Contract.objects.create(id=2, name='usdt', type='ERC20', chain=chain,
+                                            contract_address='0xdAC17F958D2ee523a2206206994597C13D831ec7')
+        usdc_config = EtherScanConfig.objects.create(contract=self.usdc, scan_type=ScanTypeEnum.Event, topic_filter_list='Transfer')
+        usdt_config = EtherScanConfig.objects.create(contract=self.usdt, scan_type=ScanTypeEnum.Event)
+        for start_block_id in (100, 200):
+            ContractEventScanTask.objects.create(scan_config=usdc_config, contract=self.usdc,
+                                                 start_block_id=start_block_id, end_block_id=start_block_id + 100)
+        ContractEventScanTask.objects.create(scan_config=usdt_config, contract=self.usdt, start_block_id=200, end_block_id=300)
+
+        self.query_list = []
+        self.fail_from_block = None
+        self.event_logs = [
+            self._event_log(self.usdc.contract_address, TRANSFER_TOPIC, 150, 0),
+            self._event_log(self.usdc.contract_address, TRANSFER_TOPIC, 250, 0),
+            self._event_log(self.usdc.contract_address, APPROVAL_TOPIC, 250, 1),
+            self._event_log(self.usdt.contract_address, TRANSFER_TOPIC, 250, 2),
+            self._event_log(self.usdt.contract_address, APPROVAL_TOPIC, 260, 0),
+            self._event_log('0x' + '33' * 20, TRANSFER_TOPIC, 270, 0),
+        ]
+
+    def _event_log(self, address: str, topic: str, block_number: int, log_index: int):
+        return AttributeDict({
+            'address': address,
+            'topics': [HexBytes(topic), HexBytes('00' * 12 + '11' * 20), HexBytes('00' * 12 + '22' * 20)],
+            'data': '0x%064x' % block_number,
+            'blockNumber': block_number,
+            'blockHash': HexBytes('%064x' % block_number),
+            'transactionHash': HexBytes('%064x' % (block_number * 1000 + log_index)),
+            'transactionIndex': 0,
+            'logIndex': log_index,
+        })
+
+    def _get_all_event_logs(self, from_block, to_block, contract_addr_list, topics):
+        self.query_list.append((from_block, to_block, set(a.lower() for a in contract_addr_list), set(topics)))
+        if from_block == self.fail_from_block: raise ValueError('get logs fail')
+        return [log for log in self.event_logs if from_block <= log['blockNumber'] <= to_block]
+
+    def _scan(self):
+        config_list = list(EtherScanConfig.objects.select_related('contract__chain').order_by('id'))
+        with mock.patch.object(scanEventFacade, 'add_event_scan_task'), \
+                mock.patch('izumi_infra.blockchain.facade.BlockchainFacade.get_all_event_logs', side_effect=self._get_all_event_logs):
+            scanEventFacade.scan_chain_contract_event(config_list)
+
+    def _get_events(self, contract):
+        return [(e.topic, e.block_number) for e in ContractEvent.objects.filter(contract=contract).order_by('block_number', 'log_index')]
+
+    def _get_task_status(self, contract):
+        return [t.status for t in ContractEventScanTask.objects.filter(contract=contract).order_by('start_block_id')]
+
+    @override_settings(IZUMI_INFRA_ETHERSCAN={'TASK_BATCH_SCAN_BLOCK': 100})
+    def testRouteSharedLogs(self):
+        self._scan()
+
+        usdc_address, usdt_address = self.usdc.contract_address.lower(), self.usdt.contract_address.lower()
+        # one query per window, union of pending configs only
+        self.assertEqual([q[:3] for q in self.query_list], [(100, 199, {usdc_address}), (200, 299, {usdc_address, usdt_address})])
+        self.assertEqual(self.query_list[0][3], {TRANSFER_TOPIC})
+        self.assertIn(APPROVAL_TOPIC, self.query_list[1][3])
+
+        self.assertEqual(self._get_events(self.usdc), [('Transfer', 150), ('Transfer', 250)])
+        self.assertEqual(self._get_events(self.usdt), [('Transfer', 250), ('Approval', 260)])
+        self.assertEqual(json.loads(ContractEvent.objects.get(contract=self.usdt, topic='Approval').data)['value'], 260)
+        self.assertEqual(self._get_task_status(self.usdc), [ScanTaskStatusEnum.FINISHED] * 2)
+        self.assertEqual(self._get_task_status(self.usdt), [ScanTaskStatusEnum.FINISHED])
+
+    @override_settings(IZUMI_INFRA_ETHERSCAN={'TASK_BATCH_SCAN_BLOCK': 100})
+    def testStopAtGetLogsError(self):
+        self.fail_from_block = 200
+        self._scan()
+
+        self.assertEqual(self._get_events(self.usdc), [('Transfer', 150)])
+        self.assertEqual(self._get_events(self.usdt), [])
+        self.assertEqual(self._get_task_status(self.usdc), [ScanTaskStatusEnum.FINISHED, ScanTaskStatusEnum.INITIAL])
+        self.assertEqual(self._get_task_status(self.usdt), [ScanTaskStatusEnum.INITIAL])
+
+class TransferHolderTest(TestCase):
+
+    def setUp(self):
+        chain = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        self.usdc = Contract.objects.create(id=1, name='usdc', type='ERC20', chain=chain,
+                                            contract_address='0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48')
+        self.usdt = Contract.objects.create(id=2, name='usdt', type='ERC20', chain=chain,
+                                            contract_address='0xdAC17F958D2ee523a2206206994597C13D831ec7')
+        self.account_list = [to_checksum_address('0x' + '%02x' % (i + 1) * 20) for i in range(5)]
+        self.log_index = 0
+
+    def _create_event(self, contract, topic, block_number, from_addr, to_addr):
+        ContractEvent.objects.create(contract=contract, topic=topic, block_hash='0x' + '%064x' % block_number, block_number=block_number,
+                                     address=contract.contract_address, transaction_hash='0x' + '%064x' % block_number, log_index=self.log_index,
+                                     data=json.dumps({'from': from_addr.lower(), 'to': to_addr.lower(), 'value': 1}))
+        self.log_index += 1
+
+    def testHoldersByTransferEvent(self):
+        a = self.account_list
+        self._create_event(self.usdc, 'Transfer', 100, ZERO_ADDRESS, a[1])
+        self._create_event(self.usdc, 'Transfer', 101, a[1], a[0])
+        self._create_event(self.usdc, 'Transfer', 200, a[0], a[0])
+        # after to_block, other topic and other token excluded
+        self._create_event(self.usdc, 'Transfer', 201, a[0], a[2])
+        self._create_event(self.usdc, 'Approval', 150, a[0], a[3])
+        self._create_event(self.usdt, 'Transfer', 150, a[0], a[4])
+
+        holder_list = get_erc20_holders_by_transfer_event(1, self.usdc.contract_address.lower(), 200)
+        self.assertEqual(holder_list, [a[0], a[1]])
+
+class HeadScanFallbackTest(TestCase):
+
+    def setUp(self):
+        eth = Blockchain.objects.create(symbol='ETH', vm_type='EVM', rpc_url='http://127.0.0.1:1', chain_id=1, gas_price_wei=1)
+        bsc = Blockchain.objects.create(symbol='BNB', vm_type='EVM', rpc_url='http://127.0.0.1:2', chain_id=56, gas_price_wei=1)
+        for contract_id, chain in ((1, eth), (2, eth), (3, bsc)):
+            contract = Contract.objects.create(id=contract_id, name=f'c{contract_id}', type='ERC20', chain=chain,
+                                               contract_address=to_checksum_address('0x' + '%02x' % contract_id * 20))
+            EtherScanConfig.objects.create(contract=contract, scan_type=ScanTypeEnum.Event)
+
+    @override_settings(IZUMI_INFRA_ETHERSCAN={'ENABLE_HEAD_SCAN_TRIGGER': True})
+    def testBeatDelayChainTask(self):
+        with mock.patch.object(tasks.contract_event_scan_chain_task, 'delay', side_effect=[AlreadyQueued(60), None]) as delay_mock, \
+                mock.patch.object(tasks, 'scan_all_contract_event') as scan_mock:
+            tasks.contract_event_scan_task()
+
+        # chain task already queued by head trigger skipped
+        self.assertEqual(sorted(c.args[0] for c in delay_mock.call_args_list), [1, 56])
+        scan_mock.assert_not_called()
+
+class EventBatchBufferTest(TestCase):
+
+    def setUp(self):
+        self.flush_list = []
+
+    def _flush_batch(self, scan_config_id, message_list):
+        self.flush_list.append((scan_config_id, message_list))
+
+    def testFlushBySize(self):
+        async def add():
+            eventBatchBuffer = EventBatchBuffer(self._flush_batch, 2, 60)
+            for i in range(3): eventBatchBuffer.add(1, f'm{i}')
+            eventBatchBuffer.add(2, 'n0')
+
+        asyncio.run(add())
+        self.assertEqual(self.flush_list, [(1, ['m0', 'm1'])])
+
+    def testFlushByLatency(self):
+        async def add():
+            eventBatchBuffer = EventBatchBuffer(self._flush_batch, 100, 0.05)
+            run_task = asyncio.ensure_future(eventBatchBuffer.run())
+            eventBatchBuffer.add(1, 'm0')
+            eventBatchBuffer.add(1, 'm1')
+            await asyncio.sleep(0.01)
+            self.assertEqual(self.flush_list, [])
+            await asyncio.sleep(0.1)
+            eventBatchBuffer.add(2, 'n0')
+            await asyncio.sleep(0.1)
+            run_task.cancel()
+
+        asyncio.run(add())
+        self.assertEqual(self.flush_list, [(1, ['m0', 'm1']), (2, ['n0'])])
+
+class FakeLogWebsocket():
+    """
+    websocket of FakeLogNode, response read in order, live logs read after all response, connection dropped when all read
+    """
+
+    def __init__(self, node, conn_index: int) -> None:
+        self.node = node
+        self.conn_index = conn_index
+        self.sent_list = []
+        self.message_list = []
+        self.live_pushed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def send(self, message: str) -> None:
+        self.sent_list.append(json.loads(message))
+        self.node.on_request(self, self.sent_list[-1])
+
+    async def recv(self) -> str:
+        if not self.message_list and not self.live_pushed:
+            self.live_pushed = True
+            self.node.push_live_logs(self)
+        if self.message_list: return self.message_list.pop(0)
+        if self.conn_index + 1 < len(self.node.live_log_list_per_conn):
+            raise ConnectionError('connection dropped')
+        # stop subscriber after last connection
+        raise asyncio.CancelledError()
+
+class FakeLogNode():
+    """
+    answer eth_subscribe with subscription id of connection, eth_blockNumber by head_per_conn, eth_getLogs by get_logs,
+    None response of get_logs never answered
+    """
+
+    def __init__(self, live_log_list_per_conn, fail_subscribe_id_set=(), head_per_conn=None, get_logs=None) -> None:
+        # [[(eth_subscribe request id of connection or subscription id, log)]] of each connection
+        self.live_log_list_per_conn = live_log_list_per_conn
+        self.fail_subscribe_id_set = fail_subscribe_id_set
+        self.head_per_conn = head_per_conn
+        self.get_logs = get_logs
+        self.conn_list: List[FakeLogWebsocket] = []
+
+    def connect(self, ws_rpc_url: str, **kwargs) -> FakeLogWebsocket:
+        ws = FakeLogWebsocket(self, len(self.conn_list))
+        self.conn_list.append(ws)
+        return ws
+
+    @staticmethod
+    def subscription_id(conn_index: int, request_id: int) -> str:
+        return '0x%x%02x' % (conn_index + 1, request_id)
+
+    def on_request(self, ws: FakeLogWebsocket, request) -> None:
+        if request['method'] == 'eth_blockNumber':
+            response = {'result': hex(self.head_per_conn[ws.conn_index])}
+        elif request['method'] == 'eth_getLogs':
+            response = self.get_logs(ws.conn_index, request['params'][0])
+            if response is None: return
+        elif request['id'] in self.fail_subscribe_id_set:
+            response = {'error': {'code': -32000, 'message': 'subscribe fail'}}
+        else:
+            response = {'result': self.subscription_id(ws.conn_index, request['id'])}
+        ws.message_list.append(json.dumps({'jsonrpc': '2.0', 'id': request['id'], **response}))
+
+    def push_live_logs(self, ws: FakeLogWebsocket) -> None:
+        for request_id, log in self.live_log_list_per_conn[ws.conn_index]:
+            subscription = request_id if isinstance(request_id, str) else self.subscription_id(ws.conn_index, request_id)
+            message = {'subscription': subscription, 'result': log}
+            ws.message_list.append(json.dumps({'jsonrpc': '2.0', 'method': 'eth_subscription', 'params': message}))
+
+class MultiplexLogSubscriberTest(TestCase):
+
+    def setUp(self):
+        self.topic_to_selector = {'Transfer': TRANSFER_TOPIC, 'Approval': APPROVAL_TOPIC}
+        self.scan_item_list = [
+            self._scan_item(1, '0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48', []),
+            self._scan_item(2, ZERO_ADDRESS, ['Transfer']),
+            self._scan_item(3, '0xdAC17F958D2ee523a2206206994597C13D831ec7', []),
+        ]
+        self.deliver_list = []
+
+    def _scan_item(self, scan_config_id: int, contract_address: str, topic_filter_list: List[str]):
+        return {'scan_config_id': scan_config_id, 'ws_rpc_url': 'ws://127.0.0.1:1', 'topic_to_selector': self.topic_to_selector,
+                'contract_address': contract_address, 'topic_filter_list': topic_filter_list}
+
+    def _log(self, block_number: int):
+        return {'blockNumber': hex(block_number), 'logIndex': '0x0', 'topics': [TRANSFER_TOPIC]}
+
+    def _deliver(self, scan_config_id: int, message: str):
+        self.deliver_list.append((scan_config_id, int(json.loads(message)['params']['result']['blockNumber'], 16)))
+
+    def _run(self, node: FakeLogNode, **kwargs) -> MultiplexLogSubscriber:
+        subscriber = MultiplexLogSubscriber('ws://127.0.0.1:1', self.scan_item_list, self._deliver, 60, reconnect_delay_sec=0, **kwargs)
+
+        async def run():
+            try:
+                await subscriber.run()
+            except asyncio.CancelledError:
+                pass
+
+        with mock.patch.object(AsyncEthScanThread, 'connect', side_effect=node.connect):
+            asyncio.run(run())
+        return subscriber
+
+    def _subscribe_list(self, ws: FakeLogWebsocket):
+        return [(r['id'], r['params'][1]) for r in ws.sent_list if r['method'] == 'eth_subscribe']
+
+    def testRouteBySubscriptionAndResubscribe(self):
+        node = FakeLogNode([
+            [(1, self._log(10)), (2, self._log(11)), (1, self._log(12))],
+            # subscription of dropped connection unknown
+            [(2, self._log(13)), (1, self._log(14)), (FakeLogNode.subscription_id(0, 1), self._log(15))],
+        ], fail_subscribe_id_set={3})
+        self._run(node)
+
+        self.assertEqual(self.deliver_list, [(1, 10), (2, 11), (1, 12), (2, 13), (1, 14)])
+        self.assertEqual(len(node.conn_list), 2)
+        first_subscribe_list = self._subscribe_list(node.conn_list[0])
+        self.assertEqual(first_subscribe_list, [
+            (1, {'address': ['0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48'], 'topics': [[TRANSFER_TOPIC, APPROVAL_TOPIC]]}),
+            (2, {'topics': [[TRANSFER_TOPIC]]}),
+            (3, {'address': ['0xdac17f958d2ee523a2206206994597c13d831ec7'], 'topics': [[TRANSFER_TOPIC, APPROVAL_TOPIC]]}),
+        ])
+        # all resubscribed with same filter after drop, except subscribe failed one
+        self.assertEqual(self._subscribe_list(node.conn_list[1]), first_subscribe_list[:2])
+
+    def _get_logs(self, conn_index: int, log_filter):
+        scan_config_id = 1 if 'address' in log_filter else 2
+        self.get_logs_list.append((conn_index, scan_config_id, int(log_filter['fromBlock'], 16), int(log_filter['toBlock'], 16)))
+        # connection dropped before response
+        if conn_index == 1: return None
+        if conn_index == 2 and scan_config_id == 2: return {'error': {'code': -32005, 'message': 'query timeout'}}
+        return {'result': [self._log(int(log_filter['fromBlock'], 16))]}
+
+    def testBackfillAdvanceAfterDelivered(self):
+        self.scan_item_list = self.scan_item_list[:2]
+        self.get_logs_list = []
+        node = FakeLogNode([[(1, self._log(12))], [], [], []], head_per_conn=[10, 20, 30, 40], get_logs=self._get_logs)
+        subscriber = self._run(node, backfill_max_blocks=1000, backfill_block_window=100)
+
+        self.assertEqual(self.get_logs_list, [
+            (1, 1, 12, 20), (1, 2, 12, 20),
+            # last block not advanced by dropped backfill
+            (2, 1, 12, 30), (2, 2, 12, 30),
+            # failed config backfilled from same block
+            (3, 1, 30, 40), (3, 2, 12, 40),
+        ])
+        self.assertEqual(self.deliver_list, [(1, 12), (1, 12), (1, 30), (2, 12)])
+        self.assertEqual(subscriber.last_block, 40)
@@ -2,8 +2,10 @@
 import asyncio
 import json
 import logging
+import time
+from collections import defaultdict
 from threading import Thread
-from typing import Dict, List, TypedDict
+from typing import Callable, Dict, List, Optional, Tuple, TypedDict
 
 from websockets import connect
 
@@ -12,8 +14,11 @@ from izumi_infra.etherscan.constants import (ScanConfigStatusEnum,
                                              ScanModeEnum, ScanTypeEnum)
 from izumi_infra.etherscan.scan_utils import get_filter_set_from_str
 from izumi_infra.utils.abi_helper import get_event_topic_to_selector
+from izumi_infra.utils.collection_utils import chunks
 from izumi_infra.utils.task_utils import is_celery_worker_mode
 
+logger = logging.getLogger(__name__)
+
 
 # from asgiref.sync import sync_to_async
 # https://stackoverflow.com/questions/61926359/django-synchronousonlyoperation-you-cannot-call-this-from-an-async-context-u
@@ -24,6 +29,214 @@ class AsyncEventScantItem(TypedDict):
     contract_address: str
     topic_filter_list: List[str]
 
+def build_subscribe_filter(scanItem: AsyncEventScantItem) -> Dict:
+    subscribe_filter = {}
+    if scanItem['contract_address'] != ZERO_ADDRESS:
+        subscribe_filter['address'] = [scanItem['contract_address'].lower()]
+
+    if scanItem['topic_filter_list']:
+        topics = [scanItem['topic_to_selector'][topic_name] for topic_name in scanItem['topic_filter_list']]
+    else:
+        topics = list(scanItem['topic_to_selector'].values())
+
+    # 2 dem array as or condition
+    subscribe_filter['topics'] = [topics]
+    return subscribe_filter
+
+class MultiplexLogSubscriber():
+    """
+    eth_subscribe logs of many scan config over one websocket, message routed to config by subscription id,
+    all subscription resubscribed together when connection dropped or idle over conn_timeout_sec.
+    After resubscribe, logs since last seen block fetched by eth_getLogs of same filter and delivered before live message.
+    """
+
+    def __init__(self, ws_rpc_url: str, scan_item_list: List[AsyncEventScantItem], deliver: Callable[[int, str], None],
+                 conn_timeout_sec: int, reconnect_delay_sec: float = 1,
+                 backfill_max_blocks: int = 0, backfill_block_window: int = 2000) -> None:
+        self.ws_rpc_url = ws_rpc_url
+        # request id of eth_subscribe to item
+        self.request_id_to_item: Dict[int, AsyncEventScantItem] = {i + 1: item for i, item in enumerate(scan_item_list)}
+        self.deliver = deliver
+        self.conn_timeout_sec = conn_timeout_sec
+        self.reconnect_delay_sec = reconnect_delay_sec
+        self.backfill_max_blocks = backfill_max_blocks
+        self.backfill_block_window = backfill_block_window
+        # subscription id to scan_config_id of current connection
+        self.subscription_to_config_id: Dict[str, int] = {}
+        # latest block of received log or head at subscribe, all subscriptions of connection live or dropped together
+        self.last_block: Optional[int] = None
+        # scan_config_id to from block of failed backfill, retried at next backfill
+        self._backfill_fail_from_block: Dict[int, int] = {}
+        # request id of other rpc over connection, after eth_subscribe ids
+        self._rpc_id = len(self.request_id_to_item)
+        # live message received while waiting rpc response
+        self._held_messages: List[Tuple[Dict, str]] = []
+
+    async def run(self) -> None:
+        while self.request_id_to_item:
+            try:
+                async with connect(self.ws_rpc_url, ping_interval=None) as ws:
+                    await self._subscribe_all(ws)
+                    if self.backfill_max_blocks > 0: await self._backfill(ws)
+                    await self._recv_loop(ws)
+            except asyncio.TimeoutError:
+                # timeout to re-connect
+                logger.error(f'SubscriptionTimeout of {len(self.request_id_to_item)} config, start reSubscription')
+            except Exception as e:
+                logger.error(f'exception when recv for eth_subscribe, {len(self.request_id_to_item)} config to reSubscription')
+                logger.exception(e)
+            await asyncio.sleep(self.reconnect_delay_sec)
+
+    async def _subscribe_all(self, ws) -> None:
+        self.subscription_to_config_id = {}
+        self._held_messages = []
+        for request_id, scanItem in self.request_id_to_item.items():
+            await ws.send(json.dumps({"id": request_id, "method": "eth_subscribe", "params": ["logs", build_subscribe_filter(scanItem)]}))
+
+    async def _backfill(self, ws) -> None:
+        """
+        eth_getLogs of [last_block, head] by backfill_block_window for each config, older than backfill_max_blocks left to audit,
+        last_block advanced only after all delivered, config of failed window backfilled from same block at next resubscribe
+        """
+        head_response = (await self._request(ws, [('eth_blockNumber', [])]))[0]
+        head = int(head_response['result'], 16)
+        if self.last_block is None or self.last_block > head:
+            self.last_block = max(head, self.last_block or 0)
+            return
+
+        min_from_block = max(head - self.backfill_max_blocks + 1, 0)
+        from_block = max(self.last_block, min_from_block)
+        if self.last_block < min_from_block:
+            logger.warn(f'realtime backfill gap [{self.last_block}, {head}] over {self.backfill_max_blocks} blocks, '
+                        f'[{self.last_block}, {min_from_block - 1}] left to audit')
+
+        request_list, scan_config_id_list, config_from_block = [], [], {}
+        for scanItem in self.request_id_to_item.values():
+            scan_config_id = scanItem['scan_config_id']
+            config_from_block[scan_config_id] = max(self._backfill_fail_from_block.get(scan_config_id, from_block), min_from_block)
+            for window_start in range(config_from_block[scan_config_id], head + 1, self.backfill_block_window):
+                window_end = min(window_start + self.backfill_block_window - 1, head)
+                request_list.append(('eth_getLogs', [{**build_subscribe_filter(scanItem), 'fromBlock': hex(window_start), 'toBlock': hex(window_end)}]))
+                scan_config_id_list.append(scan_config_id)
+        response_map = await self._request(ws, request_list)
+
+        backfill_count, fail_config_id_set = 0, set()
+        for i, scan_config_id in enumerate(scan_config_id_list):
+            response = response_map[i]
+            if 'result' not in response:
+                logger.error(f'realtime backfill fail, scan_config_id: {scan_config_id}, {request_list[i][1]}, {response}')
+                fail_config_id_set.add(scan_config_id)
+                continue
+            for log in response['result']:
+                # same format as subscription message for ingestion
+                self.deliver(scan_config_id, json.dumps({'jsonrpc': '2.0', 'method': 'eth_subscription', 'params': {'subscription': '', 'result': log}}))
+                backfill_count += 1
+
+        self._backfill_fail_from_block = {scan_config_id: config_from_block[scan_config_id] for scan_config_id in fail_config_id_set}
+        self.last_block = max(head, self.last_block)
+        logger.info(f'realtime backfill [{from_block}, {head}] of {len(self.request_id_to_item)} config, {backfill_count} logs, '
+                    f'fail config: {sorted(fail_config_id_set)}')
+
+    async def _request(self, ws, method_params_list: List[Tuple[str, List]]) -> Dict[int, Dict]:
+        """
+        send rpc over subscription connection, return {index: response}, live message received meanwhile held
+        """
+        id_to_index = {}
+        for i, (method, params) in enumerate(method_params_list):
+            self._rpc_id += 1
+            id_to_index[self._rpc_id] = i
+            await ws.send(json.dumps({"id": self._rpc_id, "method": method, "params": params}))
+
+        response_map = {}
+        while len(response_map) < len(id_to_index):
+            message = await asyncio.wait_for(ws.recv(), timeout=self.conn_timeout_sec)
+            message_dict = json.loads(message)
+            if message_dict.get('id') in id_to_index:
+                response_map[id_to_index[message_dict['id']]] = message_dict
+            elif message_dict.get('method') == 'eth_subscription':
+                self._held_messages.append((message_dict, message))
+            else:
+                self._on_subscribe_response(message_dict, message)
+        return response_map
+
+    async def _recv_loop(self, ws) -> None:
+        held_messages, self._held_messages = self._held_messages, []
+        for message_dict, message in held_messages:
+            self._on_message(message_dict, message)
+
+        while self.request_id_to_item:
+            message = await asyncio.wait_for(ws.recv(), timeout=self.conn_timeout_sec)
+            self._on_message(json.loads(message), message)
+
+    def _on_message(self, message_dict: Dict, message: str) -> None:
+        if message_dict.get('method') != 'eth_subscription':
+            self._on_subscribe_response(message_dict, message)
+            return
+
+        scan_config_id = self.subscription_to_config_id.get(message_dict['params']['subscription'])
+        if scan_config_id is None:
+            logger.warn(f'unknown subscription message: {message[:200]}')
+            return
+        block_number = message_dict['params']['result'].get('blockNumber')
+        if block_number: self.last_block = max(int(block_number, 16), self.last_block or 0)
+        self.deliver(scan_config_id, message)
+
+    def _on_subscribe_response(self, message_dict: Dict, message: str) -> None:
+        scanItem = self.request_id_to_item.get(message_dict.get('id'))
+        if scanItem is None:
+            logger.warn(f'unknown response: {message[:200]}')
+            return
+
+        scan_config_id = scanItem['scan_config_id']
+        logger.info(f'scan_config_id: {scan_config_id}, subscription response: {message}')
+        if 'result' not in message_dict:
+            logger.error(f'scan_config_id: {scan_config_id}, subscribe_filter: {build_subscribe_filter(scanItem)}, subscribe fail with: {message}')
+            # not resubscribed
+            del self.request_id_to_item[message_dict['id']]
+            return
+        self.subscription_to_config_id[message_dict['result']] = scan_config_id
+
+class EventBatchBuffer():
+    """
+    Buffer realtime event message per scan config in event loop, flush one config by flush_batch
+    when batch_size reached or its oldest message waited max_latency_sec
+    """
+
+    def __init__(self, flush_batch: Callable[[int, List[str]], None], batch_size: int, max_latency_sec: float) -> None:
+        self.flush_batch = flush_batch
+        self.batch_size = batch_size
+        self.max_latency_sec = max_latency_sec
+        # scan_config_id: (flush deadline, messages)
+        self._buffers: Dict[int, Tuple[float, List[str]]] = {}
+        self._wakeup = asyncio.Event()
+
+    def add(self, scan_config_id: int, message: str) -> None:
+        buffer = self._buffers.get(scan_config_id)
+        if buffer is None:
+            buffer = self._buffers[scan_config_id] = (time.monotonic() + self.max_latency_sec, [])
+            self._wakeup.set()
+        buffer[1].append(message)
+        if len(buffer[1]) >= self.batch_size: self._flush(scan_config_id)
+
+    def _flush(self, scan_config_id: int) -> None:
+        _, message_list = self._buffers.pop(scan_config_id)
+        try:
+            self.flush_batch(scan_config_id, message_list)
+        except Exception as e:
+            logger.error(f'flush realtime event batch fail, scan_config_id: {scan_config_id}, size: {len(message_list)}')
+            logger.exception(e)
+
+    async def run(self) -> None:
+        while True:
+            if not self._buffers:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            now = time.monotonic()
+            for scan_config_id in [k for k, (deadline, _) in self._buffers.items() if deadline <= now]:
+                self._flush(scan_config_id)
+            if self._buffers:
+                await asyncio.sleep(max(0, min(deadline for deadline, _ in self._buffers.values()) - time.monotonic()))
+
 class AsyncEthScanThread(Thread):
     def __init__(self):
         super().__init__(daemon=True)
@@ -33,62 +246,13 @@ class AsyncEthScanThread(Thread):
         from izumi_infra.blockchain.conf import blockchain_settings
         from izumi_infra.etherscan.conf import etherscan_settings
         from izumi_infra.etherscan.models import EtherScanConfig
-        from izumi_infra.etherscan.tasks import etherscan_async_event_save
+        from izumi_infra.etherscan.tasks import (etherscan_async_event_batch_save,
+                                                 etherscan_async_event_save)
 
         if not etherscan_settings.ENABLE_ASYNC_EVENT_SCANT: return
 
-        logger = logging.getLogger(__name__)
         logger.info('AsyncEthScanThread Start')
 
-        async def subscribe_and_recv_event(scanItem: AsyncEventScantItem) -> None:
-            ws_rpc_url = scanItem['ws_rpc_url']
-            scan_config_id = scanItem['scan_config_id']
-            if not ws_rpc_url:
-                logger.error(f'invalid ws_rpc_url for {scan_config_id}')
-                return
-
-            subscribe_filter = {}
-            if scanItem['contract_address'] != ZERO_ADDRESS:
-                subscribe_filter['address'] = [scanItem['contract_address'].lower()]
-
-            if scanItem['topic_filter_list']:
-                topics = [scanItem['topic_to_selector'][topic_name] for topic_name in scanItem['topic_filter_list']]
-            else:
-                topics = list(scanItem['topic_to_selector'].values())
-
-            # 2 dem array as or condition
-            subscribe_filter['topics'] = [topics]
-
-            while True:
-                async with connect(ws_rpc_url, ping_interval=None) as ws:
-                    await ws.send(json.dumps({"id": 1, "method": "eth_subscribe", "params": ["logs", subscribe_filter]}))
-                    subscription_response = await ws.recv()
-                    logger.info(f'scan_config_id: {scan_config_id}, subscription response: {subscription_response}')
-                    subscription_data = json.loads(subscription_response)
-                    if 'result' not in subscription_data:
-                        logger.error(f'scan_config_id: {scan_config_id}, subscribe_filter: {subscribe_filter}, subscribe fail with: {subscription_response}')
-                        return
-
-                    while True:
-                        try:
-                            message = await asyncio.wait_for(ws.recv(), timeout=etherscan_settings.ASYNC_EVENT_SCANT_CONN_TIMEOUT_SEC)
-
-                            # TODO: reactor pass msg to another thread?
-                            etherscan_async_event_save.delay(scan_config_id, message)
-
-                            # recv_subscription_id = message_dict['params']['subscription']
-                            # if subscription_id != recv_subscription_id:
-                            #     response = await ws.send(json.dumps({"id": 2, "method": "eth_unsubscribe", "params": [recv_subscription_id]}))
-                            #     logger.warn(f'eth_unsubscribe: {recv_subscription_id} diff current: {subscription_id}, result {response}')
-                        except asyncio.TimeoutError as e:
-                            # timeout to re-connect
-                            logger.error('SubscriptionTimeout, start reSubscription')
-                            break
-                        except Exception as e:
-                            logger.error(f'exception when recv for eth_subscribe')
-                            logger.exception(e)
-                            break
-
         def event_scan_config_to_item(eventScanConfig: EtherScanConfig) -> AsyncEventScantItem:
             return AsyncEventScantItem(
                 scan_config_id=eventScanConfig.id,
@@ -98,18 +262,52 @@ class AsyncEthScanThread(Thread):
                 topic_filter_list=list(get_filter_set_from_str(eventScanConfig.topic_filter_list))
             )
 
+        def deliver_single(scan_config_id: int, message: str) -> None:
+            etherscan_async_event_save.delay(scan_config_id, message)
+
+        def deliver_batch(scan_config_id: int, message_list: List[str]) -> None:
+            etherscan_async_event_batch_save.delay(scan_config_id, message_list)
+
         realtimeEventScanConfig = EtherScanConfig.objects.filter(
             status=ScanConfigStatusEnum.ENABLE,
             scan_type=ScanTypeEnum.Event,
             scan_mode=ScanModeEnum.RealtimeEventScan
-        ).all()
+        ).select_related('contract__chain').all()
 
         if not realtimeEventScanConfig:
             return
 
-        async_tasks = [subscribe_and_recv_event(event_scan_config_to_item(scanConfig)) for scanConfig in realtimeEventScanConfig]
+        ws_rpc_url_to_items: Dict[str, List[AsyncEventScantItem]] = defaultdict(list)
+        for scanConfig in realtimeEventScanConfig:
+            scanItem = event_scan_config_to_item(scanConfig)
+            if not scanItem['ws_rpc_url']:
+                logger.error(f'invalid ws_rpc_url for {scanItem["scan_config_id"]}')
+                continue
+            ws_rpc_url_to_items[scanItem['ws_rpc_url']].append(scanItem)
+
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
+
+        async_tasks = []
+        batch_enabled = etherscan_settings.ASYNC_EVENT_SCANT_BATCH_SIZE > 1
+        if batch_enabled:
+            # asyncio.Event bound to loop set above on python < 3.10
+            eventBatchBuffer = EventBatchBuffer(deliver_batch, etherscan_settings.ASYNC_EVENT_SCANT_BATCH_SIZE,
+                                                etherscan_settings.ASYNC_EVENT_SCANT_BATCH_MAX_LATENCY_MS / 1000)
+            async_tasks.append(eventBatchBuffer.run())
+        deliver = eventBatchBuffer.add if batch_enabled else deliver_single
+
+        max_subscription = etherscan_settings.ASYNC_EVENT_SCANT_MAX_SUBSCRIPTION_PER_CONN
+        subscriber_list = []
+        for ws_rpc_url, scan_item_list in ws_rpc_url_to_items.items():
+            for scan_item_chunk in chunks(scan_item_list, max_subscription if max_subscription > 0 else len(scan_item_list)):
+                subscriber_list.append(MultiplexLogSubscriber(
+                    ws_rpc_url, scan_item_chunk, deliver, etherscan_settings.ASYNC_EVENT_SCANT_CONN_TIMEOUT_SEC,
+                    backfill_max_blocks=etherscan_settings.ASYNC_EVENT_SCANT_BACKFILL_MAX_BLOCKS,
+                    backfill_block_window=etherscan_settings.ASYNC_EVENT_SCANT_BACKFILL_BLOCK_WINDOW))
+        logger.info(f'AsyncEthScanThread {sum(len(v) for v in ws_rpc_url_to_items.values())} config over {len(subscriber_list)} connection')
+        async_tasks.extend(subscriber.run() for subscriber in subscriber_list)
+
         try:
             loop.run_until_complete(asyncio.gather(*async_tasks))
         except Exception as e:
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+import time
+from threading import Thread
+from typing import Callable, Dict, Optional
+
+from websockets import connect
+
+from izumi_infra.blockchain.rpc_metrics import endpoint_label
+from izumi_infra.etherscan.constants import ScanTypeEnum
+from izumi_infra.utils.task_utils import is_celery_worker_mode
+
+logger = logging.getLogger(__name__)
+
+class ChainHeadScanTrigger():
+    """
+    Trigger scan of one chain when head - stable_block_offset of any config passed its last scanned block,
+    triggers within debounce_sec merged into one
+    """
+
+    def __init__(self, chain_id: int, scan_type_to_threshold: Dict[ScanTypeEnum, int],
+                 trigger: Callable[[int, ScanTypeEnum], None], debounce_sec: float) -> None:
+        self.chain_id = chain_id
+        # scan type: head over it has new stable block for some config, min of last task end + stable offset
+        self.scan_type_to_threshold = scan_type_to_threshold
+        self.trigger = trigger
+        self.debounce_sec = debounce_sec
+        self.head = -1
+        self._last_trigger_time = 0.0
+        self._pending: Optional[asyncio.TimerHandle] = None
+
+    def on_head(self, head: int) -> None:
+        self.head = max(self.head, head)
+        if self._pending is not None: return
+        if not any(self.head > threshold for threshold in self.scan_type_to_threshold.values()): return
+
+        delay = max(0, self._last_trigger_time + self.debounce_sec - time.monotonic())
+        self._pending = asyncio.get_event_loop().call_later(delay, self._fire)
+
+    def _fire(self) -> None:
+        self._pending = None
+        self._last_trigger_time = time.monotonic()
+        for scan_type, threshold in self.scan_type_to_threshold.items():
+            if self.head <= threshold: continue
+            try:
+                self.trigger(self.chain_id, scan_type)
+            except Exception as e:
+                logger.error(f'head scan trigger fail, chain: {self.chain_id}, scan type: {scan_type}')
+                logger.exception(e)
+                continue
+            # scan cover head - stable offset of every config
+            self.scan_type_to_threshold[scan_type] = self.head
+
+async def subscribe_new_heads(ws_rpc_url: str, on_head: Callable[[int], None], conn_timeout_sec: int, reconnect_delay_sec: float = 1) -> None:
+    """
+    eth_subscribe newHeads, reconnect when dropped or idle over conn_timeout_sec, return when subscribe rejected
+    """
+    while True:
+        try:
+            async with connect(ws_rpc_url, ping_interval=None) as ws:
+                await ws.send(json.dumps({"id": 1, "method": "eth_subscribe", "params": ["newHeads"]}))
+                while True:
+                    message = await asyncio.wait_for(ws.recv(), timeout=conn_timeout_sec)
+                    message_dict = json.loads(message)
+                    if message_dict.get('method') == 'eth_subscription':
+                        on_head(int(message_dict['params']['result']['number'], 16))
+                    elif 'error' in message_dict:
+                        logger.error(f'newHeads subscribe fail with: {message}')
+                        return
+        except asyncio.TimeoutError:
+            logger.error(f'newHeads SubscriptionTimeout of {endpoint_label(ws_rpc_url)}, start reSubscription')
+        except Exception as e:
+            logger.error(f'exception when recv for newHeads of {endpoint_label(ws_rpc_url)}')
+            logger.exception(e)
+        await asyncio.sleep(reconnect_delay_sec)
+
+async def poll_head(get_latest_block_number: Callable[[], int], on_head: Callable[[int], None], interval_sec: float) -> None:
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            on_head(await loop.run_in_executor(None, get_latest_block_number))
+        except Exception as e:
+            logger.warn(f'poll head fail: {e}')
+        await asyncio.sleep(interval_sec)
+
+class HeadScanTriggerThread(Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+
+    def run(self):
+        # must import django related things here
+        from django.db.models import Max
+
+        from izumi_infra.blockchain.context import blockchainHolder
+        from izumi_infra.etherscan.conf import etherscan_settings
+        from izumi_infra.etherscan.constants import ScanConfigStatusEnum
+        from izumi_infra.etherscan.models import (ContractEventScanTask,
+                                                  ContractTransactionScanTask,
+                                                  EtherScanConfig)
+        from izumi_infra.etherscan.tasks import (contract_event_scan_chain_task,
+                                                 contract_trans_scan_chain_task)
+
+        if not etherscan_settings.ENABLE_HEAD_SCAN_TRIGGER: return
+
+        logger.info('HeadScanTriggerThread Start')
+
+        scan_config_list = list(EtherScanConfig.objects.select_related('contract__chain').filter(
+            status=ScanConfigStatusEnum.ENABLE,
+            scan_type__in=[ScanTypeEnum.Event, ScanTypeEnum.Transaction]
+        ))
+        if not scan_config_list: return
+
+        scan_type_to_task_model = {ScanTypeEnum.Event: ContractEventScanTask, ScanTypeEnum.Transaction: ContractTransactionScanTask}
+        contract_last_end: Dict[ScanTypeEnum, Dict[int, int]] = {}
+        for scan_type, task_model in scan_type_to_task_model.items():
+            contract_id_set = set(c.contract_id for c in scan_config_list if c.scan_type == scan_type)
+            contract_last_end[scan_type] = dict(task_model.objects.filter(contract_id__in=contract_id_set)
+                                                .values('contract').annotate(last_end=Max('end_block_id')).values_list('contract', 'last_end'))
+
+        chain_to_threshold: Dict[int, Dict[ScanTypeEnum, int]] = {}
+        chain_to_model = {}
+        for scan_config in scan_config_list:
+            chain = scan_config.contract.chain
+            chain_to_model[chain.chain_id] = chain
+            # no task yet, scan at first head
+            threshold = contract_last_end[scan_config.scan_type].get(scan_config.contract_id, -1) + scan_config.stable_block_offset
+            scan_type_threshold = chain_to_threshold.setdefault(chain.chain_id, {})
+            scan_type_threshold[scan_config.scan_type] = min(threshold, scan_type_threshold.get(scan_config.scan_type, threshold))
+
+        scan_type_to_task = {ScanTypeEnum.Event: contract_event_scan_chain_task, ScanTypeEnum.Transaction: contract_trans_scan_chain_task}
+        def trigger(chain_id: int, scan_type: ScanTypeEnum) -> None:
+            scan_type_to_task[scan_type].delay(chain_id)
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        async def run_chain(chain, scan_trigger: ChainHeadScanTrigger) -> None:
+            if chain.ws_rpc_url:
+                await subscribe_new_heads(chain.ws_rpc_url, scan_trigger.on_head, etherscan_settings.HEAD_SCAN_CONN_TIMEOUT_SEC)
+                logger.warn(f'chain {chain.chain_id} fallback to poll head')
+            blockchain_facade = blockchainHolder.get_facade_by_model(chain)
+            await poll_head(blockchain_facade.get_latest_block_number, scan_trigger.on_head, etherscan_settings.HEAD_SCAN_POLL_INTERVAL_MS / 1000)
+
+        async_tasks = []
+        for chain_id, scan_type_to_threshold in chain_to_threshold.items():
+            scan_trigger = ChainHeadScanTrigger(chain_id, scan_type_to_threshold, trigger, etherscan_settings.HEAD_SCAN_DEBOUNCE_MS / 1000)
+            async_tasks.append(run_chain(chain_to_model[chain_id], scan_trigger))
+        logger.info(f'HeadScanTriggerThread {len(scan_config_list)} config of {len(async_tasks)} chain')
+
+        try:
+            loop.run_until_complete(asyncio.gather(*async_tasks))
+        except Exception as e:
+            logger.exception(e)
+
+    def start(self) -> None:
+        if not is_celery_worker_mode(): return
+        return super().start()
@@ -30,6 +30,7 @@ class EventExtra(TypedDict):
 
 class TransExtraData(TypedDict):
     fn_name: str
+    timestamp: int
 
 class TransExtra(TypedDict):
     trans: TxData
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import logging
 from typing import Any, Callable, List
+
+from django.db.models.signals import post_save
+
 from izumi_infra.etherscan.constants import INIT_SUB_STATUS, ProcessingStatusEnum, SubReceiverGroupEnum
 
 logger = logging.getLogger(__name__)
@@ -56,6 +59,18 @@ def is_sync_entity(entity) -> bool:
     """
     return getattr(entity, SIGNAL_PARAM_SYNC_TASK, False)
 
+def send_entity_post_save(model_class, entity_list: List[Any]) -> None:
+    """
+    dispatch post_save(created=True) for entities insert by bulk_create which not trigger signal
+    """
+    for entity in entity_list:
+        try:
+            post_save.send(sender=model_class, instance=entity, created=True,
+                           update_fields=None, raw=False, using=entity._state.db)
+        except Exception as e:
+            logger.error(f'send post_save error for entity: {entity}')
+            logger.exception(e)
+
 def execute_filter_func_chain(data: Any, filter_list: List[Callable]) -> bool:
     """
     return is continue execute
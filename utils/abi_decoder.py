@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from threading import Lock
+from typing import Any, Dict, List, Tuple
+
+from eth_abi.decoding import ContextFramesBytesIO, TupleDecoder
+from eth_abi.exceptions import InsufficientDataBytes, NonEmptyPaddingBytes
+from eth_abi.registry import registry as event_abi_registry
+from eth_event.main import ABIError, EventError, UnknownEvent, _params
+from eth_utils import function_abi_to_4byte_selector, to_hex
+from hexbytes import HexBytes
+from web3._utils.abi import (build_default_registry, get_abi_input_names,
+                             get_abi_input_types, map_abi_data)
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+from izumi_infra.utils.abi_registry import abiRegistry
+
+# same registry as web3 codec for function input
+fn_abi_registry = build_default_registry()
+
+
+class EventLogDecoder():
+    """
+    Precompiled decoder of one event, output same as covert_decode_log_to_event(eth_event.decode_log(...))
+    """
+
+    def __init__(self, event_abi: Dict) -> None:
+        self.name = event_abi['name']
+        self.inputs = event_abi['inputs']
+        self.indexed_count = len([i for i in self.inputs if i['indexed']])
+
+        try:
+            unindexed_types = _params([i for i in self.inputs if not i['indexed']])
+            # ABI has indexed values but the log does not, see eth_event._decode
+            all_types = _params(self.inputs)
+        except (KeyError, TypeError):
+            raise ABIError("Invalid ABI")
+
+        self.unindexed_decoder = self._build_tuple_decoder(unindexed_types)
+        self.unindexed_zero_data = bytes(len(unindexed_types) * 32)
+        self.all_decoder = self._build_tuple_decoder(all_types)
+        self.all_zero_data = bytes(len(all_types) * 32)
+        self.indexed_decoders = [self._build_single_decoder(i['type']) if i['indexed'] else None for i in self.inputs]
+        # (name, is_indexed, component names of tuple)
+        self.layout = [(i['name'], i['indexed'], [c['name'] for c in i['components']] if i['type'] == 'tuple' else None)
+                       for i in self.inputs]
+
+    @staticmethod
+    def _build_tuple_decoder(types: List[str]) -> TupleDecoder:
+        return TupleDecoder(decoders=[event_abi_registry.get_decoder(t) for t in types])
+
+    @staticmethod
+    def _build_single_decoder(type_str: str):
+        try:
+            return event_abi_registry.get_decoder(type_str)
+        except Exception:
+            # keep indexed value encoded as eth_event does
+            return None
+
+    def decode(self, log: Dict) -> Dict:
+        topics = log['topics'][1:]
+        data = log['data']
+        if self.indexed_count and not topics:
+            decoder, zero_data, indexed_topics = self.all_decoder, self.all_zero_data, False
+        else:
+            if self.indexed_count < len(topics):
+                raise EventError("Event log does not contain enough topics for the given ABI")
+            if self.indexed_count > len(topics):
+                raise EventError("Event log contains more topics than expected for the given ABI")
+            decoder, zero_data, indexed_topics = self.unindexed_decoder, self.unindexed_zero_data, True
+
+        data = zero_data if zero_data and data == '0x' else HexBytes(data)
+        try:
+            decoded = iter(decoder(ContextFramesBytesIO(data)))
+        except InsufficientDataBytes:
+            raise EventError("Event data has insufficient length")
+        except NonEmptyPaddingBytes:
+            raise EventError("Malformed data field in event log")
+        except OverflowError:
+            raise EventError("Cannot decode event due to overflow error")
+
+        topic_iter = iter(topics)
+        event_data = {}
+        for (name, is_indexed, component_names), indexed_decoder in zip(self.layout, self.indexed_decoders):
+            if indexed_topics and is_indexed:
+                encoded = HexBytes(next(topic_iter))
+                if indexed_decoder is None:
+                    event_data[name] = encoded.hex()
+                    continue
+                try:
+                    value = indexed_decoder(ContextFramesBytesIO(encoded))
+                except (InsufficientDataBytes, OverflowError):
+                    # an array or other data type that uses multiple slots
+                    event_data[name] = encoded.hex()
+                    continue
+            else:
+                value = next(decoded)
+
+            if isinstance(value, bytes):
+                value = HexBytes(value).hex()
+            if component_names is not None:
+                value = dict(zip(component_names, value))
+            event_data[name] = value
+
+        return event_data
+
+
+class FunctionInputDecoder():
+    """
+    Precompiled decoder of one function input, output same as params of web3 contract.decode_function_input
+    """
+
+    def __init__(self, fn_abi: Dict) -> None:
+        self.fn_abi = fn_abi
+        self.fn_name = fn_abi['name']
+        self.selector = to_hex(function_abi_to_4byte_selector(fn_abi))
+        self.names = get_abi_input_names(fn_abi)
+        self.types = get_abi_input_types(fn_abi)
+        self.decoder = TupleDecoder(decoders=[fn_abi_registry.get_decoder(t) for t in self.types])
+
+    def decode(self, input_data: HexBytes) -> Dict[str, Any]:
+        decoded = self.decoder(ContextFramesBytesIO(input_data[4:]))
+        normalized = map_abi_data(BASE_RETURN_NORMALIZERS, self.types, decoded)
+        return dict(zip(self.names, normalized))
+
+
+class AbiDecoderRegistry():
+    """
+    Decoder keyed by (abi hash, topic0 or 4-byte selector), compiled once per signature
+    """
+
+    def __init__(self) -> None:
+        self._event_decoders: Dict[Tuple[str, str], EventLogDecoder] = {}
+        self._fn_decoders: Dict[Tuple[str, str], FunctionInputDecoder] = {}
+        self._lock = Lock()
+
+    def register_abi(self, abi_json_str: str) -> str:
+        """
+        return abi hash used as decode key, abi parsed once by abiRegistry
+        """
+        return abiRegistry.register(abi_json_str).abi_hash
+
+    def get_event_decoder(self, abi_hash: str, topic0: str) -> EventLogDecoder:
+        key = (abi_hash, topic0)
+        decoder = self._event_decoders.get(key)
+        if decoder is not None: return decoder
+
+        event_abi = abiRegistry.get(abi_hash).topic_to_event_abi.get(topic0)
+        if event_abi is None:
+            raise UnknownEvent("Event topic is not present in given ABI")
+        with self._lock:
+            return self._event_decoders.setdefault(key, EventLogDecoder(event_abi))
+
+    def get_function_decoder(self, abi_hash: str, selector: str) -> FunctionInputDecoder:
+        key = (abi_hash, selector)
+        decoder = self._fn_decoders.get(key)
+        if decoder is not None: return decoder
+
+        fn_abi = abiRegistry.get(abi_hash).selector_to_fn_abi.get(selector)
+        if fn_abi is None:
+            raise ValueError(f"Could not find any function with matching selector: {selector}")
+        with self._lock:
+            return self._fn_decoders.setdefault(key, FunctionInputDecoder(fn_abi))
+
+    def decode_event_log(self, abi_hash: str, log: Dict) -> Dict:
+        if not log['topics']:
+            raise EventError("Cannot decode an anonymous event")
+        return self.get_event_decoder(abi_hash, HexBytes(log['topics'][0]).hex()).decode(log)
+
+    def decode_event_logs(self, abi_hash: str, logs: List[Dict]) -> List[Dict]:
+        return [self.decode_event_log(abi_hash, log) for log in logs]
+
+    def decode_function_input(self, abi_hash: str, input_data: str) -> Tuple[FunctionInputDecoder, Dict[str, Any]]:
+        input_data = HexBytes(input_data)
+        decoder = self.get_function_decoder(abi_hash, input_data[:4].hex())
+        return decoder, decoder.decode(input_data)
+
+    def decode_function_inputs(self, abi_hash: str, input_data_list: List[str]) -> List[Tuple[FunctionInputDecoder, Dict[str, Any]]]:
+        return [self.decode_function_input(abi_hash, input_data) for input_data in input_data_list]
+
+abiDecoderRegistry = AbiDecoderRegistry()
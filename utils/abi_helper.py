@@ -1,21 +1,18 @@
-import json
 from typing import Dict
-from eth_utils import function_abi_to_4byte_selector, event_abi_to_log_topic, function_signature_to_4byte_selector
+from eth_utils import function_signature_to_4byte_selector
 from eth_utils import to_hex
-from eth_utils.abi import _abi_to_signature
+
+from izumi_infra.utils.abi_registry import abiRegistry
 
 def get_abi_selector_to_signature(abi_str: str) -> Dict[str, Dict[str, str]]:
     """
     get function or event selector to signature mapping
     """
-    abi_all = json.loads(abi_str)
-    fn_mapping = { to_hex(function_abi_to_4byte_selector(e)): _abi_to_signature(e) for e in abi_all if e['type'] == 'function' }
-    event_mapping = { to_hex(event_abi_to_log_topic(e)): _abi_to_signature(e) for e in abi_all if e['type'] == 'event' }
-
-    return {'function': fn_mapping, 'event' : event_mapping}
+    selector_to_signature = abiRegistry.register(abi_str).selector_to_signature
+    return {'function': dict(selector_to_signature['function']), 'event' : dict(selector_to_signature['event'])}
 
 def get_event_topic_to_selector(abi_str: str) -> Dict[str, str]:
-    selector_to_signature = get_abi_selector_to_signature(abi_str)['event']
+    selector_to_signature = abiRegistry.register(abi_str).selector_to_signature['event']
     return { v.split('(')[0]: k for k, v in selector_to_signature.items() }
 
 def get_fn_selector_by_signature(fn_signature) -> str:
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+from threading import Lock
+from typing import Any, Dict, List
+
+import eth_event
+from eth_event.main import get_log_topic
+from eth_utils import (encode_hex, event_abi_to_log_topic,
+                       function_abi_to_4byte_selector, to_hex)
+from eth_utils.abi import _abi_to_signature
+
+
+def get_abi_hash(abi_json_str: str) -> str:
+    return hashlib.sha1(abi_json_str.encode('utf-8')).hexdigest()
+
+class AbiEntry():
+    """
+    Parsed abi and its topic, selector tables, shared by all facades of same abi, should not be modified
+    """
+
+    def __init__(self, abi_hash: str, abi_json_str: str) -> None:
+        self.abi_hash = abi_hash
+        self.abi: List[Dict] = json.loads(abi_json_str)
+
+        event_abi_list = [e for e in self.abi if e['type'] == 'event']
+        fn_abi_list = [f for f in self.abi if f['type'] == 'function']
+        # event name to topic, later one win for overloaded name
+        self.topic_name_to_topic: Dict[str, str] = {
+            e['name']: encode_hex(event_abi_to_log_topic({'name': e['name'], 'inputs': e['inputs']})) for e in event_abi_list
+        }
+        self.topic_to_topic_name: Dict[str, str] = {v: k for k, v in self.topic_name_to_topic.items()}
+        self.topic_to_event_abi: Dict[str, Dict] = {get_log_topic(e): e for e in event_abi_list if not e.get('anonymous')}
+        self.selector_to_fn_abi: Dict[str, Dict] = {to_hex(function_abi_to_4byte_selector(f)): f for f in fn_abi_list}
+        self.selector_to_signature: Dict[str, Dict[str, str]] = {
+            'function': {k: _abi_to_signature(f) for k, f in self.selector_to_fn_abi.items()},
+            'event': {to_hex(event_abi_to_log_topic(e)): _abi_to_signature(e) for e in event_abi_list},
+        }
+        self._topic_map = None
+        self._lock = Lock()
+
+    @property
+    def topic_map(self) -> Dict[str, Any]:
+        """
+        eth_event topic map, built on first use
+        """
+        if self._topic_map is None:
+            with self._lock:
+                if self._topic_map is None: self._topic_map = eth_event.get_topic_map(self.abi)
+        return self._topic_map
+
+class AbiRegistry():
+    """
+    AbiEntry keyed by content hash of abi json, parsed once per distinct abi
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, AbiEntry] = {}
+        self._lock = Lock()
+
+    def register(self, abi_json_str: str) -> AbiEntry:
+        abi_hash = get_abi_hash(abi_json_str)
+        entry = self._entries.get(abi_hash)
+        if entry is not None: return entry
+
+        entry = AbiEntry(abi_hash, abi_json_str)
+        with self._lock:
+            return self._entries.setdefault(abi_hash, entry)
+
+    def get(self, abi_hash: str) -> AbiEntry:
+        return self._entries[abi_hash]
+
+    def get_size(self) -> int:
+        return len(self._entries)
+
+abiRegistry = AbiRegistry()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import contextvars
+import os
+from threading import Lock, Thread
+from typing import Coroutine, Optional, TypeVar
+
+T = TypeVar('T')
+
+class EventLoopThread():
+    """
+    One event loop run forever in daemon thread, coroutine from sync code of any thread run on it,
+    so loop bound resource like connection pool kept between calls. Loop recreated in forked child process.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid: Optional[int] = None
+        self._lock = Lock()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None and self._pid == os.getpid(): return self._loop
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+            return self._loop
+
+    def run(self, coroutine: Coroutine[None, None, T]) -> T:
+        """
+        block current thread until coroutine done in loop thread, must not be called from loop thread
+        """
+        context = contextvars.copy_context()
+
+        async def _run_in_context() -> T:
+            # task of loop thread not inherit context of caller, like rpc_metrics_tag
+            for var, value in context.items(): var.set(value)
+            return await coroutine
+
+        return asyncio.run_coroutine_threadsafe(_run_in_context(), self.get_loop()).result()
@@ -1,15 +1,96 @@
 # -*- coding: utf-8 -*-
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from cachetools import LRUCache
+
+
+class _EvictCountLRUCache(LRUCache):
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(maxsize=maxsize)
+        self.evict_count = 0
+
+    def popitem(self):
+        self.evict_count += 1
+        return super().popitem()
+
+class FacadeRegistry():
+    """
+    Thread safe instance registry, instance of one key built once under per key lock,
+    rebuilt when fingerprint of its source changed, LRU bounded if max_size given
+    """
+
+    def __init__(self, max_size: Optional[int] = None) -> None:
+        # key: (fingerprint, instance)
+        self._entries = {} if max_size is None else _EvictCountLRUCache(max_size)
+        self._lock = Lock()
+        self._key_locks: Dict[Hashable, Lock] = {}
+        self._metrics = {'hit': 0, 'miss': 0, 'build': 0, 'invalidate': 0}
+
+    def get_or_build(self, key: Hashable, build_fn: Callable[[], Any], fingerprint: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._metrics['hit'] += 1
+                return entry[1]
+            key_lock = self._key_locks.setdefault(key, Lock())
+
+        with key_lock:
+            with self._lock:
+                # built by other thread while waiting
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == fingerprint:
+                    self._metrics['hit'] += 1
+                    return entry[1]
+                self._metrics['miss'] += 1
+
+            instance = build_fn()
+            with self._lock:
+                self._entries[key] = (fingerprint, instance)
+                self._metrics['build'] += 1
+                self._key_locks.pop(key, None)
+            return instance
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None: self._metrics['invalidate'] += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> None:
+        """
+        drop entries which predicate(key, instance) is true
+        """
+        with self._lock:
+            for key in [k for k, (_, instance) in list(self._entries.items()) if predicate(k, instance)]:
+                del self._entries[key]
+                self._metrics['invalidate'] += 1
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._metrics, 'size': len(self._entries), 'evict': getattr(self._entries, 'evict_count', 0)}
 
 # TODO continue abstract BaseContext
 class BaseContext():
     """
     Base context class
     """
-    def __init__(self):
-        self._instances = {}
+    def __init__(self, max_size: Optional[int] = None):
+        self._registry = FacadeRegistry(max_size)
 
     def get_context_size(self):
-        return len(self._instances)
+        return self._registry.size()
 
     def clear_context(self):
-        self._instances = {}
+        self._registry.clear()
+
+    def invalidate(self, key: Hashable) -> None:
+        self._registry.invalidate(key)
+
+    def get_metrics(self) -> Dict[str, int]:
+        return self._registry.get_metrics()
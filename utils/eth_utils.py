@@ -1,13 +1,11 @@
 # -*- coding: utf-8 -*-
-import json
-from functools import reduce
 from typing import Dict
 
-import eth_event
 from cachetools import LRUCache, cached
 from web3.types import LogReceipt
 
-from izumi_infra.utils.abi_helper import get_abi_selector_to_signature
+from izumi_infra.utils.abi_decoder import abiDecoderRegistry
+from izumi_infra.utils.abi_registry import abiRegistry
 
 
 def addr_identity(chainId: int, addr: str) -> str:
@@ -20,9 +18,12 @@ def __get_dict_from_decode_log_data(data):
         ret[data['components'][i]['name']] =  data['value'][i]
     return {data['name'] : ret}
 
-@cached(cache=LRUCache(maxsize=512))
 def get_event_signature(abi_str: str, event_name: str) -> str:
-    sig_to_event = get_abi_selector_to_signature(abi_str)['event']
+    return _get_event_signature_by_hash(abiRegistry.register(abi_str).abi_hash, event_name)
+
+@cached(cache=LRUCache(maxsize=512))
+def _get_event_signature_by_hash(abi_hash: str, event_name: str) -> str:
+    sig_to_event = abiRegistry.get(abi_hash).selector_to_signature['event']
     for k, v in sig_to_event.items():
         if v.startswith(event_name): return k
 
@@ -30,18 +31,21 @@ def covert_decode_log_to_event(decode_log: Dict) -> Dict:
     """
     convert data decode by eth_event.decode_log to normal event dict
     """
-    return reduce(lambda i, d: {**i, **__get_dict_from_decode_log_data(d)}, decode_log['data'], {})
+    event_data = {}
+    for d in decode_log['data']: event_data.update(__get_dict_from_decode_log_data(d))
+    return event_data
 
-@cached(cache=LRUCache(maxsize=512))
 def build_logs_event_decode_tool(abi_str: str, event_name: str):
-    event_sig = get_event_signature(abi_str, event_name)
-    topic_map = eth_event.get_topic_map(json.loads(abi_str))
+    return _build_logs_event_decode_tool_by_hash(abiDecoderRegistry.register_abi(abi_str), event_name)
+
+@cached(cache=LRUCache(maxsize=512))
+def _build_logs_event_decode_tool_by_hash(abi_hash: str, event_name: str):
+    event_sig = _get_event_signature_by_hash(abi_hash, event_name)
 
     def _selector(topic_sig: str) -> bool:
         return event_sig == topic_sig
 
     def _decode(log_receipt: LogReceipt):
-        decode_log = eth_event.decode_log(log_receipt, topic_map)
-        return covert_decode_log_to_event(decode_log)
+        return abiDecoderRegistry.decode_event_log(abi_hash, log_receipt)
 
     return _selector, _decode
@@ -1,36 +1,123 @@
 # -*- coding: utf-8 -*-
 import json
+import logging
 import os
+import pickle
+from collections.abc import Mapping
 from pathlib import Path
-import os
-from typing import List
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
+
+class LazyJsonConst(Mapping):
+    """
+    Json files indexed by key on first access, file parsed on first get and kept as json string only.
+    xxxPath.xxxFile without json return python object, xxxPath.xxxFile.json return json string.
+    Parsed string memoized to cache_path keyed by file mtime if given.
+    """
+
+    def __init__(self, src_path: Path, scan_path_list: List[str], key_ignore_pattern: str = '', cache_path: Optional[str] = None) -> None:
+        self.src_path = src_path
+        self.scan_path_list = sorted(set(scan_path_list))
+        self.key_ignore_pattern = key_ignore_pattern
+        self.cache_path = cache_path
+        # key: (file path, is json string key)
+        self._index: Optional[Dict[str, Tuple[Path, bool]]] = None
+        self._json_str: Dict[Path, str] = {}
+        self._file_cache: Optional[Dict[str, Tuple[int, str]]] = None
+        self._lock = Lock()
+
+    def _get_index(self) -> Dict[str, Tuple[Path, bool]]:
+        if self._index is not None: return self._index
+        with self._lock:
+            if self._index is None:
+                index = {}
+                for scan_path in self.scan_path_list:
+                    # glob from src dir, not walk whole tree
+                    for path in self.src_path.glob(os.path.join(scan_path, '**/*.json')):
+                        relpath = str(path.parent).replace(str(self.src_path), '')[1:]
+                        key_prefix = relpath.replace(self.key_ignore_pattern, '').replace(os.path.sep, '.')
+                        index[key_prefix + '.' + path.stem] = (path, False)
+                        index[key_prefix + '.' + path.name] = (path, True)
+                self._index = index
+        return self._index
+
+    def _load_json_str(self, path: Path) -> str:
+        json_str = self._json_str.get(path)
+        if json_str is not None: return json_str
+
+        with self._lock:
+            if path not in self._json_str:
+                self._json_str[path] = self._read_json_str(path)
+            return self._json_str[path]
+
+    def _read_json_str(self, path: Path) -> str:
+        if not self.cache_path:
+            with open(path, 'r') as f:
+                return json.dumps(json.loads(f.read()))
+
+        file_cache = self._get_file_cache()
+        mtime_ns = path.stat().st_mtime_ns
+        cached = file_cache.get(str(path))
+        if cached is not None and cached[0] == mtime_ns: return cached[1]
+
+        with open(path, 'r') as f:
+            json_str = json.dumps(json.loads(f.read()))
+        file_cache[str(path)] = (mtime_ns, json_str)
+        self._save_file_cache(file_cache)
+        return json_str
+
+    def _get_file_cache(self) -> Dict[str, Tuple[int, str]]:
+        if self._file_cache is None:
+            try:
+                with open(self.cache_path, 'rb') as f:
+                    self._file_cache = pickle.load(f)
+            except FileNotFoundError:
+                self._file_cache = {}
+            except Exception as e:
+                logger.warn(f'load json loader cache {self.cache_path} fail: {e}')
+                self._file_cache = {}
+        return self._file_cache
+
+    def _save_file_cache(self, file_cache: Dict[str, Tuple[int, str]]) -> None:
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(file_cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warn(f'save json loader cache {self.cache_path} fail: {e}')
+
+    def __getitem__(self, key: str) -> Any:
+        path, is_json_str = self._get_index()[key]
+        json_str = self._load_json_str(path)
+        # object parsed per get, caller free to modify
+        return json_str if is_json_str else json.loads(json_str)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._get_index()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._get_index())
+
+    def __len__(self) -> int:
+        return len(self._get_index())
 
 class JsonLoader():
     # xxxPath.xxxFile without json return python object
     # xxxPath.xxxFile.json return file content
-    data = {}
+    data: Optional[LazyJsonConst] = None
 
-    def getConst(self, scan_path_list: List[str], key_ignore_pattern=''):
+    def getConst(self, scan_path_list: List[str], key_ignore_pattern='') -> LazyJsonConst:
         """
-        scan_path_list rel to src dir
+        scan_path_list rel to src dir, nothing read until first get,
+        set env IZUMI_INFRA_JSON_LOADER_CACHE as cache file path to memoize parsed file by mtime
         """
-        scan_path_set = set(scan_path_list)
-
-        if JsonLoader.data:
-            return JsonLoader.data
-        else:
-            SRC_DIR = settings.BASE_DIR.parent
-            src_path = Path(SRC_DIR)
-            for scan_path in scan_path_set:
-                for path in src_path.rglob(os.path.join(scan_path, '**/*.json')):
-                    relpath = str(path.parent).replace(str(src_path), '')[1:]
-                    config_key = relpath.replace(key_ignore_pattern, '').replace(os.path.sep, '.')+ '.' + path.stem
-                    file_key = relpath.replace(key_ignore_pattern, '').replace(os.path.sep, '.')+ '.' + path.name
-                    with open(path, 'r') as f:
-                        JsonLoader.data[config_key] = json.loads(f.read())
-                        JsonLoader.data[file_key] = json.dumps(JsonLoader.data[config_key])
-
-            return JsonLoader.data
-
+        if JsonLoader.data is None:
+            JsonLoader.data = LazyJsonConst(Path(settings.BASE_DIR.parent), scan_path_list, key_ignore_pattern,
+                                            os.environ.get('IZUMI_INFRA_JSON_LOADER_CACHE'))
+        return JsonLoader.data
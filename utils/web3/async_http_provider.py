@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+from eth_utils import is_dict
+from eth_utils.toolz import assoc
+from web3.datastructures import AttributeDict
+from web3.providers.async_rpc import AsyncHTTPProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from izumi_infra.utils.web3.multi_endpoint_provider import (RpcEndpoint,
+                                                            RpcEndpointPool,
+                                                            is_idempotent_read)
+
+logger = logging.getLogger(__name__)
+
+# (endpoint uri, response bytes) of last request of current task, concurrent tasks of one loop not shared
+_last_request_info: ContextVar[Tuple[Optional[str], int]] = ContextVar('async_rpc_last_request_info', default=(None, 0))
+
+class PooledAsyncHTTPProvider(AsyncHTTPProvider):
+    """
+    AsyncHTTPProvider with one bounded aiohttp connection pool per event loop,
+    requests over max_connections wait in pool instead of open new connection.
+    Endpoint routed by RpcEndpointPool, idempotent read retry on next endpoint with backoff.
+    """
+
+    def __init__(self, uri_list: List[str], timeout_sec: int, max_connections: int, max_retry: int = 2,
+                 retry_backoff_sec: float = 0.2, circuit_failure_threshold: int = 5, circuit_open_seconds: float = 30,
+                 latency_window: int = 100) -> None:
+        super().__init__(uri_list[0], request_kwargs={'timeout': ClientTimeout(total=timeout_sec)})
+        self.max_connections = max_connections
+        self.pool = RpcEndpointPool(uri_list, error_penalty_sec=timeout_sec, circuit_failure_threshold=circuit_failure_threshold,
+                                    circuit_open_seconds=circuit_open_seconds, latency_window=latency_window)
+        self.max_retry = max_retry
+        self.retry_backoff_sec = retry_backoff_sec
+        self._sessions: WeakKeyDictionary = WeakKeyDictionary()
+
+    def _get_session(self) -> ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = ClientSession(connector=TCPConnector(limit=self.max_connections), raise_for_status=True)
+            self._sessions[loop] = session
+        return session
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        endpoint_list = self.pool.route()
+        attempt_num = self.max_retry + 1 if is_idempotent_read(method) else 1
+        for attempt in range(attempt_num):
+            endpoint = endpoint_list[attempt % len(endpoint_list)]
+            _last_request_info.set((endpoint.uri, 0))
+            try:
+                raw_response = await self._post(endpoint, request_data)
+                _last_request_info.set((endpoint.uri, len(raw_response)))
+                return self.decode_rpc_response(raw_response)
+            except (ClientError, asyncio.TimeoutError) as e:
+                if attempt >= attempt_num - 1: raise
+                logger.info(f'rpc request fail on {endpoint.uri}: {e}, retry: {attempt + 1}')
+                await asyncio.sleep(self.retry_backoff_sec * (2 ** attempt))
+
+    def get_last_request_info(self) -> Tuple[Optional[str], int]:
+        """
+        (endpoint uri, response bytes) of last request sent by current task
+        """
+        return _last_request_info.get()
+
+    async def _post(self, endpoint: RpcEndpoint, request_data: bytes) -> bytes:
+        start = time.monotonic()
+        try:
+            async with self._get_session().post(endpoint.uri, data=request_data, **self.get_request_kwargs()) as response:
+                raw_response = await response.read()
+        except (ClientError, asyncio.TimeoutError):
+            self.pool.record_failure(endpoint)
+            raise
+        self.pool.record_success(endpoint, time.monotonic() - start)
+        return raw_response
+
+    async def close(self) -> None:
+        """
+        close connection pool of running event loop
+        """
+        session: Optional[ClientSession] = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None: await session.close()
+
+# see web3.middleware.attrdict_middleware, list of dict result like logs also converted
+async def async_attrdict_middleware(
+    make_request: Callable[[RPCEndpoint, Any], Any], web3: "Web3"
+) -> Callable[[RPCEndpoint, Any], Any]:
+    async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+        response = await make_request(method, params)
+        if 'result' not in response: return response
+
+        result = response['result']
+        if is_dict(result) and not isinstance(result, AttributeDict):
+            return assoc(response, 'result', AttributeDict.recursive(result))
+        if isinstance(result, list):
+            return assoc(response, 'result', [AttributeDict.recursive(r) if is_dict(r) else r for r in result])
+        return response
+    return middleware
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import logging
 from typing import Any, Callable, Collection, Type
+from aiohttp import ClientError
 from web3.types import RPCEndpoint, RPCResponse
 from requests import HTTPError, TooManyRedirects, Timeout
 
@@ -32,3 +34,28 @@ def rpc_exception_log_middleware(
         web3,
         (ConnectionError, HTTPError, Timeout, TooManyRedirects)
     )
+
+def async_exception_log_middleware(
+    make_request: Callable[[RPCEndpoint, Any], Any],
+    web3: "Web3",
+    errors: Collection[Type[BaseException]],
+) -> Callable[[RPCEndpoint, Any], Any]:
+    """
+    Creates async middleware that record exception requests.
+    """
+    async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+        try:
+            return await make_request(method, params)
+        except errors:
+            logger.critical(f"method: {method}, params: {params}, errors: {errors}")
+            raise
+    return middleware
+
+async def async_rpc_exception_log_middleware(
+    make_request: Callable[[RPCEndpoint, Any], Any], web3: "Web3"
+) -> Callable[[RPCEndpoint, Any], Any]:
+    return async_exception_log_middleware(
+        make_request,
+        web3,
+        (ConnectionError, ClientError, asyncio.TimeoutError)
+    )
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Any, Iterator, List, Optional, Tuple
+
+from requests import HTTPError, Timeout, TooManyRedirects
+from requests import ConnectionError as RequestsConnectionError
+from web3._utils.request import _get_session, make_post_request
+from web3.providers.rpc import HTTPProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from izumi_infra.utils.web3.streaming_json import iter_rpc_result_items
+
+logger = logging.getLogger(__name__)
+
+RPC_URL_SPLIT_CHAR = ','
+
+# read methods safe to retry or hedge on another endpoint, filter methods are endpoint stateful
+IDEMPOTENT_READ_METHODS = frozenset([
+    'eth_chainId',
+    'eth_syncing',
+    'eth_gasPrice',
+    'eth_maxPriorityFeePerGas',
+    'eth_feeHistory',
+    'eth_blockNumber',
+    'eth_getBalance',
+    'eth_getStorageAt',
+    'eth_getProof',
+    'eth_getCode',
+    'eth_getBlockByNumber',
+    'eth_getBlockByHash',
+    'eth_getBlockTransactionCountByNumber',
+    'eth_getBlockTransactionCountByHash',
+    'eth_getTransactionByHash',
+    'eth_getTransactionByBlockHashAndIndex',
+    'eth_getTransactionByBlockNumberAndIndex',
+    'eth_getTransactionReceipt',
+    'eth_getTransactionCount',
+    'eth_call',
+    'eth_estimateGas',
+    'eth_getLogs',
+    'net_version',
+    'web3_clientVersion',
+])
+
+RETRYABLE_ERRORS = (RequestsConnectionError, HTTPError, Timeout, TooManyRedirects, ConnectionError, TimeoutError)
+
+def parse_rpc_url_list(rpc_url: str) -> List[str]:
+    """
+    ordered endpoint list from rpc_url, eg: 'https://a,https://b'
+    """
+    return [u.strip() for u in (rpc_url or '').split(RPC_URL_SPLIT_CHAR) if u.strip()]
+
+def is_idempotent_read(method: str) -> bool:
+    return method in IDEMPOTENT_READ_METHODS
+
+class RpcEndpoint():
+    """
+    Rolling latency and error score of one endpoint, with circuit breaker
+    """
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, uri: str, index: int, latency_window: int) -> None:
+        self.uri = uri
+        self.index = index
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.consecutive_failures = 0
+        self.circuit_open_until = 0.0
+        self.latency_samples = deque(maxlen=latency_window)
+
+    def is_circuit_open(self, now: float) -> bool:
+        return self.circuit_open_until > now
+
+    def score(self, error_penalty_sec: float) -> float:
+        # unknown latency keep configured order
+        return (self.latency_ewma or 0.0) + self.error_ewma * error_penalty_sec
+
+    def p95_latency(self) -> Optional[float]:
+        if not self.latency_samples: return None
+        samples = sorted(self.latency_samples)
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def __repr__(self) -> str:
+        return f'RpcEndpoint({self.uri}, latency: {self.latency_ewma}, error: {self.error_ewma:.2f})'
+
+class RpcEndpointPool():
+    """
+    Ordered endpoints routed by rolling latency and error score,
+    endpoint open circuit after consecutive failures and half open after cooldown
+    """
+
+    def __init__(self, uri_list: List[str], error_penalty_sec: float, circuit_failure_threshold: int,
+                 circuit_open_seconds: float, latency_window: int) -> None:
+        if not uri_list: raise ValueError('empty rpc endpoint list')
+        self.endpoints = [RpcEndpoint(u, i, latency_window) for i, u in enumerate(uri_list)]
+        self.error_penalty_sec = error_penalty_sec
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_open_seconds = circuit_open_seconds
+        self._lock = Lock()
+
+    def route(self) -> List[RpcEndpoint]:
+        """
+        endpoints by preference, open circuit ones last so request still sent when all failing
+        """
+        now = time.monotonic()
+        with self._lock:
+            return sorted(self.endpoints, key=lambda e: (e.is_circuit_open(now), e.score(self.error_penalty_sec), e.index))
+
+    def record_success(self, endpoint: RpcEndpoint, latency: float) -> None:
+        with self._lock:
+            endpoint.latency_ewma = latency if endpoint.latency_ewma is None \
+                else (1 - RpcEndpoint.EWMA_ALPHA) * endpoint.latency_ewma + RpcEndpoint.EWMA_ALPHA * latency
+            endpoint.error_ewma = (1 - RpcEndpoint.EWMA_ALPHA) * endpoint.error_ewma
+            endpoint.latency_samples.append(latency)
+            endpoint.consecutive_failures = 0
+            endpoint.circuit_open_until = 0.0
+
+    def record_failure(self, endpoint: RpcEndpoint) -> None:
+        with self._lock:
+            endpoint.error_ewma = (1 - RpcEndpoint.EWMA_ALPHA) * endpoint.error_ewma + RpcEndpoint.EWMA_ALPHA
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.circuit_failure_threshold:
+                endpoint.circuit_open_until = time.monotonic() + self.circuit_open_seconds
+                logger.warn(f'open rpc circuit of {endpoint.uri} for {self.circuit_open_seconds}s')
+
+# hedged request run in background, loser request finish without wait
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='InfraRpcHedge')
+
+class MultiEndpointHTTPProvider(HTTPProvider):
+    """
+    HTTPProvider over ordered endpoints, idempotent read retry on next endpoint with backoff
+    and optional hedged request after p95 latency of the chosen endpoint
+    """
+    # retry by endpoint pool instead of http_retry_request_middleware
+    _middlewares: Tuple = ()
+
+    def __init__(self, uri_list: List[str], request_kwargs: Any = None, max_retry: int = 2, retry_backoff_sec: float = 0.2,
+                 circuit_failure_threshold: int = 5, circuit_open_seconds: float = 30, latency_window: int = 100,
+                 enable_hedge: bool = False, hedge_min_delay_sec: float = 0.05) -> None:
+        super().__init__(uri_list[0], request_kwargs=request_kwargs)
+        timeout = self._request_kwargs.get('timeout') or 10
+        self.pool = RpcEndpointPool(uri_list, error_penalty_sec=timeout, circuit_failure_threshold=circuit_failure_threshold,
+                                    circuit_open_seconds=circuit_open_seconds, latency_window=latency_window)
+        self.max_retry = max_retry
+        self.retry_backoff_sec = retry_backoff_sec
+        self.enable_hedge = enable_hedge
+        self.hedge_min_delay_sec = hedge_min_delay_sec
+        self._last_request = threading.local()
+
+    def __str__(self) -> str:
+        return "RPC connection {0}".format([e.uri for e in self.pool.endpoints])
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        raw_response = self.make_raw_request(request_data, is_idempotent_read(method))
+        return self.decode_rpc_response(raw_response)
+
+    def make_raw_request(self, request_data: bytes, is_idempotent: bool) -> bytes:
+        """
+        Send encoded request body, idempotent one retry on next endpoint by score
+        """
+        endpoint_list = self.pool.route()
+        attempt_num = self.max_retry + 1 if is_idempotent else 1
+        for attempt in range(attempt_num):
+            endpoint = endpoint_list[attempt % len(endpoint_list)]
+            self._set_last_request(endpoint, 0)
+            try:
+                if is_idempotent and self.enable_hedge and len(endpoint_list) > 1:
+                    endpoint, raw_response = self._post_hedged(endpoint, endpoint_list[(attempt + 1) % len(endpoint_list)], request_data)
+                else:
+                    raw_response = self._post(endpoint, request_data)
+                self._set_last_request(endpoint, len(raw_response))
+                return raw_response
+            except RETRYABLE_ERRORS as e:
+                if attempt >= attempt_num - 1: raise
+                logger.info(f'rpc request fail on {endpoint.uri}: {e}, retry: {attempt + 1}')
+                time.sleep(self.retry_backoff_sec * (2 ** attempt))
+
+    def _set_last_request(self, endpoint: RpcEndpoint, response_bytes: int) -> None:
+        self._last_request.endpoint_uri = endpoint.uri
+        self._last_request.response_bytes = response_bytes
+
+    def get_last_request_info(self) -> Tuple[Optional[str], int]:
+        """
+        (endpoint uri, response bytes) of last request sent by current thread
+        """
+        return getattr(self._last_request, 'endpoint_uri', None), getattr(self._last_request, 'response_bytes', 0)
+
+    def _post(self, endpoint: RpcEndpoint, request_data: bytes) -> bytes:
+        start = time.monotonic()
+        try:
+            raw_response = make_post_request(endpoint.uri, request_data, **self.get_request_kwargs())
+        except RETRYABLE_ERRORS:
+            self.pool.record_failure(endpoint)
+            raise
+        self.pool.record_success(endpoint, time.monotonic() - start)
+        return raw_response
+
+    def make_stream_request(self, method: RPCEndpoint, params: Any, item_prefix: str) -> Iterator[Any]:
+        """
+        Send request with gzip accepted and parse response incrementally, yield raw items under item_prefix.
+        Idempotent read retry on next endpoint only before response start.
+        """
+        request_data = self.encode_rpc_request(method, params)
+        endpoint_list = self.pool.route()
+        attempt_num = self.max_retry + 1 if is_idempotent_read(method) else 1
+        for attempt in range(attempt_num):
+            endpoint = endpoint_list[attempt % len(endpoint_list)]
+            start = time.monotonic()
+            self._set_last_request(endpoint, 0)
+            try:
+                response = self._post_stream(endpoint, request_data)
+            except RETRYABLE_ERRORS as e:
+                self.pool.record_failure(endpoint)
+                if attempt >= attempt_num - 1: raise
+                logger.info(f'rpc stream request fail on {endpoint.uri}: {e}, retry: {attempt + 1}')
+                time.sleep(self.retry_backoff_sec * (2 ** attempt))
+                continue
+
+            self.pool.record_success(endpoint, time.monotonic() - start)
+            self._set_last_request(endpoint, int(response.headers.get('Content-Length') or 0))
+            with response:
+                # urllib3 decompress gzip body while reading
+                response.raw.decode_content = True
+                yield from iter_rpc_result_items(response.raw, item_prefix)
+            return
+
+    def _post_stream(self, endpoint: RpcEndpoint, request_data: bytes) -> Any:
+        request_kwargs = dict(self.get_request_kwargs())
+        headers = {**request_kwargs.get('headers', {}), 'Accept-Encoding': 'gzip'}
+        response = _get_session(endpoint.uri).post(endpoint.uri, data=request_data, stream=True,
+                                                   **{**request_kwargs, 'headers': headers})
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return response
+
+    def _post_hedged(self, endpoint: RpcEndpoint, hedge_endpoint: RpcEndpoint, request_data: bytes) -> Tuple[RpcEndpoint, bytes]:
+        """
+        Send to hedge_endpoint too if endpoint not respond in its p95 latency, first success win,
+        return (winner endpoint, response)
+        """
+        hedge_delay = max(endpoint.p95_latency() or self.hedge_min_delay_sec, self.hedge_min_delay_sec)
+        primary = _hedge_executor.submit(self._post, endpoint, request_data)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done: return endpoint, primary.result()
+
+        hedge = _hedge_executor.submit(self._post, hedge_endpoint, request_data)
+        future_to_endpoint = {primary: endpoint, hedge: hedge_endpoint}
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None: return future_to_endpoint[future], future.result()
+                error = future.exception()
+        raise error
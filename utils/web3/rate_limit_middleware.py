@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from typing import Any, Callable
+
+from web3.types import RPCEndpoint, RPCResponse
+
+
+def build_rate_limit_middleware(limiter) -> Callable:
+    """
+    Creates middleware that take one token of limiter before each request, limiter should have acquire(tokens)
+    """
+    def rate_limit_middleware(
+        make_request: Callable[[RPCEndpoint, Any], RPCResponse], web3: "Web3"
+    ) -> Callable[[RPCEndpoint, Any], RPCResponse]:
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            limiter.acquire(1)
+            return make_request(method, params)
+        return middleware
+    return rate_limit_middleware
+
+def build_async_rate_limit_middleware(limiter) -> Callable:
+    """
+    Creates async middleware that wait one token of limiter before each request, limiter should have reserve(tokens)
+    """
+    async def async_rate_limit_middleware(
+        make_request: Callable[[RPCEndpoint, Any], Any], web3: "Web3"
+    ) -> Callable[[RPCEndpoint, Any], Any]:
+        async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            wait_sec = limiter.reserve(1)
+            if wait_sec > 0: await asyncio.sleep(wait_sec)
+            return await make_request(method, params)
+        return middleware
+    return async_rate_limit_middleware
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Callable
+
+from web3.types import RPCEndpoint, RPCResponse
+
+
+def build_response_cache_middleware(response_cache) -> Callable:
+    """
+    Creates middleware that serve immutable response from response_cache, see RpcResponseCache
+    """
+    def response_cache_middleware(
+        make_request: Callable[[RPCEndpoint, Any], RPCResponse], web3: "Web3"
+    ) -> Callable[[RPCEndpoint, Any], RPCResponse]:
+        def fetch_head() -> int:
+            return int(make_request('eth_blockNumber', [])['result'], 16)
+
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            if not response_cache.is_cacheable_method(method):
+                response = make_request(method, params)
+                if method == 'eth_blockNumber' and response.get('result') is not None:
+                    response_cache.observe_head(int(response['result'], 16))
+                return response
+            return response_cache.get_or_fetch(method, params, lambda: make_request(method, params), fetch_head)
+        return middleware
+    return response_cache_middleware
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import time
+from typing import Any, Callable
+
+from web3.types import RPCEndpoint, RPCResponse
+
+
+def build_rpc_metrics_middleware(chain_id: int, metrics_holder) -> Callable:
+    """
+    Creates middleware that observe latency, response bytes and error class of each request to metrics_holder,
+    endpoint and response bytes read from provider get_last_request_info if provided
+    """
+    def rpc_metrics_middleware(
+        make_request: Callable[[RPCEndpoint, Any], RPCResponse], web3: "Web3"
+    ) -> Callable[[RPCEndpoint, Any], RPCResponse]:
+        get_last_request_info = getattr(web3.provider, 'get_last_request_info', lambda: (None, 0))
+
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            error_class = None
+            start = time.monotonic()
+            try:
+                response = make_request(method, params)
+                if response.get('error') is not None: error_class = 'RPCError'
+                return response
+            except Exception as e:
+                error_class = type(e).__name__
+                raise
+            finally:
+                endpoint_uri, response_bytes = get_last_request_info()
+                metrics_holder.observe(chain_id, endpoint_uri, method, time.monotonic() - start, response_bytes, error_class)
+        return middleware
+    return rpc_metrics_middleware
+
+def build_async_rpc_metrics_middleware(chain_id: int, metrics_holder) -> Callable:
+    """
+    Async version of build_rpc_metrics_middleware, provider get_last_request_info should be per task
+    """
+    async def async_rpc_metrics_middleware(
+        make_request: Callable[[RPCEndpoint, Any], Any], web3: "Web3"
+    ) -> Callable[[RPCEndpoint, Any], Any]:
+        get_last_request_info = getattr(web3.provider, 'get_last_request_info', lambda: (None, 0))
+
+        async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            error_class = None
+            start = time.monotonic()
+            try:
+                response = await make_request(method, params)
+                if response.get('error') is not None: error_class = 'RPCError'
+                return response
+            except Exception as e:
+                error_class = type(e).__name__
+                raise
+            finally:
+                endpoint_uri, response_bytes = get_last_request_info()
+                metrics_holder.observe(chain_id, endpoint_uri, method, time.monotonic() - start, response_bytes, error_class)
+        return middleware
+    return async_rpc_metrics_middleware
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from typing import Any, BinaryIO, Iterator
+
+
+def iter_rpc_result_items(stream: BinaryIO, item_prefix: str) -> Iterator[Any]:
+    """
+    Parse JSON-RPC response incrementally, yield items under item_prefix one at a time,
+    eg: 'result.item' for logs, 'result.transactions.item' for transactions of full block.
+    Raise ValueError of rpc error or null result, require ijson.
+    """
+    import ijson
+    from ijson.common import ObjectBuilder
+
+    item_builder = None
+    error_builder = None
+    is_null_result = False
+    for prefix, event, value in ijson.parse(stream):
+        if item_builder is not None:
+            item_builder.event(event, value)
+            # end event of item itself, nested one has longer prefix
+            if prefix == item_prefix and event in ('end_map', 'end_array'):
+                yield item_builder.value
+                item_builder = None
+        elif prefix == item_prefix:
+            if event in ('start_map', 'start_array'):
+                item_builder = ObjectBuilder()
+                item_builder.event(event, value)
+            else:
+                yield value
+        elif prefix == 'error' or prefix.startswith('error.'):
+            if error_builder is None: error_builder = ObjectBuilder()
+            error_builder.event(event, value)
+        elif prefix == 'result' and event == 'null':
+            is_null_result = True
+
+    if error_builder is not None: raise ValueError(error_builder.value)
+    if is_null_result: raise ValueError(f'null result of {item_prefix}')